@@ -0,0 +1,37 @@
+# accounts/management/commands/reconcile_user_stats.py
+
+"""
+Resynchronise les statistiques des utilisateurs (total_xp,
+challenges_joined) avec leurs tentatives. Elles sont tenues à jour par
+variations à chaque tentative ; ce réconciliateur corrige les écarts
+(suppression en cascade d'un challenge, soumissions concurrentes, ...).
+
+À planifier périodiquement (cron) :
+
+    python manage.py reconcile_user_stats
+    python manage.py reconcile_user_stats --leaderboard
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Corrige les statistiques des utilisateurs qui ne correspondent plus à leurs tentatives"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--leaderboard', action='store_true',
+            help="Reconstruire aussi le classement global"
+        )
+
+    def handle(self, *args, **options):
+        fixed = get_user_model().reconcile_stats()
+        self.stdout.write(self.style.SUCCESS(f"{fixed} utilisateur(s) corrigé(s)"))
+
+        if options['leaderboard']:
+            from api.models import LeaderboardEntry
+            written, deleted = LeaderboardEntry.rebuild()
+            self.stdout.write(self.style.SUCCESS(
+                f"Classement reconstruit : {written} ligne(s) écrite(s), {deleted} supprimée(s)"
+            ))
@@ -47,26 +47,103 @@ class User(AbstractUser):
     
     def __str__(self):
         return self.username
+
+    # Champs affichés dans les classements (voir api/signals.py)
+    DISPLAY_FIELDS = ('username', 'nom', 'prenom', 'photo')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._display_state = instance._get_display_state()
+        return instance
+
+    def _get_display_state(self):
+        return tuple(str(self.__dict__.get(name)) for name in self.DISPLAY_FIELDS)
     
+    @classmethod
+    def add_stats_delta(cls, user_id, xp=0, joined=0):
+        """
+        Applique la variation des statistiques due à une tentative
+        (appelé par UserChallengeAttempt.save / delete) : UPDATE atomique
+        avec F(), sans relire ni réécrire le reste de l'utilisateur.
+        """
+        changes = {}
+        if xp:
+            changes['total_xp'] = models.F('total_xp') + xp
+        if joined:
+            changes['challenges_joined'] = models.F('challenges_joined') + joined
+        if changes:
+            cls.objects.filter(pk=user_id).update(**changes)
+        if joined:
+            # challenges_joined est affiché par le classement global
+            from api.models import GlobalLeaderboardVersion
+            GlobalLeaderboardVersion.bump()
+
+    @classmethod
+    def add_xp_deltas(cls, deltas):
+        """Variations d'XP de plusieurs utilisateurs ({user_id: xp}) en un seul UPDATE"""
+        deltas = {user_id: xp for user_id, xp in deltas.items() if xp}
+        if not deltas:
+            return
+        cls.objects.filter(pk__in=deltas).update(
+            total_xp=models.F('total_xp') + models.Case(
+                *[models.When(pk=user_id, then=models.Value(xp)) for user_id, xp in deltas.items()],
+                default=models.Value(0),
+                output_field=models.IntegerField(),
+            )
+        )
+
     def update_stats(self):
-        """Met à jour les statistiques de l'utilisateur"""
-        from api.models import UserChallengeAttempt
-        
-        # Nombre de challenges rejoints
-        self.challenges_joined = UserChallengeAttempt.objects.filter(
-            user=self
-        ).values('challenge').distinct().count()
-        
-        # XP total = somme de tous les XP validés (progressifs)
-        attempts = UserChallengeAttempt.objects.filter(
-            user=self
-        ).select_related('challenge')
-        
-        self.total_xp = sum(
-            attempt.xp_earned for attempt in attempts
+        """
+        Recalcule entièrement les statistiques de l'utilisateur depuis ses
+        tentatives (resynchronisation ; le suivi courant est incrémental)
+        """
+        from django.db.models import Count, Sum
+        from django.db.models.functions import Coalesce
+        from api.models import GlobalLeaderboardVersion
+
+        stats = self.challenge_attempts.aggregate(
+            joined=Count('id'),
+            xp=Coalesce(Sum('xp_earned'), 0),
+        )
+        self.challenges_joined = stats['joined']
+        self.total_xp = stats['xp']
+        self.save(update_fields=['challenges_joined', 'total_xp'])
+        GlobalLeaderboardVersion.bump()
+
+    @classmethod
+    def reconcile_stats(cls):
+        """
+        Corrige en une requête les utilisateurs dont total_xp ou
+        challenges_joined ne correspond plus à leurs tentatives.
+
+        Returns:
+            Nombre d'utilisateurs corrigés
+        """
+        from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Sum, Value
+        from django.db.models.functions import Coalesce
+        from api.models import GlobalLeaderboardVersion, UserChallengeAttempt
+
+        attempts = UserChallengeAttempt.objects.filter(user=OuterRef('pk')).order_by().values('user')
+        real_xp = Coalesce(
+            Subquery(attempts.annotate(total=Sum('xp_earned')).values('total'), output_field=IntegerField()),
+            Value(0)
+        )
+        real_joined = Coalesce(
+            Subquery(attempts.annotate(total=Count('id')).values('total'), output_field=IntegerField()),
+            Value(0)
+        )
+
+        drifted = cls.objects.annotate(real_xp=real_xp, real_joined=real_joined).filter(
+            ~Q(total_xp=models.F('real_xp')) | ~Q(challenges_joined=models.F('real_joined'))
+        )
+        corrected = cls.objects.filter(pk__in=drifted.values('pk')).update(
+            total_xp=real_xp,
+            challenges_joined=real_joined,
         )
-        
-        self.save()
+        if corrected:
+            GlobalLeaderboardVersion.bump()
+        return corrected
 
 
 class RegistrationToken(models.Model):
@@ -17,7 +17,7 @@ from .serializers import (
 )
 from .models import PasswordResetToken
 
-from api.models import UserChallengeAttempt
+from api import leaderboard
 from django.shortcuts import redirect
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from rest_framework_simplejwt.tokens import RefreshToken, TokenError, AccessToken
@@ -322,9 +322,10 @@ def get_user_profile_with_stats(request, user_id):
     except User.DoesNotExist:
         return Response({"error": "Utilisateur introuvable"}, status=404)
 
-    # Récupérer les tentatives
-    attempts = UserChallengeAttempt.objects.filter(user=user)
-    completed = attempts.filter(status='completed')
+    # Compteurs stockés (tenus à jour à chaque tentative)
+    entry = leaderboard.get_stats_entry(user.id)
+    joined = user.challenges_joined
+    completed = entry.challenges_completed
 
     # Construction de la réponse
     data = {
@@ -342,20 +343,18 @@ def get_user_profile_with_stats(request, user_id):
             'photo': user.photo.url if user.photo else None
         },
         'challenges': {
-            # 'joined': attempts.count(),
-            'completed': completed.count(),
-            'in_progress': attempts.filter(status='in_progress').count(),
+            # 'joined': joined,
+            'completed': completed,
+            'in_progress': joined - completed,
             'completion_rate': round(
-                (completed.count() / attempts.count() * 100)
-                if attempts.count() > 0 else 0,
+                (completed / joined * 100)
+                if joined > 0 else 0,
                 2
             )
         },
         'ranking': {
-            'global_rank': User.objects.filter(
-                total_xp__gt=user.total_xp
-            ).count() + 1,
-            'total_users': User.objects.filter(total_xp__gt=0).count()
+            'global_rank': leaderboard.rank_for_entry(entry),
+            'total_users': leaderboard.ranked_entries().count()
         }
     }
 
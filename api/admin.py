@@ -1,14 +1,15 @@
 # api/admin.py
 
 from django.contrib import admin
-from .models import Challenge, TestCase, UserChallengeAttempt
+from .models import Challenge, TestCase, UserChallengeAttempt, LeaderboardEntry, SubmissionJob
 
 
 class TestCaseInline(admin.TabularInline):
     """Affiche les test cases dans la page du challenge"""
     model = TestCase
     extra = 1
-    fields = ['order', 'input_file', 'output_file', 'is_sample', 'xp_reward']
+    fields = ['order', 'input_file', 'output_file', 'is_sample', 'xp_reward', 'input_size', 'output_size']
+    readonly_fields = ['input_size', 'output_size']
 
 
 @admin.register(Challenge)
@@ -31,9 +32,10 @@ class ChallengeAdmin(admin.ModelAdmin):
 
 @admin.register(TestCase)
 class TestCaseAdmin(admin.ModelAdmin):
-    list_display = ['challenge', 'order', 'is_sample', 'xp_reward']
+    list_display = ['challenge', 'order', 'is_sample', 'xp_reward', 'input_size', 'output_size']
     list_filter = ['challenge', 'is_sample']
     ordering = ['challenge', 'order']
+    readonly_fields = ['input_size', 'input_sha256', 'output_size', 'output_sha256']
     fieldsets = (
         ('Informations de base', {
             'fields': ('challenge', 'order', 'is_sample')
@@ -41,11 +43,20 @@ class TestCaseAdmin(admin.ModelAdmin):
         ('Fichiers', {
             'fields': ('input_file', 'output_file')
         }),
+        ('Contenu stocké en base', {
+            'fields': ('input_size', 'input_sha256', 'output_size', 'output_sha256'),
+            'classes': ('collapse',)
+        }),
         ('Récompense', {
             'fields': ('xp_reward',)
         }),
     )
 
+    def delete_queryset(self, request, queryset):
+        # Suppression une par une : TestCase.delete() met à jour la version
+        # des tests du challenge et vide le cache des fichiers
+        for test_case in queryset:
+            test_case.delete()
 
 
 @admin.register(UserChallengeAttempt)
@@ -66,3 +77,24 @@ class UserChallengeAttemptAdmin(admin.ModelAdmin):
             'fields': ('xp_earned', 'attempts_count')
         }),
     )
+
+    def delete_queryset(self, request, queryset):
+        # Suppression une par une : UserChallengeAttempt.delete() met à jour
+        # le classement global
+        for attempt in queryset:
+            attempt.delete()
+
+
+@admin.register(LeaderboardEntry)
+class LeaderboardEntryAdmin(admin.ModelAdmin):
+    list_display = ['username', 'total_xp', 'challenges_completed', 'total_completion_time', 'updated_at']
+    search_fields = ['username']
+    readonly_fields = ['user', 'username', 'total_xp', 'challenges_completed', 'total_completion_time', 'updated_at']
+
+
+@admin.register(SubmissionJob)
+class SubmissionJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'challenge', 'team', 'status', 'http_status', 'tries', 'created_at', 'finished_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['user__username', 'challenge__title']
+    readonly_fields = ['id', 'progress', 'result', 'http_status', 'error', 'worker', 'tries', 'created_at', 'started_at', 'finished_at']
@@ -0,0 +1,139 @@
+# api/cache_regions.py
+
+"""
+Régions du cache partagé (CACHES['default'] : table en base, fichiers,
+locmem ou Redis selon CACHE_BACKEND), communes à tous les workers.
+
+Chaque région a un nom, une durée de vie (CACHE_REGION_TTLS) et un numéro
+de génération stocké dans le cache : invalider une région incrémente ce
+numéro, les anciennes clés ne sont plus lues et expirent d'elles-mêmes.
+Les régions sont invalidées par les signaux des modèles (api/signals.py) ;
+les clés qui contiennent déjà une version (tests_version,
+leaderboard_version, standings_version) n'ont pas besoin de l'être.
+
+- challenges : fichiers texte Cloudinary (descriptions, templates, test cases)
+- test_bundles : bundles de tests et résultats de validation
+- leaderboards : pages des classements de challenge
+- contest_state : instantanés des classements de contest
+
+Le cache partagé complète les caches mémoire des workers (api/lru.py) : il
+est lu quand le cache mémoire ne contient pas la valeur. Une erreur du
+backend (table absente, serveur injoignable) est traitée comme un défaut
+de cache. Compteurs par région et par processus : get_stats().
+"""
+
+import hashlib
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.db import DatabaseCache
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class CacheRegion:
+    """Espace de noms du cache partagé, avec génération et compteurs"""
+
+    def __init__(self, name: str, ttl: int, alias: str = 'default'):
+        self.name = name
+        self.ttl = ttl
+        self.alias = alias
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(('hits', 'misses', 'sets', 'invalidations', 'errors'), 0)
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def _count(self, counter: str):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _call(self, method: str, *args, default=None):
+        """Appel au backend ; une erreur est journalisée et vaut `default`"""
+        cache = self.cache
+        try:
+            if isinstance(cache, DatabaseCache) and connection.in_atomic_block:
+                # Point de sauvegarde : une erreur du cache n'annule pas la transaction en cours
+                with transaction.atomic():
+                    return getattr(cache, method)(*args)
+            return getattr(cache, method)(*args)
+        except Exception as e:
+            self._count('errors')
+            logger.warning("[CACHE] Région %s : %s impossible (%s)", self.name, method, e)
+            return default
+
+    def _generation_key(self) -> str:
+        return f'region:{self.name}:generation'
+
+    def _key(self, key: Hashable) -> str:
+        generation = self._call('get', self._generation_key(), 0, default=0)
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        return f'region:{self.name}:{generation}:{digest}'
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        if self.ttl <= 0:
+            return default
+        value = self._call('get', self._key(key), _MISSING, default=_MISSING)
+        if value is _MISSING:
+            self._count('misses')
+            return default
+        self._count('hits')
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        if self.ttl <= 0:
+            return
+        self._call('set', self._key(key), value, self.ttl)
+        self._count('sets')
+
+    def get_or_set(self, key: Hashable, build: Callable[[], Any]) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = build()
+            self.set(key, value)
+        return value
+
+    def delete(self, key: Hashable):
+        self._call('delete', self._key(key))
+
+    def invalidate(self):
+        """Rend toutes les clés de la région obsolètes (pour tous les workers)"""
+        key = self._generation_key()
+        if not self._call('add', key, 1, None, default=False):
+            self._call('incr', key)
+        self._count('invalidations')
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+        lookups = counters['hits'] + counters['misses']
+        counters['hit_rate'] = round(counters['hits'] / lookups * 100, 2) if lookups else None
+        counters['ttl'] = self.ttl
+        return counters
+
+
+_regions = {
+    name: CacheRegion(name, ttl)
+    for name, ttl in settings.CACHE_REGION_TTLS.items()
+}
+
+
+def region(name: str) -> CacheRegion:
+    return _regions[name]
+
+
+def invalidate(*names: str):
+    for name in names:
+        _regions[name].invalidate()
+
+
+def get_stats() -> Dict[str, Any]:
+    """Compteurs du processus courant, par région"""
+    return {name: cache_region.stats() for name, cache_region in _regions.items()}
@@ -1,93 +1,300 @@
 # api/challenge_validator.py
 
-from typing import Dict, List, Any
-from .executor import CodeExecutor
+from typing import Callable, Dict, Iterator, List, Any, Optional, Sequence
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from django.conf import settings
+from .executor import EXECUTION_SLOTS as _EXECUTION_SLOTS, CodeExecutor, batch_mode_available
+from . import result_cache
+import threading
 import uuid
 
+
+def normalize_lines(output: str) -> List[str]:
+    """Lignes non vides d'un output, sans espaces superflus"""
+    return [line.strip() for line in output.strip().split('\n') if line.strip()]
+
+
 class ChallengeValidator:
     """
     Classe pour valider les soumissions de challenges
     """
     
-    def __init__(self, timeout: int = 10):
+    def __init__(self, timeout: int = 10, max_workers: Optional[int] = None):
         """
         Initialise le validateur
         
         Args:
             timeout: Temps maximum d'exécution par test case
+            max_workers: Nombre de test cases exécutés en parallèle
+                         (EXECUTOR_MAX_PARALLEL_TESTS par défaut)
         """
         self.timeout = timeout
         self.validation_id = str(uuid.uuid4())
         self.executor = CodeExecutor(timeout=timeout)
+        self.max_workers = max(1, max_workers or settings.EXECUTOR_MAX_PARALLEL_TESTS)
+        # Test cases dont l'exécution a échoué côté API (résultat non mémorisable)
+        self._infra_failures = []
     
     def validate_submission(
         self,
         user_code: str,
         test_cases: List[Dict[str, str]],
         language: str = 'python',
+        stop_on_failure: bool = False,
+        on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+        cache_key: Optional[tuple] = None,
     ) -> Dict[str, Any]:
         """
         Valide le code de l'utilisateur contre tous les test cases
         
+        Si l'API d'exécution supporte le mode batch, tous les inputs partent
+        en un seul appel. Sinon les test cases sont exécutés en parallèle (au
+        plus `max_workers` à la fois, dans la limite du plafond global du
+        processus). Les résultats restent dans l'ordre des test cases.
+        
         Args:
             user_code: Le code Python de l'utilisateur
             test_cases: Liste de dictionnaires contenant:
                 - input_content: Le contenu de l'input
-                - output_content: Le contenu attendu de l'output
+                - expected_output: Le contenu attendu de l'output
+                - expected_lines: (optionnel) l'output attendu déjà normalisé
                 - order: L'ordre du test case
+            language: Le langage du code (python, javascript, c)
+            stop_on_failure: Si True, s'arrête au premier test échoué ;
+                les tests suivants sont marqués comme non exécutés (skipped)
+            on_result: Appelée avec le résultat de chaque test, dans l'ordre,
+                dès qu'il est connu (suivi de progression)
+            cache_key: Clé de mémoïsation (result_cache.make_key) : un résultat
+                déjà calculé pour cette clé est renvoyé sans exécution
         
         Returns:
             Dictionnaire contenant:
             - success: bool - True si tous les tests passent
             - passed_tests: int - Nombre de tests réussis
             - total_tests: int - Nombre total de tests
+            - skipped_tests: int - Nombre de tests non exécutés
             - results: list - Détails de chaque test
         """
         
+        if cache_key is not None:
+            cached = result_cache.lookup(cache_key)
+            if cached is not None:
+                print(f"[VALIDATOR-{self.validation_id}] Résultat mémorisé réutilisé ({cached['passed_tests']}/{cached['total_tests']})")
+                if on_result is not None:
+                    for result in cached['results']:
+                        on_result(result)
+                return cached
+        
         results = []
         passed_tests = 0
         total_tests = len(test_cases)
+        stop_event = threading.Event()
+        self._infra_failures = []
         
-        for idx, test_case in enumerate(test_cases, 1):
-            input_content = test_case['input_content']
-            expected_output = test_case['expected_output']
-            
-            # Exécuter le code avec l'input spécifique
-            result = self._run_with_input(user_code, input_content, language)
-            
-            if not result['success']:
-                # Erreur d'exécution
-                results.append({
-                    'test_number': idx,
-                    'passed': False,
-                    'error': result['error'],
-                    'expected_output': expected_output,
-                    'user_output': None,
-                    'execution_time': result['execution_time']
-                })
-            else:
-                # Comparer les outputs
-                user_output = result['output']
-                is_correct = self._compare_outputs(user_output, expected_output)
+        pool = None
+        batch_outcomes = self._run_batch(user_code, test_cases, language)
+        if batch_outcomes is not None:
+            # Tout a déjà été exécuté : on enveloppe les résultats pour la boucle commune
+            futures = []
+            for idx, (test_case, outcome) in enumerate(zip(test_cases, batch_outcomes), 1):
+                future = Future()
+                future.set_result(self._build_result(idx, test_case, outcome))
+                futures.append(future)
+        else:
+            workers = max(1, min(self.max_workers, total_tests))
+            pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='validator')
+            futures = [
+                pool.submit(self._run_test_case, idx, test_case, user_code, language, stop_event)
+                for idx, test_case in enumerate(test_cases, 1)
+            ]
+        
+        try:
+            for idx, future in enumerate(futures, 1):
+                if stop_event.is_set():
+                    # Arrêt anticipé : on annule ce qui n'a pas encore démarré
+                    future.cancel()
+                    result = self._skipped_result(idx)
+                    results.append(result)
+                    if on_result is not None:
+                        on_result(result)
+                    continue
                 
-                if is_correct:
-                    passed_tests += 1
+                result = future.result()
+                results.append(result)
+                if on_result is not None:
+                    on_result(result)
                 
-                results.append({
-                    'test_number': idx,
-                    'passed': is_correct,
-                    'error': None,
-                    'expected_output': expected_output if not is_correct else None,
-                    'user_output': user_output,
-                    'execution_time': result['execution_time']
-                })
+                if result['passed']:
+                    passed_tests += 1
+                elif stop_on_failure:
+                    print(f"[VALIDATOR-{self.validation_id}] Échec au test {idx}, arrêt anticipé")
+                    stop_event.set()
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
         
-        return {
+        summary = {
             'success': passed_tests == total_tests,
             'passed_tests': passed_tests,
             'total_tests': total_tests,
+            'skipped_tests': sum(1 for r in results if r.get('skipped')),
             'results': results
         }
+        if cache_key is not None and not self._infra_failures:
+            result_cache.store(cache_key, summary)
+        return summary
+    
+    def iter_results(
+        self,
+        user_code: str,
+        test_cases: List[Dict[str, str]],
+        language: str = 'python',
+        stop_on_failure: bool = False,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Variante de validate_submission pour le streaming : produit le
+        résultat de chaque test case dès qu'il est terminé (ordre de fin
+        d'exécution, `test_number` identifie le test).
+        
+        Avec stop_on_failure, le premier échec arrête la correction et les
+        tests restants sont produits comme non exécutés (skipped).
+        Si le générateur est fermé avant la fin (client déconnecté), les
+        test cases pas encore démarrés ne sont jamais envoyés à l'API.
+        """
+        stop_event = threading.Event()
+        
+        batch_outcomes = self._run_batch(user_code, test_cases, language)
+        if batch_outcomes is not None:
+            for idx, (test_case, outcome) in enumerate(zip(test_cases, batch_outcomes), 1):
+                if stop_event.is_set():
+                    yield self._skipped_result(idx)
+                    continue
+                result = self._build_result(idx, test_case, outcome)
+                yield result
+                if stop_on_failure and not result['passed']:
+                    stop_event.set()
+            return
+        
+        workers = max(1, min(self.max_workers, len(test_cases)))
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='validator')
+        pending = {
+            pool.submit(self._run_test_case, idx, test_case, user_code, language, stop_event): idx
+            for idx, test_case in enumerate(test_cases, 1)
+        }
+        completed = False
+        try:
+            while pending and not stop_event.is_set():
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in sorted(done, key=pending.get):
+                    idx = pending.pop(future)
+                    result = future.result() or self._skipped_result(idx)
+                    yield result
+                    if stop_on_failure and not result['passed'] and not result.get('skipped'):
+                        print(f"[VALIDATOR-{self.validation_id}] Échec au test {idx}, arrêt anticipé")
+                        stop_event.set()
+                        break
+            
+            # Arrêt anticipé : les tests restants ne sont pas exécutés
+            for future, idx in sorted(pending.items(), key=lambda item: item[1]):
+                future.cancel()
+                yield self._skipped_result(idx)
+            completed = True
+        finally:
+            # Générateur fermé en cours de route : on n'attend pas les tests en cours
+            stop_event.set()
+            pool.shutdown(wait=completed, cancel_futures=True)
+    
+    def _run_batch(
+        self,
+        code: str,
+        test_cases: List[Dict[str, str]],
+        language: str,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Tente d'exécuter tous les test cases en un seul appel (mode batch).
+        
+        Returns:
+            Les résultats bruts dans l'ordre des test cases, ou None si le
+            mode batch n'est pas disponible
+        """
+        if len(test_cases) < 2 or not batch_mode_available():
+            return None
+        
+        executor = CodeExecutor(
+            timeout=self.timeout,
+            execution_id=f"{self.validation_id}_batch"
+        )
+        program = self._stdin_program(code, language)
+        
+        with _EXECUTION_SLOTS:
+            return executor.execute_batch(
+                program, language,
+                [test_case['input_content'] for test_case in test_cases]
+            )
+    
+    def _run_test_case(
+        self,
+        idx: int,
+        test_case: Dict[str, str],
+        code: str,
+        language: str,
+        stop_event: threading.Event,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Exécute un test case (dans un thread du pool) et construit son résultat
+        """
+        with _EXECUTION_SLOTS:
+            if stop_event.is_set():
+                return None
+            result = self._run_with_input(code, test_case['input_content'], language)
+        
+        return self._build_result(idx, test_case, result)
+    
+    def _build_result(self, idx: int, test_case: Dict[str, str], result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Compare la sortie obtenue à la sortie attendue pour un test case
+        """
+        expected_output = test_case['expected_output']
+        
+        if not result['success']:
+            if result.get('infra_error'):
+                self._infra_failures.append(idx)
+            # Erreur d'exécution
+            return {
+                'test_number': idx,
+                'passed': False,
+                'error': result['error'],
+                'expected_output': expected_output,
+                'user_output': None,
+                'execution_time': result['execution_time']
+            }
+        
+        # Comparer les outputs
+        user_output = result['output']
+        is_correct = self._compare_outputs(
+            user_output, expected_output, test_case.get('expected_lines')
+        )
+        
+        return {
+            'test_number': idx,
+            'passed': is_correct,
+            'error': None,
+            'expected_output': expected_output if not is_correct else None,
+            'user_output': user_output,
+            'execution_time': result['execution_time']
+        }
+    
+    def _skipped_result(self, idx: int) -> Dict[str, Any]:
+        """Résultat d'un test non exécuté après un arrêt anticipé"""
+        return {
+            'test_number': idx,
+            'passed': False,
+            'skipped': True,
+            'error': None,
+            'expected_output': None,
+            'user_output': None,
+            'execution_time': 0
+        }
     
     def _run_with_input(self, code: str, input_data: str, language: str = 'python') -> Dict[str, Any]:
         """
@@ -177,21 +384,81 @@ const char* input() {{
 
         return injected_code
 
-    def _compare_outputs(self, user_output: str, expected_output: str) -> bool:
+    def _stdin_program(self, code: str, language: str = 'python') -> str:
+        """
+        Prépare le code pour le mode batch : l'input n'est pas injecté dans
+        le programme, il est lu sur l'entrée standard. La fonction input()
+        fournie aux programmes JavaScript et C reste disponible.
+        """
+        normalized_code = code.replace('\t', '    ')
+
+        if language == 'python':
+            return f"""import sys
+
+# Code utilisateur
+{normalized_code}
+"""
+        elif language == 'javascript':
+            return f"""const _input_lines = require('fs').readFileSync(0, 'utf8').split('\\n').filter(l => l.trim());
+let _input_index = 0;
+
+function input() {{
+    if (_input_index < _input_lines.length) {{
+        return _input_lines[_input_index++];
+    }}
+    return '';
+}}
+
+// Code utilisateur
+{normalized_code}
+"""
+        elif language == 'c':
+            return f"""#include <stdio.h>
+#include <string.h>
+
+static char _input_line[4096];
+
+const char* input() {{
+    if (fgets(_input_line, sizeof(_input_line), stdin) == NULL) {{
+        _input_line[0] = '\\0';
+        return _input_line;
+    }}
+    size_t _len = strlen(_input_line);
+    if (_len > 0 && _input_line[_len - 1] == '\\n') {{
+        _input_line[_len - 1] = '\\0';
+    }}
+    return _input_line;
+}}
+
+// Code utilisateur
+{normalized_code}
+"""
+        return normalized_code
+
+    def _compare_outputs(
+        self,
+        user_output: str,
+        expected_output: str,
+        expected_lines: Optional[Sequence[str]] = None,
+    ) -> bool:
         """
         Compare deux outputs en ignorant les espaces/lignes vides superflus
         
         Args:
             user_output: Output de l'utilisateur
             expected_output: Output attendu
+            expected_lines: Output attendu déjà normalisé (bundle de tests)
         
         Returns:
             True si les outputs correspondent
         """
         
         # Normaliser les outputs
-        user_lines = [line.strip() for line in user_output.strip().split('\n') if line.strip()]
-        expected_lines = [line.strip() for line in expected_output.strip().split('\n') if line.strip()]
+        user_lines = normalize_lines(user_output)
+        if expected_lines is None:
+            expected_lines = normalize_lines(expected_output)
+        else:
+            expected_lines = list(expected_lines)
         
         is_correct = user_lines == expected_lines
         
@@ -0,0 +1,71 @@
+# api/conditional.py
+
+"""
+GET conditionnels (ETag / If-None-Match, Last-Modified / If-Modified-Since).
+
+Chaque vue décrit la version de ce qu'elle renvoie avec des valeurs peu
+coûteuses à lire (updated_at, compteurs de version, paramètres de la
+requête) ; l'ETag est un hash de ces valeurs. Si le client a déjà cette
+version, la vue répond 304 sans rien charger d'autre ni sérialiser :
+
+    validators = conditional.Validators(request, challenge.pk, challenge.updated_at)
+    not_modified = validators.not_modified(request)
+    if not_modified is not None:
+        return not_modified
+    ...
+    return validators.apply(Response(data))
+
+L'ETag inclut toujours l'utilisateur, le chemin, la query string et le
+format de réponse : deux représentations différentes n'ont jamais le même.
+Last-Modified n'est envoyé que si la vue fournit une date qui change avec
+tout son contenu.
+"""
+
+import hashlib
+from datetime import datetime
+from typing import Optional
+
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(*parts) -> str:
+    """ETag (entre guillemets) à partir de valeurs dont repr() est stable"""
+    return quote_etag(hashlib.sha1(repr(parts).encode('utf-8')).hexdigest())
+
+
+class Validators:
+    """ETag (et éventuellement Last-Modified) d'une réponse GET"""
+
+    def __init__(self, request, *parts, last_modified: Optional[datetime] = None):
+        self.etag = make_etag(
+            request.user.pk,
+            request.get_full_path(),
+            getattr(request, 'accepted_media_type', None),
+            *parts
+        )
+        self.last_modified = last_modified
+
+    def not_modified(self, request):
+        """Réponse 304 si le client a déjà cette version, sinon None"""
+        if request.method not in ('GET', 'HEAD'):
+            return None
+        response = get_conditional_response(
+            request,
+            etag=self.etag,
+            last_modified=int(self.last_modified.timestamp()) if self.last_modified else None,
+        )
+        if response is not None:
+            self.apply(response)
+        return response
+
+    def apply(self, response):
+        """Ajoute les en-têtes de validation à la réponse"""
+        if 200 <= response.status_code < 300 or response.status_code == 304:
+            response['ETag'] = self.etag
+            if self.last_modified:
+                response['Last-Modified'] = http_date(self.last_modified.timestamp())
+        # Réponses propres à l'utilisateur : revalidées à chaque fois, jamais partagées
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ('Authorization',))
+        return response
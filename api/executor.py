@@ -1,6 +1,9 @@
-import os
 import requests
-from typing import Dict, Any
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Dict, Any, List, Optional
+import threading
+import time
 import uuid
 from django.conf import settings
 
@@ -12,6 +15,180 @@ EXECUTOR_API_URL = settings.EXECUTOR_API_URL
 
 SUPPORTED_LANGUAGES = ['python', 'c', 'javascript']
 
+# ──────────────────────────────────────────────────────────────────────────────
+# Session HTTP partagée par tout le processus : les connexions (TCP + TLS) vers
+# l'API d'exécution sont gardées ouvertes (keep-alive) et réutilisées.
+# Seules les erreurs de connexion sont retentées : une requête dont la lecture
+# a échoué a peut-être déjà exécuté le code, on ne la renvoie pas.
+# ──────────────────────────────────────────────────────────────────────────────
+_session = None
+_session_lock = threading.Lock()
+_pool_stats = {'requests': 0, 'in_flight': 0, 'max_in_flight': 0}
+
+
+class MeasuredSemaphore:
+    """
+    Sémaphore (utilisé avec `with`) qui mesure les attentes : nombre
+    d'acquisitions qui ont dû attendre, durée totale et durée maximale.
+    """
+
+    def __init__(self, value: int):
+        self.size = max(1, value)
+        self._semaphore = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self._stats = {'acquisitions': 0, 'waits': 0, 'wait_seconds': 0.0, 'max_wait_seconds': 0.0}
+
+    def __enter__(self):
+        waited = None
+        if not self._semaphore.acquire(blocking=False):
+            start = time.monotonic()
+            self._semaphore.acquire()
+            waited = time.monotonic() - start
+        with self._lock:
+            self._stats['acquisitions'] += 1
+            if waited is not None:
+                self._stats['waits'] += 1
+                self._stats['wait_seconds'] += waited
+                self._stats['max_wait_seconds'] = max(self._stats['max_wait_seconds'], waited)
+        return self
+
+    def __exit__(self, *exc_info):
+        self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats['wait_seconds'] = round(stats['wait_seconds'], 3)
+        stats['max_wait_seconds'] = round(stats['max_wait_seconds'], 3)
+        stats['size'] = self.size
+        return stats
+
+
+# Une connexion du pool par requête en cours : au-delà de EXECUTOR_POOL_SIZE,
+# la requête attend ici (le pool urllib3, de même taille, ne bloque jamais)
+_connection_slots = MeasuredSemaphore(settings.EXECUTOR_POOL_SIZE)
+
+# Plafond global d'exécutions simultanées, partagé par toutes les soumissions
+# traitées dans ce processus (chaque worker gunicorn a le sien) : voir
+# api/challenge_validator.py.
+EXECUTION_SLOTS = MeasuredSemaphore(settings.EXECUTOR_GLOBAL_CONCURRENCY)
+
+
+def get_session() -> requests.Session:
+    """Retourne la session HTTP du processus (créée au premier appel)"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            retries = Retry(
+                total=settings.EXECUTOR_CONNECT_RETRIES,
+                connect=settings.EXECUTOR_CONNECT_RETRIES,
+                read=0,
+                status=0,
+                other=0,
+                backoff_factor=settings.EXECUTOR_RETRY_BACKOFF,
+                allowed_methods=None,
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=settings.EXECUTOR_POOL_SIZE,
+                pool_block=True,
+                max_retries=retries,
+            )
+            session = requests.Session()
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session = session
+        return _session
+
+
+def _post(payload: Dict[str, Any], read_timeout: float) -> requests.Response:
+    """POST vers l'API d'exécution via la session partagée"""
+    session = get_session()
+    with _connection_slots:
+        with _session_lock:
+            _pool_stats['requests'] += 1
+            _pool_stats['in_flight'] += 1
+            _pool_stats['max_in_flight'] = max(_pool_stats['max_in_flight'], _pool_stats['in_flight'])
+        try:
+            return session.post(
+                EXECUTOR_API_URL,
+                json=payload,
+                timeout=(settings.EXECUTOR_CONNECT_TIMEOUT, read_timeout),
+            )
+        finally:
+            with _session_lock:
+                _pool_stats['in_flight'] -= 1
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """
+    Statistiques du pool de connexions (pour le monitoring). Les attentes
+    sont mesurées : `waits` / `wait_seconds` pour une connexion du pool,
+    `execution_slots` pour le plafond EXECUTOR_GLOBAL_CONCURRENCY.
+    """
+    connections = 0
+    pooled_requests = 0
+    with _session_lock:
+        stats = dict(_pool_stats)
+        session = _session
+    connection_waits = _connection_slots.stats()
+    if session is not None:
+        adapter = session.get_adapter(EXECUTOR_API_URL)
+        pools = adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                connections += pool.num_connections
+                pooled_requests += pool.num_requests
+
+    stats.update({
+        'waits': connection_waits['waits'],
+        'wait_seconds': connection_waits['wait_seconds'],
+        'max_wait_seconds': connection_waits['max_wait_seconds'],
+        'execution_slots': EXECUTION_SLOTS.stats(),
+        'pool_size': settings.EXECUTOR_POOL_SIZE,
+        'connections_opened': connections,
+        'reuse_ratio': round(1 - connections / pooled_requests, 3) if pooled_requests else None,
+    })
+    return stats
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Mode batch : le code est envoyé une seule fois avec la liste des entrées
+# standard, l'API renvoie un résultat par entrée (une seule compilation en C).
+#
+#   Requête  : {"language": ..., "code": ..., "inputs": ["...", "..."]}
+#   Réponse  : {"results": [{"output": ..., "error": ..., "execution_time": ...}, ...]}
+#
+# EXECUTOR_BATCH_MODE = "auto" : le support est détecté à la première réponse.
+# Si l'API ne le supporte pas, on repasse en appels unitaires et on ne
+# retente le batch qu'après BATCH_RECHECK_INTERVAL secondes.
+# EXECUTOR_BATCH_MODE = "off" : toujours un appel par test case.
+# ──────────────────────────────────────────────────────────────────────────────
+BATCH_RECHECK_INTERVAL = 600
+BATCH_UNSUPPORTED_STATUS = (400, 404, 405, 415, 422, 501)
+
+_batch_lock = threading.Lock()
+_batch_support = {'supported': None, 'checked_at': 0.0}
+
+
+def batch_mode_available() -> bool:
+    """Indique si le mode batch doit être tenté pour le prochain appel"""
+    if getattr(settings, 'EXECUTOR_BATCH_MODE', 'auto') == 'off':
+        return False
+    with _batch_lock:
+        if _batch_support['supported'] is False:
+            return time.monotonic() - _batch_support['checked_at'] >= BATCH_RECHECK_INTERVAL
+        return True
+
+
+def _set_batch_support(supported: bool):
+    with _batch_lock:
+        if _batch_support['supported'] != supported:
+            print(f"[EXEC] Mode batch {'supporté' if supported else 'non supporté'} par l'API d'exécution")
+        _batch_support['supported'] = supported
+        _batch_support['checked_at'] = time.monotonic()
+
 # ──────────────────────────────────────────────────────────────────────────────
 # Ancien code d'exécution locale (désactivé, conservé pour référence)
 # ──────────────────────────────────────────────────────────────────────────────
@@ -106,6 +283,7 @@ class CodeExecutor:
 
         Returns dict avec:
             success (bool), output (str|None), error (str|None), execution_time (float)
+            et infra_error (True) si l'API d'exécution n'a pas pu être jointe
         """
         if language not in SUPPORTED_LANGUAGES:
             return {
@@ -124,11 +302,7 @@ class CodeExecutor:
         print(f"[EXEC-{self.execution_id}] Payload length: {len(code)}")
 
         try:
-            response = requests.post(
-                EXECUTOR_API_URL,
-                json=payload,
-                timeout=self.timeout + 5,
-            )
+            response = _post(payload, read_timeout=self.timeout + 5)
             response.raise_for_status()
             data = response.json()
 
@@ -154,6 +328,7 @@ class CodeExecutor:
                 'output': None,
                 'error': f"L'API d'exécution n'a pas répondu dans le délai imparti ({self.timeout + 5}s)",
                 'execution_time': 0,
+                'infra_error': True,
             }
         except requests.exceptions.RequestException as e:
             print(f"[EXEC-{self.execution_id}] Erreur réseau : {e}")
@@ -162,6 +337,7 @@ class CodeExecutor:
                 'output': None,
                 'error': f"Erreur de connexion à l'API d'exécution : {str(e)}",
                 'execution_time': 0,
+                'infra_error': True,
             }
         except Exception as e:
             print(f"[EXEC-{self.execution_id}] Erreur inattendue : {e}")
@@ -170,4 +346,69 @@ class CodeExecutor:
                 'output': None,
                 'error': f"Erreur inattendue : {str(e)}",
                 'execution_time': 0,
+                'infra_error': True,
             }
+
+    def execute_batch(self, code: str, language: str, inputs: List[str]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Envoie le code une seule fois avec plusieurs entrées standard.
+
+        Returns:
+            Une liste de résultats normalisés (même format que execute()),
+            dans l'ordre de `inputs`, ou None si l'API ne supporte pas le
+            mode batch (l'appelant doit alors faire un appel par entrée).
+        """
+        if language not in SUPPORTED_LANGUAGES or not batch_mode_available():
+            return None
+
+        payload = {
+            'language': language,
+            'code': code,
+            'inputs': list(inputs),
+        }
+        # Chaque entrée peut consommer tout le timeout côté API
+        request_timeout = self.timeout * len(inputs) + 5
+
+        print(f"[EXEC-{self.execution_id}] Envoi batch vers API externe (langage={language}, entrées={len(inputs)})")
+
+        try:
+            response = _post(payload, read_timeout=request_timeout)
+            if response.status_code in BATCH_UNSUPPORTED_STATUS:
+                _set_batch_support(False)
+                return None
+            response.raise_for_status()
+            data = response.json()
+
+            items = data.get('results') if isinstance(data, dict) else None
+            if not isinstance(items, list) or len(items) != len(inputs):
+                # L'API a ignoré "inputs" : elle ne connaît pas le protocole batch
+                _set_batch_support(False)
+                return None
+            _set_batch_support(True)
+
+            results = []
+            for item in items:
+                error = item.get('error')
+                results.append({
+                    'success': error is None,
+                    'output': item.get('output'),
+                    'error': error,
+                    'execution_time': round(float(item.get('execution_time', 0) or 0), 3),
+                })
+            print(f"[EXEC-{self.execution_id}] Réponse batch reçue — {sum(r['success'] for r in results)}/{len(results)} exécutions sans erreur")
+            return results
+
+        except requests.exceptions.Timeout:
+            print(f"[EXEC-{self.execution_id}] Timeout de l'API externe (batch)")
+            error = f"L'API d'exécution n'a pas répondu dans le délai imparti ({request_timeout}s)"
+        except requests.exceptions.RequestException as e:
+            print(f"[EXEC-{self.execution_id}] Erreur réseau (batch) : {e}")
+            error = f"Erreur de connexion à l'API d'exécution : {str(e)}"
+        except Exception as e:
+            print(f"[EXEC-{self.execution_id}] Erreur inattendue (batch) : {e}")
+            error = f"Erreur inattendue : {str(e)}"
+
+        return [
+            {'success': False, 'output': None, 'error': error, 'execution_time': 0, 'infra_error': True}
+            for _ in inputs
+        ]
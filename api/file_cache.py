@@ -0,0 +1,214 @@
+# api/file_cache.py
+
+"""
+Cache local des fichiers texte stockés sur Cloudinary
+(inputs/outputs des test cases, descriptions, templates).
+
+Une version Cloudinary (public_id + version) ne change jamais de contenu :
+la clé est donc dérivée de ces deux valeurs. Lecture dans l'ordre :
+mémoire (LRU borné en octets) -> disque (CLOUDINARY_CACHE_DIR) -> région
+"challenges" du cache partagé (fichier déjà téléchargé par un autre
+conteneur) -> réseau.
+
+Le cache disque est borné à CLOUDINARY_CACHE_DISK_BYTES : quand les
+écritures depuis le dernier passage dépassent un dixième du budget, le
+répertoire est parcouru et les fichiers les moins récemment utilisés
+(mtime, mise à jour à chaque lecture) sont supprimés.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from typing import Optional
+
+import requests
+from django.conf import settings
+
+from . import cache_regions
+from .lru import LRUCache
+
+
+class CloudinaryFetchError(Exception):
+    """Le fichier n'a pas pu être téléchargé (code HTTP différent de 200)"""
+
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+_memory = LRUCache(
+    max_bytes=settings.CLOUDINARY_CACHE_MEMORY_BYTES,
+    sizeof=lambda text: len(text.encode('utf-8')),
+)
+
+
+def decode_text(content: bytes) -> str:
+    """Décode un fichier texte (UTF-8) et normalise les retours à la ligne"""
+    text = content.decode("utf-8")
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def cache_key(file_field) -> Optional[str]:
+    """Clé de cache d'un fichier Cloudinary, ou None si le fichier n'est pas identifiable"""
+    public_id = getattr(file_field, 'public_id', None)
+    if not public_id:
+        return None
+    resource_type = getattr(file_field, 'resource_type', None) or ''
+    upload_type = getattr(file_field, 'type', None) or ''
+    version = getattr(file_field, 'version', None) or ''
+    identity = f"{resource_type}/{upload_type}/{public_id}@v{version}"
+    return hashlib.sha256(identity.encode('utf-8')).hexdigest()
+
+
+def _disk_path(key: str) -> str:
+    return os.path.join(settings.CLOUDINARY_CACHE_DIR, key[:2], f"{key}.txt")
+
+
+def _read_disk(key: str) -> Optional[str]:
+    path = _disk_path(key)
+    try:
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            text = f.read()
+    except (OSError, UnicodeDecodeError):
+        return None
+    try:
+        # Fichier utilisé : il passe après les autres dans l'ordre de suppression
+        os.utime(path)
+    except OSError:
+        pass
+    return text
+
+
+_prune_lock = threading.Lock()
+# None : aucun passage depuis le démarrage (le répertoire peut déjà dépasser le budget)
+_written_since_prune = None
+
+
+def prune_disk(max_bytes: Optional[int] = None) -> int:
+    """
+    Supprime les fichiers les moins récemment utilisés jusqu'à ce que le
+    cache disque tienne dans 90 % de `max_bytes` (CLOUDINARY_CACHE_DISK_BYTES).
+
+    Returns:
+        Nombre de fichiers supprimés
+    """
+    max_bytes = settings.CLOUDINARY_CACHE_DISK_BYTES if max_bytes is None else max_bytes
+    if max_bytes <= 0:
+        return 0
+
+    files = []
+    total = 0
+    try:
+        subdirs = [entry.path for entry in os.scandir(settings.CLOUDINARY_CACHE_DIR) if entry.is_dir()]
+    except OSError:
+        return 0
+    for subdir in subdirs:
+        try:
+            for entry in os.scandir(subdir):
+                if entry.is_file():
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+        except OSError:
+            continue
+    if total <= max_bytes:
+        return 0
+
+    removed = 0
+    target = max_bytes * 9 // 10
+    for _, size, path in sorted(files):
+        if total <= target:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            # Déjà supprimé par un autre worker
+            pass
+        total -= size
+        removed += 1
+    print(f"[FILE-CACHE] Cache disque réduit : {removed} fichier(s) supprimé(s)")
+    return removed
+
+
+def _maybe_prune(written: int):
+    global _written_since_prune
+    budget = settings.CLOUDINARY_CACHE_DISK_BYTES
+    if budget <= 0:
+        return
+    with _prune_lock:
+        if _written_since_prune is not None:
+            _written_since_prune += written
+            if _written_since_prune < budget // 10:
+                return
+        _written_since_prune = 0
+        prune_disk(budget)
+
+
+def _write_disk(key: str, text: str):
+    path = _disk_path(key)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Écriture atomique : un autre worker ne lit jamais un fichier à moitié écrit
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"[FILE-CACHE] Écriture disque impossible ({key[:12]}) : {e}")
+        return
+    _maybe_prune(len(text.encode('utf-8')))
+
+
+def fetch_text(file_field) -> str:
+    """
+    Retourne le contenu texte (UTF-8, retours à la ligne normalisés)
+    d'un fichier Cloudinary, en passant par le cache.
+
+    Raises:
+        CloudinaryFetchError si Cloudinary ne répond pas 200,
+        requests.RequestException en cas d'erreur réseau
+    """
+    key = cache_key(file_field)
+    if key:
+        text = _memory.get(key)
+        if text is not None:
+            return text
+        text = _read_disk(key)
+        if text is not None:
+            _memory.set(key, text)
+            return text
+        text = cache_regions.region('challenges').get(('file', key))
+        if text is not None:
+            _memory.set(key, text)
+            _write_disk(key, text)
+            return text
+
+    response = requests.get(file_field.url, timeout=10)
+    if response.status_code != 200:
+        raise CloudinaryFetchError(response.status_code)
+
+    text = decode_text(response.content)
+
+    if key:
+        _memory.set(key, text)
+        _write_disk(key, text)
+        cache_regions.region('challenges').set(('file', key), text)
+    return text
+
+
+def invalidate(file_field):
+    """Retire un fichier du cache (mémoire et disque)"""
+    key = cache_key(file_field)
+    if not key:
+        return
+    _memory.delete(key)
+    cache_regions.region('challenges').delete(('file', key))
+    try:
+        os.remove(_disk_path(key))
+    except OSError:
+        pass
+
+
+def get_stats() -> dict:
+    return _memory.stats()
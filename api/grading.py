@@ -0,0 +1,123 @@
+# api/grading.py
+
+"""
+Correction d'une soumission officielle de challenge.
+
+Utilisée par la vue de soumission (mode synchrone) et par le worker de la
+file de soumissions (run_submission_worker).
+"""
+
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+
+from . import result_cache
+from .challenge_validator import ChallengeValidator
+from .models import UserChallengeAttempt, UserCodeSave
+from .test_bundle import get_bundle
+
+logger = logging.getLogger(__name__)
+
+
+def grade_challenge_submission(user, challenge, code, language, submitted_at=None, on_result=None):
+    """
+    Corrige la soumission et met à jour la tentative de l'utilisateur
+    (système d'XP progressif).
+
+    Args:
+        submitted_at: Date de la soumission (mise en file) ; maintenant par défaut
+        on_result: Transmis au validateur (progression test par test)
+
+    Returns:
+        (payload, code HTTP) : le corps de la réponse de soumission
+    """
+    submitted_at = submitted_at or timezone.now()
+
+    bundle = get_bundle(challenge)
+    if not bundle.cases:
+        return {'error': 'Ce challenge ne contient pas encore de tests.'}, status.HTTP_400_BAD_REQUEST
+
+    attempts = UserChallengeAttempt.objects.filter(user=user, challenge=challenge)
+    if not attempts.exists():
+        return {'error': "Vous devez d'abord rejoindre ce challenge"}, status.HTTP_403_FORBIDDEN
+
+    # Exécuter les tests sur le code soumis (hors transaction : aucune ligne
+    # n'est verrouillée pendant l'exécution)
+    validator = ChallengeValidator(timeout=10)
+    result = validator.validate_submission(
+        code, bundle.test_data(), language,
+        on_result=on_result,
+        cache_key=result_cache.make_key(bundle, code, language, validator.timeout)
+    )
+
+    passed_tests = result.get('passed_tests', 0)
+    total_tests = result.get('total_tests', len(bundle))
+
+    # Calcul de l'XP obtenue basé sur chaque test case réussi
+    xp_current_submit = bundle.xp_for(result.get('results', []))
+
+    # Résultat appliqué à la tentative relue sous verrou : deux corrections
+    # simultanées (double envoi, workers) s'appliquent l'une après l'autre
+    with transaction.atomic():
+        attempt = attempts.select_for_update().first()
+        if attempt is None:
+            return {'error': "Vous devez d'abord rejoindre ce challenge"}, status.HTTP_403_FORBIDDEN
+
+        # Incrémenter le nombre de tentatives pour l'utilisateur
+        attempt.attempts_count += 1
+
+        validated = xp_current_submit >= challenge.xp_required
+        if validated:
+            # Mise à jour de l'XP : on ne diminue jamais l'XP
+            if xp_current_submit > attempt.xp_earned:
+                attempt.xp_earned = xp_current_submit
+
+            # Mise à jour du temps de complétion à la première réussite
+            if attempt.completed_at is None:
+                attempt.completed_at = submitted_at
+                time_diff = attempt.completed_at - attempt.started_at
+                attempt.completion_time = int(time_diff.total_seconds())
+
+            # Statut → terminé si tous les tests sont passés
+            if passed_tests == total_tests:
+                attempt.status = "completed"
+
+        # total_xp de l'utilisateur et classement global suivent attempt.save()
+        attempt.save()
+
+    # Si le minimum d'XP requis pour valider n'est pas atteint
+    if not validated:
+        return {
+            'success': False,
+            'message': (
+                f"Il faut au moins {challenge.xp_required} XP pour valider la soumission. "
+                f"Actuellement obtenu : {xp_current_submit} XP."
+            ),
+            'passed': passed_tests,
+            'failed': total_tests - passed_tests
+        }, status.HTTP_200_OK
+
+    # Si XP minimum requis est atteint → on sauvegarde le code utilisateur
+    if attempt.xp_earned >= challenge.xp_required:
+        UserCodeSave.objects.update_or_create(
+            user=user,
+            challenge=challenge,
+            defaults={'code': code}
+        )
+
+    # Calculer le XP total possible pour ce challenge
+    xp_total_possible = bundle.xp_total
+
+    print(f"=== [grade_challenge_submission] Response ===\nSuccess: True\nPassed: {passed_tests}\nFailed: {total_tests - passed_tests}\nXP Earned: {attempt.xp_earned}/{xp_total_possible}\nStatus: {attempt.status}\n===")
+    return {
+        'success': True,
+        'passed': passed_tests,
+        'failed': total_tests - passed_tests,
+        'xp_earned': attempt.xp_earned,
+        'xp_total': xp_total_possible,
+        'completion_time': attempt.completion_time,
+        'status': attempt.status,
+        'message': f"Soumission enregistrée. XP total : {attempt.xp_earned}/{xp_total_possible}"
+    }, status.HTTP_200_OK
@@ -0,0 +1,223 @@
+# api/leaderboard.py
+
+"""
+Lecture du classement global depuis la table LeaderboardEntry.
+
+Ordre : total_xp décroissant, puis total_completion_time croissant (les
+utilisateurs sans challenge terminé en dernier), puis username. Le rang est
+un rang "compétition" : deux utilisateurs avec le même XP et le même temps
+partagent le rang, le suivant saute les places (1, 1, 3...).
+
+Une page ne lit que ses lignes dans l'ordre de l'index ; le rang de la
+première ligne, comme celui d'un utilisateur (get_global_rank, utilisé par
+my_stats et le profil), est donné par un COUNT des lignes strictement devant.
+L'ETag du classement global est une version stockée (GlobalLeaderboardVersion),
+incrémentée par chaque écriture des entrées ou des inscriptions.
+
+Le classement d'un challenge (get_challenge_page) est calculé en SQL avec
+une fonction de fenêtre, page par page, et gardé en mémoire par worker
+pour la version courante du classement (Challenge.leaderboard_version),
+ainsi que dans la région "leaderboards" du cache partagé.
+"""
+
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.db.models import Case, F, IntegerField, Q, Sum, When, Window
+from django.db.models.functions import Rank
+
+from . import cache_regions
+from .lru import LRUCache
+from .models import GlobalLeaderboardVersion, LeaderboardEntry, UserChallengeAttempt
+
+ORDERING = (
+    F('total_xp').desc(),
+    F('total_completion_time').asc(nulls_last=True),
+    'username',
+    'user_id',
+)
+
+
+def ranked_entries():
+    """Utilisateurs classés (au moins 1 XP)"""
+    return LeaderboardEntry.objects.filter(total_xp__gt=0)
+
+
+def _rank_key(entry):
+    return entry.total_xp, entry.total_completion_time
+
+
+def _same_key(entry) -> Q:
+    if entry.total_completion_time is None:
+        same_time = Q(total_completion_time__isnull=True)
+    else:
+        same_time = Q(total_completion_time=entry.total_completion_time)
+    return Q(total_xp=entry.total_xp) & same_time
+
+
+def _ahead_of(entry) -> Q:
+    """Lignes strictement mieux classées (plus d'XP, ou même XP et temps plus court)"""
+    if entry.total_completion_time is None:
+        faster = Q(total_completion_time__isnull=False)
+    else:
+        faster = Q(total_completion_time__lt=entry.total_completion_time)
+    return Q(total_xp__gt=entry.total_xp) | (Q(total_xp=entry.total_xp) & faster)
+
+
+def _before(entry) -> Q:
+    """Lignes affichées avant `entry` (même critères, puis username)"""
+    return _ahead_of(entry) | (_same_key(entry) & (
+        Q(username__lt=entry.username)
+        | Q(username=entry.username, user_id__lt=entry.user_id)
+    ))
+
+
+def rank_of(entry, dense: bool = False) -> int:
+    """
+    Rang d'une ligne : 1 + nombre de lignes strictement devant
+    (rang dense : nombre de couples (XP, temps) distincts devant)
+    """
+    ahead = ranked_entries().filter(_ahead_of(entry))
+    if dense:
+        ahead = ahead.order_by().values('total_xp', 'total_completion_time').distinct()
+    return ahead.count() + 1
+
+
+def position_of(entry) -> int:
+    """Index (à partir de 0) de la ligne dans le classement affiché"""
+    return ranked_entries().filter(_before(entry)).count()
+
+
+def get_entry(user_id) -> Optional[LeaderboardEntry]:
+    return ranked_entries().filter(user_id=user_id).first()
+
+
+def get_stats_entry(user_id) -> LeaderboardEntry:
+    """Statistiques stockées d'un utilisateur (ligne vide s'il n'a aucune tentative)"""
+    entry = LeaderboardEntry.objects.filter(user_id=user_id).first()
+    return entry or LeaderboardEntry(user_id=user_id)
+
+
+def rank_for_entry(entry, dense: bool = False) -> Optional[int]:
+    """Rang d'une ligne, ou None si elle n'est pas classée (aucun XP)"""
+    if entry is None or entry.total_xp <= 0:
+        return None
+    return rank_of(entry, dense=dense)
+
+
+def get_global_rank(user_id, dense: bool = False) -> Optional[int]:
+    """
+    Rang global d'un utilisateur, identique à celui du leaderboard global
+    (None s'il n'est pas classé : aucun XP)
+    """
+    return rank_for_entry(get_entry(user_id), dense=dense)
+
+
+def global_version() -> int:
+    """Version du classement global (ETag), incrémentée à chaque écriture"""
+    return GlobalLeaderboardVersion.current()
+
+
+def get_page(offset: int, limit: int) -> List[Dict[str, Any]]:
+    """Lignes [offset, offset + limit) du classement, avec leur rang"""
+    entries = list(
+        ranked_entries()
+        .select_related('user')
+        .order_by(*ORDERING)[offset:offset + limit]
+    )
+
+    rows = []
+    rank = None
+    prev_key = None
+    for idx, entry in enumerate(entries):
+        key = _rank_key(entry)
+        if rank is None:
+            rank = rank_of(entry)
+        elif key != prev_key:
+            rank = offset + idx + 1
+        prev_key = key
+
+        rows.append({
+            'rank': rank,
+            'user_id': entry.user_id,
+            'username': entry.username,
+            'nom': entry.user.nom,
+            'prenom': entry.user.prenom,
+            'total_xp': entry.total_xp,
+            'challenges_joined': entry.user.challenges_joined,
+            'challenges_completed': entry.challenges_completed,
+            'total_completion_time': entry.total_completion_time,
+        })
+    return rows
+
+
+_challenge_pages = LRUCache(
+    max_entries=settings.CHALLENGE_LEADERBOARD_CACHE_ENTRIES,
+    ttl=settings.CHALLENGE_LEADERBOARD_CACHE_TTL,
+)
+
+
+def _build_challenge_page(challenge, offset: int, limit: int) -> Dict[str, Any]:
+    attempts = UserChallengeAttempt.objects.filter(challenge=challenge)
+
+    rows = list(
+        attempts.annotate(
+            # Rang parmi les tentatives de même statut : les terminées sont
+            # classées d'abord, leur rang est donc leur place dans la liste
+            rank=Window(
+                expression=Rank(),
+                partition_by=[F('status')],
+                order_by=[F('xp_earned').desc(), F('completion_time').asc(nulls_last=True)],
+            ),
+        ).order_by(
+            # Tri : completed d'abord, puis XP desc, puis temps asc
+            Case(
+                When(status='completed', then=0),
+                default=1,
+                output_field=IntegerField()
+            ),
+            '-xp_earned',
+            F('completion_time').asc(nulls_last=True),
+            'started_at',
+            'id',
+        ).values(
+            'rank', 'user_id', 'xp_earned', 'completion_time', 'completed_at', 'status',
+            username=F('user__username'),
+            nom=F('user__nom'),
+            prenom=F('user__prenom'),
+        )[offset:offset + limit]
+    )
+    for row in rows:
+        if row['status'] != 'completed':
+            row['rank'] = None  # Pas de rang si pas complété
+
+    return {
+        'challenge': {
+            'id': challenge.id,
+            'title': challenge.title,
+            'xp_reward': challenge.test_cases.aggregate(total=Sum('xp_reward'))['total'] or 0,
+        },
+        'total_participants': attempts.count(),
+        'rows': rows,
+    }
+
+
+def get_challenge_page(challenge, offset: int, limit: int) -> Dict[str, Any]:
+    """
+    Page [offset, offset + limit) du classement d'un challenge, depuis le
+    cache du worker si le classement et les tests n'ont pas changé
+    """
+    key = (challenge.pk, challenge.leaderboard_version, challenge.tests_version, offset, limit)
+    page = _challenge_pages.get(key)
+    if page is None:
+        page = cache_regions.region('leaderboards').get_or_set(
+            ('challenge',) + key, lambda: _build_challenge_page(challenge, offset, limit)
+        )
+        # Les pages des versions précédentes ne servent plus
+        _challenge_pages.discard_where(lambda k: k[0] == challenge.pk and k[1:3] != key[1:3])
+        _challenge_pages.set(key, page)
+    return page
+
+
+def get_stats() -> dict:
+    return _challenge_pages.stats()
@@ -0,0 +1,56 @@
+# api/management/commands/backfill_testcase_contents.py
+
+"""
+Copie en base le contenu des fichiers input/output des test cases
+existants (uploadés avant le stockage en base).
+
+    python manage.py backfill_testcase_contents
+    python manage.py backfill_testcase_contents --challenge 12 --force
+"""
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from api import file_cache
+from api.models import TestCase
+
+
+class Command(BaseCommand):
+    help = "Enregistre en base le contenu des fichiers des test cases (depuis Cloudinary)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--challenge', type=int, help="Limiter à un challenge")
+        parser.add_argument('--force', action='store_true', help="Recopier même les test cases déjà remplis")
+
+    def handle(self, *args, **options):
+        test_cases = TestCase.objects.order_by('challenge_id', 'order')
+        if options['challenge']:
+            test_cases = test_cases.filter(challenge_id=options['challenge'])
+        if not options['force']:
+            test_cases = test_cases.filter(Q(input_sha256='') | Q(output_sha256=''))
+
+        updated = 0
+        failed = 0
+        for test_case in test_cases.iterator():
+            try:
+                for side in TestCase.STORED_SIDES:
+                    if test_case.has_stored_contents(side) and not options['force']:
+                        continue
+                    file_field = getattr(test_case, f'{side}_file')
+                    text = file_cache.fetch_text(file_field) if file_field else ''
+                    test_case.store_contents(side, text)
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f"[BACKFILL] Test case {test_case.id} : échec ({e})")
+                continue
+
+            # update() direct : le contenu ne change pas, inutile de repasser par save()
+            TestCase.objects.filter(pk=test_case.pk).update(**{
+                f'{side}_{field}': getattr(test_case, f'{side}_{field}')
+                for side in TestCase.STORED_SIDES
+                for field in ('text', 'blob', 'size', 'sha256')
+            })
+            updated += 1
+            self.stdout.write(f"[BACKFILL] Test case {test_case.id} ({test_case.input_size} / {test_case.output_size} octets)")
+
+        self.stdout.write(self.style.SUCCESS(f"{updated} test case(s) mis à jour, {failed} échec(s)"))
@@ -0,0 +1,23 @@
+# api/management/commands/rebuild_leaderboard.py
+
+"""
+Reconstruit le classement global (table LeaderboardEntry) depuis les
+tentatives. À lancer après une suppression de challenge ou une
+modification directe des tentatives en base.
+
+    python manage.py rebuild_leaderboard
+"""
+
+from django.core.management.base import BaseCommand
+
+from api.models import LeaderboardEntry
+
+
+class Command(BaseCommand):
+    help = "Reconstruit le classement global depuis les tentatives des utilisateurs"
+
+    def handle(self, *args, **options):
+        written, deleted = LeaderboardEntry.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"Classement reconstruit : {written} ligne(s) écrite(s), {deleted} supprimée(s)"
+        ))
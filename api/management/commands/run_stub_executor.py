@@ -0,0 +1,154 @@
+# api/management/commands/run_stub_executor.py
+
+"""
+Exécuteur local minimal qui implémente le protocole de l'API d'exécution
+(appel unitaire et mode batch), pour tester le backend sans l'API externe.
+
+    python manage.py run_stub_executor --port 8001
+    EXECUTOR_API_URL=http://127.0.0.1:8001/ python manage.py runserver
+
+Avec --no-batch, le stub se comporte comme une API qui ignore "inputs",
+ce qui permet de vérifier le repli sur les appels unitaires.
+
+ATTENTION : le code est exécuté sans isolation, à n'utiliser qu'en local.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+
+class StubRunner:
+    """Compile (si besoin) une fois, puis exécute le programme pour chaque entrée"""
+
+    SOURCE_NAMES = {'python': 'main.py', 'javascript': 'main.js', 'c': 'main.c'}
+
+    def __init__(self, language, code, timeout):
+        self.language = language
+        self.code = code
+        self.timeout = timeout
+        self.workdir = tempfile.mkdtemp(prefix='stub_exec_')
+        self.command = None
+        self.compile_error = None
+
+    def prepare(self):
+        source = os.path.join(self.workdir, self.SOURCE_NAMES[self.language])
+        with open(source, 'w', encoding='utf-8') as f:
+            f.write(self.code)
+
+        if self.language == 'python':
+            self.command = [sys.executable, source]
+        elif self.language == 'javascript':
+            self.command = ['node', source]
+        else:
+            binary = os.path.join(self.workdir, 'main')
+            compiled = subprocess.run(
+                ['gcc', '-O2', '-o', binary, source, '-lm'],
+                capture_output=True, text=True, timeout=30
+            )
+            if compiled.returncode != 0:
+                self.compile_error = compiled.stderr or "Erreur de compilation"
+            self.command = [binary]
+
+    def run(self, stdin_data=''):
+        if self.compile_error:
+            return {'output': None, 'error': self.compile_error, 'execution_time': 0}
+
+        start = time.time()
+        try:
+            completed = subprocess.run(
+                self.command, input=stdin_data, capture_output=True,
+                text=True, timeout=self.timeout, cwd=self.workdir
+            )
+        except subprocess.TimeoutExpired:
+            return {
+                'output': None,
+                'error': f"Temps d'exécution dépassé ({self.timeout} secondes)",
+                'execution_time': self.timeout,
+            }
+        except FileNotFoundError as e:
+            return {'output': None, 'error': f"Interpréteur introuvable : {e}", 'execution_time': 0}
+
+        elapsed = round(time.time() - start, 3)
+        if completed.returncode != 0:
+            error = completed.stderr or f"Code de sortie {completed.returncode}"
+            return {'output': completed.stdout, 'error': error, 'execution_time': elapsed}
+        return {'output': completed.stdout, 'error': None, 'execution_time': elapsed}
+
+    def cleanup(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+def make_handler(timeout, batch_enabled, log):
+
+    class StubExecutorHandler(BaseHTTPRequestHandler):
+
+        def do_POST(self):
+            try:
+                length = int(self.headers.get('Content-Length') or 0)
+                payload = json.loads(self.rfile.read(length) or b'{}')
+            except ValueError:
+                return self._reply(400, {'error': 'JSON invalide'})
+
+            language = payload.get('language')
+            code = payload.get('code') or ''
+            if language not in StubRunner.SOURCE_NAMES:
+                return self._reply(400, {'error': f"Langage '{language}' non supporté"})
+
+            inputs = payload.get('inputs')
+            runner = StubRunner(language, code, timeout)
+            try:
+                runner.prepare()
+                if batch_enabled and isinstance(inputs, list):
+                    log(f"[STUB] batch {language} : {len(inputs)} entrée(s)")
+                    return self._reply(200, {'results': [runner.run(item) for item in inputs]})
+                log(f"[STUB] exécution {language}")
+                return self._reply(200, runner.run(''))
+            finally:
+                runner.cleanup()
+
+        def _reply(self, status_code, body):
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(status_code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubExecutorHandler
+
+
+class Command(BaseCommand):
+    help = "Lance un exécuteur de code local (protocole unitaire + batch) pour les tests"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8001)
+        parser.add_argument('--timeout', type=int, default=10, help="Timeout par exécution (secondes)")
+        parser.add_argument('--no-batch', action='store_true', help="Ignorer le champ 'inputs' (API sans mode batch)")
+
+    def handle(self, *args, **options):
+        handler = make_handler(
+            timeout=options['timeout'],
+            batch_enabled=not options['no_batch'],
+            log=self.stdout.write,
+        )
+        server = ThreadingHTTPServer((options['host'], options['port']), handler)
+        mode = 'désactivé' if options['no_batch'] else 'activé'
+        self.stdout.write(f"Exécuteur local sur http://{options['host']}:{options['port']}/ (mode batch {mode})")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,118 @@
+# api/management/commands/run_submission_worker.py
+
+"""
+Worker de la file de soumissions (modèle SubmissionJob).
+
+    python manage.py run_submission_worker
+    python manage.py run_submission_worker --threads 8
+
+Chaque thread réserve un job avec SELECT ... FOR UPDATE SKIP LOCKED :
+plusieurs processus worker peuvent tourner en parallèle sur la même base.
+Les jobs restés 'running' plus de SUBMISSION_JOB_TIMEOUT secondes (worker
+arrêté en pleine correction) sont remis en file. La même boucle enregistre
+le statut des contests dont une date vient d'être franchie.
+"""
+
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from api import submission_queue
+from api.models import SubmissionJob
+from contests.models import Contest
+
+STALE_CHECK_INTERVAL = 60
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Corrige les soumissions mises en file (mode asynchrone)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads', type=int, default=settings.SUBMISSION_WORKER_THREADS,
+            help="Nombre de soumissions corrigées en parallèle"
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=settings.SUBMISSION_POLL_INTERVAL,
+            help="Attente (secondes) quand la file est vide"
+        )
+
+    def handle(self, *args, **options):
+        self.stop = threading.Event()
+        self.poll_interval = options['poll_interval']
+        worker_name = f"{socket.gethostname()}:{os.getpid()}"
+
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+
+        threads = [
+            threading.Thread(
+                target=self._work, args=(f"{worker_name}-{n}",),
+                name=f"submission-worker-{n}", daemon=True
+            )
+            for n in range(max(1, options['threads']))
+        ]
+        for thread in threads:
+            thread.start()
+        self.stdout.write(self.style.SUCCESS(
+            f"[SUBMISSION-WORKER] {worker_name} démarré ({len(threads)} thread(s))"
+        ))
+
+        while not self.stop.is_set():
+            try:
+                close_old_connections()
+                requeued, failed = SubmissionJob.requeue_stale(
+                    settings.SUBMISSION_JOB_TIMEOUT, settings.SUBMISSION_JOB_MAX_TRIES
+                )
+                if requeued or failed:
+                    self.stdout.write(f"[SUBMISSION-WORKER] Jobs bloqués : {requeued} remis en file, {failed} en échec")
+
+                contests_updated = Contest.sync_statuses()
+                if contests_updated:
+                    self.stdout.write(f"[SUBMISSION-WORKER] Statut mis à jour pour {contests_updated} contest(s)")
+            except Exception as e:
+                # Base indisponible, deadlock... : on réessaie au prochain passage
+                logger.exception(f"[SUBMISSION-WORKER] Maintenance de la file en échec : {e}")
+                connection.close()
+            self.stop.wait(STALE_CHECK_INTERVAL)
+
+        # Laisser les corrections en cours se terminer
+        for thread in threads:
+            thread.join()
+        self.stdout.write("[SUBMISSION-WORKER] Arrêté")
+
+    def _request_stop(self, signum, frame):
+        self.stdout.write("[SUBMISSION-WORKER] Arrêt demandé, fin des corrections en cours...")
+        self.stop.set()
+
+    def _work(self, worker):
+        try:
+            while not self.stop.is_set():
+                try:
+                    close_old_connections()
+                    job = SubmissionJob.claim_next(worker)
+                    if job is None:
+                        self.stop.wait(self.poll_interval)
+                        continue
+                    started = time.monotonic()
+                    submission_queue.process(job)
+                    self.stdout.write(
+                        f"[SUBMISSION-WORKER] {worker} : job {job.id} {job.status} "
+                        f"en {time.monotonic() - started:.2f}s"
+                    )
+                except Exception as e:
+                    # Le thread continue : le job réservé éventuel sera remis en file par requeue_stale
+                    logger.exception(f"[SUBMISSION-WORKER] {worker} : erreur, nouvelle tentative : {e}")
+                    connection.close()
+                    self.stop.wait(self.poll_interval)
+        finally:
+            connection.close()
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_alter_userchallengeattempt_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testcase',
+            name='input_blob',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='testcase',
+            name='input_sha256',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='testcase',
+            name='input_size',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Taille input (octets)'),
+        ),
+        migrations.AddField(
+            model_name='testcase',
+            name='input_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='testcase',
+            name='output_blob',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='testcase',
+            name='output_sha256',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='testcase',
+            name='output_size',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Taille output (octets)'),
+        ),
+        migrations.AddField(
+            model_name='testcase',
+            name='output_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_testcase_input_blob_testcase_input_sha256_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='challenge',
+            name='tests_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
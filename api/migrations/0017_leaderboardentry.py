@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Case, Count, IntegerField, Q, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+
+def fill_leaderboard(apps, schema_editor):
+    """Remplit le classement depuis les tentatives existantes"""
+    UserChallengeAttempt = apps.get_model('api', 'UserChallengeAttempt')
+    LeaderboardEntry = apps.get_model('api', 'LeaderboardEntry')
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+
+    usernames = dict(User.objects.values_list('pk', 'username'))
+    completed = Q(status='completed')
+    stats = UserChallengeAttempt.objects.order_by().values('user').annotate(
+        total_xp=Coalesce(Sum('xp_earned'), 0),
+        challenges_completed=Count('id', filter=completed),
+        # Même expression que LeaderboardEntry.stats_queryset (copiée : une
+        # migration n'importe pas le code des modèles)
+        total_completion_time=Case(
+            When(challenges_completed=0, then=Value(None)),
+            default=Coalesce(Sum('completion_time', filter=completed), 0),
+            output_field=IntegerField(),
+        ),
+    )
+    LeaderboardEntry.objects.bulk_create([
+        LeaderboardEntry(
+            user_id=row['user'],
+            username=usernames[row['user']],
+            total_xp=row['total_xp'],
+            challenges_completed=row['challenges_completed'],
+            total_completion_time=row['total_completion_time'],
+        )
+        for row in stats
+        if row['user'] in usernames
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_alter_user_photo'),
+        ('api', '0016_submissionjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='leaderboard_entry', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('username', models.CharField(max_length=150)),
+                ('total_xp', models.IntegerField(default=0)),
+                ('challenges_completed', models.IntegerField(default=0)),
+                ('total_completion_time', models.IntegerField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Entrée du classement',
+                'verbose_name_plural': 'Classement global',
+                'indexes': [models.Index(fields=['-total_xp', 'total_completion_time', 'username'], name='leaderboard_rank_idx')],
+            },
+        ),
+        migrations.RunPython(fill_leaderboard, migrations.RunPython.noop),
+    ]
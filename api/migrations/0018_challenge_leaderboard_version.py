@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_leaderboardentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='challenge',
+            name='leaderboard_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_userchallengeattempt_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GlobalLeaderboardVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Version du classement global',
+            },
+        ),
+    ]
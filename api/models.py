@@ -1,25 +1,28 @@
 # api/models.py
 
 from django.db import models
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Coalesce
 from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
 from cloudinary.models import CloudinaryField
 
-import requests
+from . import file_cache
+
+import hashlib
+import uuid
+import zlib
 
 def read_cloudinary_text(file_field):
     """
     Lit correctement un fichier texte uploadé sur Cloudinary
     (UTF-8 + accents + emojis) et normalise les retours à la ligne.
+    Le contenu est servi depuis le cache local quand il est disponible.
     """
     try:
         if not file_field:
             return ""
-        response = requests.get(file_field.url, timeout=10)
-
-        if response.status_code == 200:
-            text = response.content.decode("utf-8")
-            return text.replace("\r\n", "\n").replace("\r", "\n")
-        return ""
+        return file_cache.fetch_text(file_field)
 
     except Exception:
         return ""
@@ -90,6 +93,11 @@ class Challenge(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
 
+    # Incrémenté à chaque modification d'un test case (voir api/test_bundle.py)
+    tests_version = models.PositiveIntegerField(default=0, editable=False)
+    # Incrémenté à chaque changement du classement du challenge (voir api/leaderboard.py)
+    leaderboard_version = models.PositiveIntegerField(default=0, editable=False)
+
     class Meta:
         ordering = ['-created_at']
         verbose_name = "Challenge"
@@ -98,9 +106,40 @@ class Challenge(models.Model):
     def __str__(self):
         return f"{self.title} ({self.get_difficulty_display()})"
 
+    VERSION_FIELDS = ('tests_version', 'leaderboard_version')
+
+    def save(self, *args, **kwargs):
+        # Les versions ne sont modifiées que par des update avec F() (TestCase,
+        # UserChallengeAttempt) : une instance chargée avant ne doit pas
+        # remettre l'ancienne version en base
+        if not self._state.adding and kwargs.get('update_fields') is None and not args:
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.VERSION_FIELDS
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def bump_tests_version(cls, *challenge_ids):
+        cls.objects.filter(pk__in=[pk for pk in challenge_ids if pk]).update(
+            tests_version=models.F('tests_version') + 1
+        )
+
+    @classmethod
+    def bump_leaderboard_version(cls, challenge_id):
+        cls.objects.filter(pk=challenge_id).update(
+            leaderboard_version=models.F('leaderboard_version') + 1
+        )
+
     @property
     def xp_reward(self):
         """Calcule automatiquement la somme des XP de tous les test cases"""
+        # Annoté par with_stats() dans les listes
+        if getattr(self, 'xp_total', None) is not None:
+            return self.xp_total
         return sum(tc.xp_reward for tc in self.test_cases.all())
 
     def get_description(self):
@@ -109,6 +148,37 @@ class Challenge(models.Model):
     def get_template(self):
         return read_cloudinary_text(self.template_file)
 
+    @classmethod
+    def with_stats(cls, queryset=None):
+        """
+        Annote les challenges avec leurs statistiques en une seule requête :
+        xp_total (somme des XP des test cases), test_cases_total et
+        completed_total (tentatives terminées). Sous-requêtes corrélées pour
+        ne pas multiplier les lignes entre test cases et tentatives.
+        """
+        from django.db.models import Count, OuterRef, Subquery, Sum
+
+        queryset = cls.objects.all() if queryset is None else queryset
+        test_cases = TestCase.objects.filter(challenge=OuterRef('pk')).order_by().values('challenge')
+        completed = UserChallengeAttempt.objects.filter(
+            challenge=OuterRef('pk'), status='completed'
+        ).order_by().values('challenge')
+
+        return queryset.annotate(
+            xp_total=Coalesce(Subquery(
+                test_cases.annotate(total=Sum('xp_reward')).values('total'),
+                output_field=models.IntegerField()
+            ), 0),
+            test_cases_total=Coalesce(Subquery(
+                test_cases.annotate(total=Count('id')).values('total'),
+                output_field=models.IntegerField()
+            ), 0),
+            completed_total=Coalesce(Subquery(
+                completed.annotate(total=Count('id')).values('total'),
+                output_field=models.IntegerField()
+            ), 0),
+        )
+
     def update_participants_count(self):
         self.participants_count = UserChallengeAttempt.objects.filter(
             challenge=self
@@ -119,10 +189,13 @@ class Challenge(models.Model):
         if self.participants_count == 0:
             return 0
 
-        completed = UserChallengeAttempt.objects.filter(
-            challenge=self,
-            status='completed'
-        ).count()
+        # Annoté par with_stats() dans les listes
+        completed = getattr(self, 'completed_total', None)
+        if completed is None:
+            completed = UserChallengeAttempt.objects.filter(
+                challenge=self,
+                status='completed'
+            ).count()
 
         return round((completed / self.participants_count) * 100, 2)
 
@@ -155,6 +228,21 @@ class TestCase(models.Model):
     is_sample = models.BooleanField(default=False)
     xp_reward = models.IntegerField(default=0, verbose_name="Points XP du test case")
 
+    # Copie normalisée des fichiers, enregistrée à l'upload : la correction
+    # ne dépend plus de Cloudinary. Au-delà de TESTCASE_INLINE_MAX_BYTES,
+    # le contenu est stocké compressé (zlib) dans *_blob.
+    input_text = models.TextField(blank=True, default='', editable=False)
+    input_blob = models.BinaryField(null=True, blank=True)
+    input_size = models.IntegerField(default=0, editable=False, verbose_name="Taille input (octets)")
+    input_sha256 = models.CharField(max_length=64, blank=True, default='', editable=False)
+
+    output_text = models.TextField(blank=True, default='', editable=False)
+    output_blob = models.BinaryField(null=True, blank=True)
+    output_size = models.IntegerField(default=0, editable=False, verbose_name="Taille output (octets)")
+    output_sha256 = models.CharField(max_length=64, blank=True, default='', editable=False)
+
+    STORED_SIDES = ('input', 'output')
+
     class Meta:
         ordering = ['order']
         verbose_name = "Test Case"
@@ -162,11 +250,91 @@ class TestCase(models.Model):
 
     def __str__(self):
         return f"Test {self.order} - {self.challenge.title}"
+
+    def save(self, *args, **kwargs):
+        previous = None
+        previous_challenge_id = None
+        if self.pk:
+            row = TestCase.objects.filter(pk=self.pk).values_list(
+                'input_file', 'output_file', 'challenge_id'
+            ).first()
+            if row:
+                previous, previous_challenge_id = row[:2], row[2]
+        self._capture_contents(previous)
+        super().save(*args, **kwargs)
+        # Les bundles de tests en mémoire deviennent obsolètes
+        Challenge.bump_tests_version(self.challenge_id, previous_challenge_id)
+        # Vider le cache local des fichiers remplacés
+        self._invalidate_file_cache(*(previous or ()))
+
+    def _capture_contents(self, previous=None):
+        """
+        Met à jour la copie en base des fichiers nouvellement uploadés
+        (serializer ou admin : le fichier est encore un UploadedFile ici)
+        """
+        for index, side in enumerate(self.STORED_SIDES):
+            value = getattr(self, f'{side}_file')
+            if isinstance(value, UploadedFile):
+                value.seek(0)
+                content = value.read()
+                value.seek(0)
+                self.store_contents(side, file_cache.decode_text(content))
+            elif not value:
+                self.store_contents(side, '')
+            elif previous is None or file_cache.cache_key(previous[index]) != file_cache.cache_key(value):
+                # Nouveau test case ou fichier remplacé par une ressource déjà sur Cloudinary
+                try:
+                    self.store_contents(side, file_cache.fetch_text(value))
+                except Exception:
+                    self.clear_contents(side)
+
+    def store_contents(self, side, text):
+        """Enregistre le contenu normalisé d'un côté ('input' ou 'output')"""
+        data = text.encode('utf-8')
+        setattr(self, f'{side}_size', len(data))
+        setattr(self, f'{side}_sha256', hashlib.sha256(data).hexdigest())
+        if len(data) > settings.TESTCASE_INLINE_MAX_BYTES:
+            setattr(self, f'{side}_text', '')
+            setattr(self, f'{side}_blob', zlib.compress(data, 6))
+        else:
+            setattr(self, f'{side}_text', text)
+            setattr(self, f'{side}_blob', None)
+
+    def clear_contents(self, side):
+        """Oublie la copie en base : la lecture repassera par Cloudinary"""
+        setattr(self, f'{side}_text', '')
+        setattr(self, f'{side}_blob', None)
+        setattr(self, f'{side}_size', 0)
+        setattr(self, f'{side}_sha256', '')
+
+    def has_stored_contents(self, side):
+        return bool(getattr(self, f'{side}_sha256'))
+
+    def _stored_text(self, side):
+        blob = getattr(self, f'{side}_blob')
+        if blob is not None:
+            return zlib.decompress(bytes(blob)).decode('utf-8')
+        return getattr(self, f'{side}_text')
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        Challenge.bump_tests_version(self.challenge_id)
+        self._invalidate_file_cache()
+        return result
+
+    def _invalidate_file_cache(self, *files):
+        for file_field in files + (self.input_file, self.output_file):
+            if file_field:
+                file_cache.invalidate(file_field)
     
     def get_input(self):
+        if self.has_stored_contents('input'):
+            return self._stored_text('input')
         return read_cloudinary_text(self.input_file)
 
     def get_output(self):
+        if self.has_stored_contents('output'):
+            return self._stored_text('output')
         return read_cloudinary_text(self.output_file)
 
 class UserChallengeAttempt(models.Model):
@@ -205,6 +373,12 @@ class UserChallengeAttempt(models.Model):
     xp_earned = models.IntegerField(default=0)
     attempts_count = models.IntegerField(default=0)
 
+    # Dernière modification : version de "mes challenges" et des listes (GET conditionnels)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Champs qui entrent dans les statistiques (User) et le classement global (LeaderboardEntry)
+    STATS_FIELDS = ('xp_earned', 'status', 'completion_time')
+
     class Meta:
         unique_together = ['user', 'challenge']
         ordering = ['-started_at']
@@ -212,6 +386,194 @@ class UserChallengeAttempt(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.challenge.title}"
 
+    def _get_stats_state(self):
+        return tuple(self.__dict__.get(name) for name in self.STATS_FIELDS)
+
+    def _locked_stats_state(self):
+        """
+        Valeurs en base des champs de statistiques, ligne verrouillée jusqu'à
+        la fin de la transaction (None si la tentative n'existe pas en base).
+        Les variations sont calculées depuis cet état et non depuis l'instance :
+        deux instances périmées de la même tentative ne comptent pas deux fois.
+        """
+        if self.pk is None:
+            return None
+        return (
+            type(self).objects.select_for_update()
+            .filter(pk=self.pk)
+            .values_list(*self.STATS_FIELDS)
+            .first()
+        )
+
+    @classmethod
+    def bulk_join(cls, challenge, user_ids):
+        """
+        Inscrit des utilisateurs à un challenge en une insertion groupée.
+
+        Le challenge est verrouillé pendant la transaction : deux inscriptions
+        concurrentes ne comptent pas deux fois le même participant. Les
+        compteurs (challenges_joined, participants_count) sont mis à jour
+        avec F() pour les seuls nouveaux inscrits (aucun XP à ce stade).
+
+        Returns:
+            Liste des ids des utilisateurs nouvellement inscrits
+        """
+        from django.contrib.auth import get_user_model
+        from django.db import transaction
+
+        user_ids = list(dict.fromkeys(user_ids))
+        with transaction.atomic():
+            list(Challenge.objects.select_for_update().filter(pk=challenge.pk).values_list('pk'))
+
+            existing = set(
+                cls.objects.filter(challenge=challenge, user_id__in=user_ids)
+                .values_list('user_id', flat=True)
+            )
+            new_ids = [user_id for user_id in user_ids if user_id not in existing]
+            if not new_ids:
+                return []
+
+            cls.objects.bulk_create(
+                [cls(user_id=user_id, challenge=challenge) for user_id in new_ids],
+                ignore_conflicts=True
+            )
+            get_user_model().objects.filter(pk__in=new_ids).update(
+                challenges_joined=F('challenges_joined') + 1
+            )
+            Challenge.objects.filter(pk=challenge.pk).update(
+                participants_count=F('participants_count') + len(new_ids),
+                leaderboard_version=F('leaderboard_version') + 1
+            )
+            # challenges_joined est affiché par le classement global
+            GlobalLeaderboardVersion.bump()
+        return new_ids
+
+    @classmethod
+    def sync_team_result(cls, challenge, user_ids, xp_earned, completed, submitted_at):
+        """
+        Reporte le résultat d'une soumission d'équipe sur les tentatives de
+        tous les membres, en quelques requêtes quel que soit leur nombre :
+
+        - inscription groupée des membres sans tentative (bulk_join) ;
+        - tentatives verrouillées (SELECT ... FOR UPDATE) puis mises à jour
+          en un bulk_update : l'XP ne diminue jamais, la complétion n'est
+          datée qu'une fois ;
+        - statistiques des membres et classement : un UPDATE chacun, avec
+          les variations exactes lues sous verrou.
+
+        À appeler dans une transaction.
+        """
+        from django.contrib.auth import get_user_model
+        from django.utils import timezone
+
+        user_ids = list(user_ids)
+        existing = set(
+            cls.objects.filter(challenge=challenge, user_id__in=user_ids)
+            .values_list('user_id', flat=True)
+        )
+        missing = [user_id for user_id in user_ids if user_id not in existing]
+        if missing:
+            cls.bulk_join(challenge, missing)
+
+        attempts = list(
+            cls.objects.select_for_update()
+            .filter(challenge=challenge, user_id__in=user_ids)
+            .order_by('pk')
+        )
+
+        changed = []
+        xp_deltas = {}
+        entry_deltas = {}
+        for attempt in attempts:
+            previous = attempt._get_stats_state()
+
+            # Mise à jour de l'XP individuelle : on ne diminue jamais l'XP
+            attempt.xp_earned = max(attempt.xp_earned, xp_earned)
+
+            # Si tout est réussi, marquer comme complété
+            if completed:
+                attempt.status = 'completed'
+                if attempt.completed_at is None:
+                    attempt.completed_at = submitted_at
+                    diff = attempt.completed_at - attempt.started_at
+                    attempt.completion_time = int(diff.total_seconds())
+
+            state = attempt._get_stats_state()
+            if state == previous:
+                continue
+            changed.append(attempt)
+            xp, done, time = attempt._stats_contribution(state)
+            old_xp, old_done, old_time = attempt._stats_contribution(previous)
+            xp_deltas[attempt.user_id] = xp - old_xp
+            entry_deltas[attempt.user_id] = (xp - old_xp, done - old_done, time - old_time)
+
+        if changed:
+            # bulk_update ne renseigne pas auto_now
+            now = timezone.now()
+            for attempt in changed:
+                attempt.updated_at = now
+            cls.objects.bulk_update(
+                changed, ['xp_earned', 'status', 'completed_at', 'completion_time', 'updated_at']
+            )
+            get_user_model().add_xp_deltas(xp_deltas)
+            LeaderboardEntry.add_deltas(entry_deltas)
+            Challenge.bump_leaderboard_version(challenge.pk)
+        return attempts
+
+    def _stats_contribution(self, state):
+        """Part de la tentative dans les statistiques : (XP, terminé 0/1, temps)"""
+        xp_earned, status, completion_time = state
+        if status != 'completed':
+            return xp_earned or 0, 0, 0
+        return xp_earned or 0, 1, completion_time or 0
+
+    def save(self, *args, **kwargs):
+        from django.contrib.auth import get_user_model
+        from django.db import transaction
+        User = get_user_model()
+
+        update_fields = kwargs.get('update_fields')
+
+        # La tentative, les stats de l'utilisateur et sa ligne du classement
+        # sont écrites dans la même transaction
+        with transaction.atomic():
+            previous = None if self._state.adding else self._locked_stats_state()
+            super().save(*args, **kwargs)
+
+            state = self._get_stats_state()
+            if previous is not None and update_fields is not None:
+                # Champs non enregistrés : la base garde ses valeurs
+                state = tuple(
+                    value if name in update_fields else old
+                    for name, value, old in zip(self.STATS_FIELDS, state, previous)
+                )
+
+            # Les statistiques ne sont mises à jour que si l'XP, le statut ou le temps a changé
+            if previous is None or state != previous:
+                xp, completed, time = self._stats_contribution(state)
+                if previous is not None:
+                    old_xp, old_completed, old_time = self._stats_contribution(previous)
+                    xp, completed, time = xp - old_xp, completed - old_completed, time - old_time
+                User.add_stats_delta(self.user_id, xp=xp, joined=1 if previous is None else 0)
+                LeaderboardEntry.add_delta(self.user_id, xp=xp, completed=completed, time=time)
+                Challenge.bump_leaderboard_version(self.challenge_id)
+
+    def delete(self, *args, **kwargs):
+        from django.contrib.auth import get_user_model
+        from django.db import transaction
+
+        user_id, challenge_id = self.user_id, self.challenge_id
+        with transaction.atomic():
+            previous = self._locked_stats_state()
+            result = super().delete(*args, **kwargs)
+            if previous is not None:
+                # Déjà supprimée (instance périmée) : rien à retirer
+                xp, completed, time = self._stats_contribution(previous)
+                get_user_model().add_stats_delta(user_id, xp=-xp, joined=-1)
+                LeaderboardEntry.add_delta(user_id, xp=-xp, completed=-completed, time=-time)
+                Challenge.bump_leaderboard_version(challenge_id)
+        return result
+
     def mark_as_completed(self, xp_earned=0):
         from django.utils import timezone
 
@@ -226,9 +588,6 @@ class UserChallengeAttempt(models.Model):
             self.xp_earned = xp_earned
             self.save()
 
-            if hasattr(self.user, 'update_stats'):
-                self.user.update_stats()
-
 class UserCodeSave(models.Model):
     """
     Sauvegarde du code utilisateur
@@ -254,3 +613,385 @@ class UserCodeSave(models.Model):
 
     def __str__(self):
         return f"{self.user.username} — {self.challenge.title}"
+
+class LeaderboardEntry(models.Model):
+    """
+    Statistiques de complétion d'un utilisateur et ligne du classement
+    global, tenues à jour par variations dans la transaction de chaque
+    modification d'une tentative (UserChallengeAttempt.save / delete).
+
+    Le classement se lit directement dans l'ordre de l'index
+    (total_xp desc, total_completion_time asc, username) : voir api/leaderboard.py.
+    """
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='leaderboard_entry'
+    )
+    # Copie de User.username : départage l'ordre d'affichage sans jointure
+    username = models.CharField(max_length=150)
+
+    total_xp = models.IntegerField(default=0)
+    challenges_completed = models.IntegerField(default=0)
+    # Somme des temps des challenges terminés (NULL si aucun)
+    total_completion_time = models.IntegerField(null=True, blank=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['-total_xp', 'total_completion_time', 'username'],
+                name='leaderboard_rank_idx'
+            ),
+        ]
+        verbose_name = "Entrée du classement"
+        verbose_name_plural = "Classement global"
+
+    def __str__(self):
+        return f"{self.username} - {self.total_xp} XP"
+
+    @classmethod
+    def stats_queryset(cls):
+        """Agrégats du classement par utilisateur, calculés depuis les tentatives"""
+        from django.db.models import Count, Q, Sum
+
+        completed = Q(status='completed')
+        return UserChallengeAttempt.objects.order_by().values('user').annotate(
+            total_xp=Coalesce(Sum('xp_earned'), 0),
+            challenges_completed=Count('id', filter=completed),
+            # NULL si aucun challenge terminé (même règle que add_delta)
+            total_completion_time=Case(
+                When(challenges_completed=0, then=Value(None)),
+                default=Coalesce(Sum('completion_time', filter=completed), 0),
+                output_field=models.IntegerField(),
+            ),
+        )
+
+    @classmethod
+    def add_delta(cls, user_id, xp=0, completed=0, time=0):
+        """
+        Applique la variation due à une tentative (UPDATE atomique avec F()).
+        La ligne est créée depuis les tentatives si elle n'existe pas encore.
+        """
+        cls.add_deltas({user_id: (xp, completed, time)})
+
+    @classmethod
+    def add_deltas(cls, deltas):
+        """
+        Applique en un seul UPDATE les variations de plusieurs utilisateurs :
+        {user_id: (xp, terminés, temps)}. Les lignes manquantes sont créées
+        depuis les tentatives.
+        """
+        from django.utils import timezone
+
+        deltas = {user_id: delta for user_id, delta in deltas.items() if any(delta)}
+        if not deltas:
+            return
+
+        def per_user(index):
+            return Case(
+                *[When(user_id=user_id, then=Value(delta[index])) for user_id, delta in deltas.items()],
+                default=Value(0),
+                output_field=models.IntegerField(),
+            )
+
+        updated = cls.objects.filter(user_id__in=deltas).update(
+            total_xp=F('total_xp') + per_user(0),
+            challenges_completed=F('challenges_completed') + per_user(1),
+            # Calculé avec les valeurs avant l'UPDATE : NULL quand le
+            # dernier challenge terminé est perdu
+            total_completion_time=Case(
+                *[
+                    When(user_id=user_id, challenges_completed=-completed, then=Value(None))
+                    for user_id, (_, completed, _) in deltas.items()
+                ],
+                default=Coalesce(F('total_completion_time'), 0) + per_user(2),
+                output_field=models.IntegerField(),
+            ),
+            updated_at=timezone.now(),
+        )
+        if updated < len(deltas):
+            existing = set(cls.objects.filter(user_id__in=deltas).values_list('user_id', flat=True))
+            cls.refresh_for_users([user_id for user_id in deltas if user_id not in existing])
+        GlobalLeaderboardVersion.bump()
+
+    @classmethod
+    def refresh_for_user(cls, user_id):
+        """Recalcule la ligne d'un utilisateur (une requête d'agrégat + un upsert)"""
+        from django.contrib.auth import get_user_model
+
+        stats = next(iter(cls.stats_queryset().filter(user=user_id)), None)
+        if stats is None:
+            cls.objects.filter(user_id=user_id).delete()
+            GlobalLeaderboardVersion.bump()
+            return None
+
+        username = get_user_model().objects.filter(pk=user_id).values_list('username', flat=True).first()
+        if username is None:
+            return None
+
+        entry, _ = cls.objects.update_or_create(
+            user_id=user_id,
+            defaults={
+                'username': username,
+                'total_xp': stats['total_xp'],
+                'challenges_completed': stats['challenges_completed'],
+                'total_completion_time': stats['total_completion_time'],
+            }
+        )
+        GlobalLeaderboardVersion.bump()
+        return entry
+
+    @classmethod
+    def refresh_for_users(cls, user_ids):
+        """Recalcule les lignes de plusieurs utilisateurs (une requête d'agrégat + un upsert groupé)"""
+        from django.contrib.auth import get_user_model
+
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+        usernames = dict(get_user_model().objects.filter(pk__in=user_ids).values_list('pk', 'username'))
+        cls.objects.bulk_create(
+            [
+                cls(
+                    user_id=stats['user'],
+                    username=usernames[stats['user']],
+                    total_xp=stats['total_xp'],
+                    challenges_completed=stats['challenges_completed'],
+                    total_completion_time=stats['total_completion_time'],
+                )
+                for stats in cls.stats_queryset().filter(user__in=user_ids)
+                if stats['user'] in usernames
+            ],
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=['username', 'total_xp', 'challenges_completed', 'total_completion_time', 'updated_at'],
+        )
+        GlobalLeaderboardVersion.bump()
+
+    @classmethod
+    def rebuild(cls):
+        """
+        Reconstruit tout le classement depuis les tentatives.
+
+        Returns:
+            (nombre de lignes écrites, nombre de lignes supprimées)
+        """
+        from django.contrib.auth import get_user_model
+        from django.db import transaction
+
+        usernames = dict(get_user_model().objects.values_list('pk', 'username'))
+        entries = [
+            cls(
+                user_id=stats['user'],
+                username=usernames[stats['user']],
+                total_xp=stats['total_xp'],
+                challenges_completed=stats['challenges_completed'],
+                total_completion_time=stats['total_completion_time'],
+            )
+            for stats in cls.stats_queryset()
+            if stats['user'] in usernames
+        ]
+
+        with transaction.atomic():
+            deleted, _ = cls.objects.exclude(user__in=UserChallengeAttempt.objects.values('user')).delete()
+            cls.objects.bulk_create(
+                entries,
+                batch_size=500,
+                update_conflicts=True,
+                unique_fields=['user'],
+                update_fields=['username', 'total_xp', 'challenges_completed', 'total_completion_time', 'updated_at'],
+            )
+            GlobalLeaderboardVersion.bump()
+        return len(entries), deleted
+
+
+class GlobalLeaderboardVersion(models.Model):
+    """
+    Version du classement global (ETag de /api/leaderboard/global/) : une
+    seule ligne, incrémentée à chaque écriture de ce que le classement
+    affiche (entrées, inscriptions, noms des utilisateurs). Lire la version
+    ne coûte qu'une lecture par clé primaire.
+    """
+
+    version = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Version du classement global"
+
+    def __str__(self):
+        return f"Classement global v{self.version}"
+
+    @classmethod
+    def bump(cls):
+        if not cls.objects.filter(pk=1).update(version=F('version') + 1):
+            cls.objects.get_or_create(pk=1, defaults={'version': 1})
+
+    @classmethod
+    def current(cls):
+        return cls.objects.filter(pk=1).values_list('version', flat=True).first() or 0
+
+
+class SubmissionJob(models.Model):
+    """
+    Soumission officielle en attente de correction.
+
+    La file est la table elle-même : les workers (run_submission_worker)
+    réservent les jobs avec SELECT ... FOR UPDATE SKIP LOCKED.
+    """
+
+    STATUS_CHOICES = [
+        ('queued', 'En attente'),
+        ('running', 'En cours'),
+        ('done', 'Terminé'),
+        ('failed', 'Échec'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='submission_jobs'
+    )
+
+    challenge = models.ForeignKey(
+        Challenge,
+        on_delete=models.CASCADE,
+        related_name='submission_jobs'
+    )
+
+    # Renseignée pour une soumission de contest
+    team = models.ForeignKey(
+        'contests.Team',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='submission_jobs'
+    )
+
+    code = models.TextField()
+    language = models.CharField(max_length=20)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    # {'total': 5, 'completed': 2, 'passed': 2, 'tests': [{'test_number': 1, 'passed': True}, ...]}
+    progress = models.JSONField(default=dict, blank=True)
+    # Corps de la réponse de la soumission synchrone équivalente
+    result = models.JSONField(null=True, blank=True)
+    http_status = models.IntegerField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+
+    worker = models.CharField(max_length=100, blank=True, default='')
+    tries = models.IntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+        verbose_name = "Soumission en file"
+        verbose_name_plural = "Soumissions en file"
+
+    def __str__(self):
+        return f"{self.user.username} - {self.challenge.title} ({self.status})"
+
+    @classmethod
+    def claim_next(cls, worker):
+        """
+        Réserve le plus ancien job en attente pour `worker`.
+        Les jobs verrouillés par un autre worker sont ignorés (SKIP LOCKED).
+        """
+        from django.db import transaction
+        from django.utils import timezone
+
+        with transaction.atomic():
+            job = (
+                cls.objects
+                .select_for_update(skip_locked=True)
+                .filter(status='queued')
+                .order_by('created_at')
+                .first()
+            )
+            if job is None:
+                return None
+            job.status = 'running'
+            job.worker = worker
+            job.tries += 1
+            job.started_at = timezone.now()
+            job.save(update_fields=['status', 'worker', 'tries', 'started_at'])
+        return job
+
+    @classmethod
+    def requeue_stale(cls, max_running_seconds, max_tries):
+        """
+        Remet en file les jobs restés 'running' trop longtemps (worker arrêté
+        en cours de correction) ; au-delà de `max_tries`, le job échoue.
+
+        Returns:
+            (nombre remis en file, nombre passés en échec)
+        """
+        from datetime import timedelta
+        from django.utils import timezone
+
+        stale = cls.objects.filter(
+            status='running',
+            started_at__lt=timezone.now() - timedelta(seconds=max_running_seconds)
+        )
+        failed = stale.filter(tries__gte=max_tries).update(
+            status='failed',
+            error="Correction interrompue (worker arrêté)",
+            finished_at=timezone.now()
+        )
+        requeued = stale.update(status='queued', worker='', progress={})
+        return requeued, failed
+
+    def queue_position(self):
+        """Nombre de jobs en attente avant celui-ci (0 = le prochain)"""
+        if self.status != 'queued':
+            return 0
+        return SubmissionJob.objects.filter(
+            status='queued',
+            created_at__lt=self.created_at
+        ).count()
+
+    def start_progress(self, total):
+        self.progress = {'total': total, 'completed': 0, 'passed': 0, 'tests': []}
+        SubmissionJob.objects.filter(pk=self.pk).update(progress=self.progress)
+
+    def record_test_result(self, result):
+        """Ajoute le résultat d'un test à la progression (appelé à chaque test terminé)"""
+        progress = self.progress or {'total': 0, 'completed': 0, 'passed': 0, 'tests': []}
+        progress['completed'] += 1
+        if result.get('passed'):
+            progress['passed'] += 1
+        progress['tests'].append({
+            'test_number': result.get('test_number'),
+            'passed': bool(result.get('passed')),
+            'skipped': bool(result.get('skipped')),
+        })
+        self.progress = progress
+        SubmissionJob.objects.filter(pk=self.pk).update(progress=progress)
+
+    def finish(self, payload, http_status):
+        from django.utils import timezone
+
+        self.status = 'done'
+        self.result = payload
+        self.http_status = http_status
+        self.finished_at = timezone.now()
+        self.save(update_fields=['status', 'result', 'http_status', 'finished_at'])
+
+    def fail(self, error):
+        from django.utils import timezone
+
+        self.status = 'failed'
+        self.error = error
+        self.finished_at = timezone.now()
+        self.save(update_fields=['status', 'error', 'finished_at'])
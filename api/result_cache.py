@@ -0,0 +1,86 @@
+# api/result_cache.py
+
+"""
+Mémoïsation des résultats de validation : un code identique, testé sur la
+même version des tests d'un challenge, n'est pas ré-exécuté.
+
+La clé combine le challenge, la version du bundle de tests, le langage, le
+timeout, l'option stop_on_failure, le test case visé (test d'un seul cas)
+et le hash du code. Les entrées expirent
+après TEST_RESULT_CACHE_TTL secondes ; un résultat contenant une erreur de
+l'API d'exécution (timeout, connexion) n'est jamais mis en cache.
+
+Les résultats sont aussi copiés dans la région "test_bundles" du cache
+partagé : un code déjà validé par un autre worker n'est pas ré-exécuté.
+"""
+
+import copy
+import hashlib
+from typing import Any, Dict, Optional, Tuple
+
+from django.conf import settings
+
+from . import cache_regions
+from .lru import LRUCache
+
+
+def _sizeof(result: Dict[str, Any]) -> int:
+    size = 256
+    for test in result.get('results', []):
+        size += len(test.get('user_output') or '') + len(test.get('expected_output') or '') + 128
+    return size
+
+
+_results = LRUCache(
+    max_bytes=settings.TEST_RESULT_CACHE_MEMORY_BYTES,
+    ttl=settings.TEST_RESULT_CACHE_TTL,
+    sizeof=_sizeof,
+)
+
+
+def make_key(
+    bundle,
+    code: str,
+    language: str,
+    timeout: int,
+    stop_on_failure: bool = False,
+    test_case_id: Optional[int] = None,
+) -> Optional[Tuple]:
+    """Clé de mémoïsation, ou None si le bundle est incomplet (fichier illisible)"""
+    if not bundle.complete:
+        return None
+    digest = hashlib.sha256(code.encode('utf-8')).hexdigest()
+    return (
+        bundle.challenge_id, bundle.version, language, timeout,
+        bool(stop_on_failure), test_case_id, digest
+    )
+
+
+def lookup(key: Tuple) -> Optional[Dict[str, Any]]:
+    """Copie du résultat mémorisé (l'appelant peut la modifier), ou None"""
+    if settings.TEST_RESULT_CACHE_TTL <= 0:
+        return None
+    result = _results.get(key)
+    if result is None:
+        result = cache_regions.region('test_bundles').get(('result',) + key)
+        if result is not None:
+            _results.set(key, result)
+    return copy.deepcopy(result) if result is not None else None
+
+
+def store(key: Tuple, result: Dict[str, Any]):
+    if settings.TEST_RESULT_CACHE_TTL <= 0:
+        return
+    _results.set(key, copy.deepcopy(result))
+    cache_regions.region('test_bundles').set(('result',) + key, result)
+
+
+def discard_challenge(challenge_id: int, keep_version: Optional[int] = None) -> int:
+    """Oublie les résultats d'un challenge (sauf ceux de `keep_version`)"""
+    return _results.discard_where(
+        lambda key: key[0] == challenge_id and key[1] != keep_version
+    )
+
+
+def get_stats() -> dict:
+    return _results.stats()
@@ -2,10 +2,11 @@
 
 from rest_framework import serializers
 from rest_framework import serializers
-from .models import Challenge, TestCase, UserChallengeAttempt
+from .models import Challenge, TestCase, UserChallengeAttempt, SubmissionJob
+from . import file_cache
 from django.contrib.auth import get_user_model
 from django.db.models import Q
-import requests
+from django.utils.functional import cached_property
 
 User = get_user_model()
 
@@ -70,27 +71,27 @@ class TestCaseSerializer(serializers.ModelSerializer):
         ]
 
     def get_input_content(self, obj):
-        """Lire le contenu du fichier d'entrée depuis Cloudinary"""
+        """Lire le contenu du fichier d'entrée (copie en base, sinon Cloudinary via le cache local)"""
+        if obj.has_stored_contents('input'):
+            return obj.get_input()
         if obj.input_file:
             try:
-                response = requests.get(obj.input_file.url, timeout=10)
-                if response.status_code == 200:
-                    content = response.text.replace('\r\n', '\n').replace('\r', '\n')
-                    return content
-                return f"[Erreur lecture input: HTTP {response.status_code}]"
+                return file_cache.fetch_text(obj.input_file)
+            except file_cache.CloudinaryFetchError as e:
+                return f"[Erreur lecture input: HTTP {e.status_code}]"
             except Exception as e:
                 return f"[Erreur lecture input: {e}]"
         return None
 
     def get_output_content(self, obj):
-        """Lire le contenu du fichier de sortie depuis Cloudinary"""
+        """Lire le contenu du fichier de sortie (copie en base, sinon Cloudinary via le cache local)"""
+        if obj.has_stored_contents('output'):
+            return obj.get_output()
         if obj.output_file:
             try:
-                response = requests.get(obj.output_file.url, timeout=10)
-                if response.status_code == 200:
-                    content = response.text.replace('\r\n', '\n').replace('\r', '\n')
-                    return content
-                return f"[Erreur lecture output: HTTP {response.status_code}]"
+                return file_cache.fetch_text(obj.output_file)
+            except file_cache.CloudinaryFetchError as e:
+                return f"[Erreur lecture output: HTTP {e.status_code}]"
             except Exception as e:
                 return f"[Erreur lecture output: {e}]"
         return None
@@ -113,41 +114,118 @@ class ChallengeListSerializer(serializers.ModelSerializer):
         ]
 
     def get_test_cases_count(self, obj):
+        # Annoté par Challenge.with_stats() dans la liste
+        if getattr(obj, 'test_cases_total', None) is not None:
+            return obj.test_cases_total
         return obj.test_cases.count()
 
-    def get_join(self, obj):
-        """Retourne True si l'utilisateur a rejoint le challenge"""
+    def _get_user_attempt(self, obj):
+        """
+        Tentative de l'utilisateur connecté, lue dans le contexte
+        'user_attempts' ({challenge_id: tentative}, chargé une fois pour la liste)
+        """
+        attempts = self.context.get('user_attempts')
+        if attempts is not None:
+            return attempts.get(obj.id)
         request = self.context.get('request')
         if not request or not request.user.is_authenticated:
-            return False
-        from api.models import UserChallengeAttempt
+            return None
         return UserChallengeAttempt.objects.filter(
             user=request.user,
             challenge=obj
-        ).exists()
+        ).first()
+
+    def get_join(self, obj):
+        """Retourne True si l'utilisateur a rejoint le challenge"""
+        return self._get_user_attempt(obj) is not None
 
     def get_status(self, obj):
         """
         Retourne complete ou in_progress si l'utilisateur a rejoint le challenge
         Sinon return None
         """
-        request = self.context.get('request')
-        if not request or not request.user.is_authenticated:
-            return None
-        from api.models import UserChallengeAttempt
-        attempt = UserChallengeAttempt.objects.filter(
-            user=request.user,
-            challenge=obj
-        ).first()
+        attempt = self._get_user_attempt(obj)
         if not attempt:
             return None
         return "complete" if attempt.status == "completed" else "in_progress"
 
+    @staticmethod
+    def user_attempts_map(request):
+        """Tentatives de l'utilisateur connecté par challenge (une requête)"""
+        if not request or not request.user.is_authenticated:
+            return {}
+        return {
+            attempt.challenge_id: attempt
+            for attempt in UserChallengeAttempt.objects.filter(user=request.user)
+        }
+
 
 
 
 
 
+class ChallengeDetailContext:
+    """
+    Données du détail d'un challenge pour un utilisateur, chargées une seule
+    fois par requête : contests en cours / à venir, tentative, code
+    sauvegardé, description et template (lus au premier accès).
+    """
+
+    def __init__(self, challenge, user=None):
+        self.challenge = challenge
+        self.user = user if user is not None and user.is_authenticated else None
+
+    @cached_property
+    def open_contests(self):
+        """(id, statut) des contests en cours ou à venir contenant le challenge"""
+        from contests import visibility
+        return visibility.open_contests_for(self.challenge.pk)
+
+    @property
+    def in_contest(self):
+        return bool(self.open_contests)
+
+    @property
+    def contest_id(self):
+        return self.open_contests[0][0] if self.open_contests else None
+
+    @property
+    def in_upcoming_contest(self):
+        return any(statut == 'upcoming' for _, statut in self.open_contests)
+
+    @cached_property
+    def attempt(self):
+        if self.user is None:
+            return None
+        return UserChallengeAttempt.objects.filter(user=self.user, challenge=self.challenge).first()
+
+    @cached_property
+    def saved_code(self):
+        from api.models import UserCodeSave
+        if self.user is None:
+            return None
+        return UserCodeSave.objects.filter(user=self.user, challenge=self.challenge).first()
+
+    @property
+    def version(self):
+        """Valeurs qui changent avec le contenu du détail (ETag)"""
+        challenge, attempt, saved_code = self.challenge, self.attempt, self.saved_code
+        return (
+            challenge.pk, challenge.updated_at, challenge.tests_version, challenge.leaderboard_version,
+            tuple(self.open_contests),
+            attempt.updated_at if attempt else None,
+            saved_code.saved_at if saved_code else None,
+        )
+
+    @cached_property
+    def description(self):
+        return self.challenge.get_description()
+
+    @cached_property
+    def template(self):
+        return self.challenge.get_template()
+
+
 class ChallengeDetailSerializer(serializers.ModelSerializer):
     description = serializers.SerializerMethodField()
     template = serializers.SerializerMethodField()
@@ -178,128 +256,72 @@ class ChallengeDetailSerializer(serializers.ModelSerializer):
             'contest_id',
         ]
 
+    def _detail(self, obj):
+        """
+        ChallengeDetailContext de `obj` : celui passé par la vue dans le
+        contexte ('detail'), sinon créé une fois et gardé dans le contexte
+        """
+        detail = self.context.get('detail')
+        if detail is None or detail.challenge.pk != obj.pk:
+            request = self.context.get('request')
+            detail = ChallengeDetailContext(obj, getattr(request, 'user', None))
+            self.context['detail'] = detail
+        return detail
+
     def get_in_contest(self, obj):
         """Vérifie si le challenge appartient à un contest en cours ou à venir"""
-        from contests.models import Contest
-        from django.db.models import Q
-        
-        ongoing_or_upcoming = Contest.objects.filter(
-            challenges=obj
-        ).filter(
-            Q(statut='ongoing') | Q(statut='upcoming')
-        ).exists()
-        
-        return ongoing_or_upcoming
+        return self._detail(obj).in_contest
 
     def get_contest_id(self, obj):
         """Retourne l'ID du contest si ongoing ou upcoming, None sinon"""
-        from contests.models import Contest
-        from django.db.models import Q
-        
-        contest = Contest.objects.filter(
-            challenges=obj
-        ).filter(
-            Q(statut='ongoing') | Q(statut='upcoming')
-        ).first()
-        
-        return contest.id if contest else None
+        return self._detail(obj).contest_id
 
-    def get_description(self, obj):
-        """Retourne la description du challenge depuis Cloudinary"""
-        from contests.models import Contest
+    def _check_not_upcoming(self, obj, what):
         from rest_framework.exceptions import PermissionDenied
-        
+
         # Vérifier si le challenge est dans un contest À VENIR
-        in_upcoming_contest = Contest.objects.filter(
-            challenges=obj,
-            statut='upcoming'
-        ).exists()
-        
-        if in_upcoming_contest:
+        if self._detail(obj).in_upcoming_contest:
             raise PermissionDenied(
                 "Ce challenge fait partie d'un contest à venir. "
-                "Les détails seront accessibles une fois le contest commencé."
+                f"{what} une fois le contest commencé."
             )
-        
-        # Utiliser la méthode get_description() du modèle (qui utilise requests)
-        return obj.get_description()
+
+    def get_description(self, obj):
+        """Retourne la description du challenge depuis Cloudinary"""
+        self._check_not_upcoming(obj, "Les détails seront accessibles")
+        # Lecture Cloudinary (via le cache local), une seule fois par requête
+        return self._detail(obj).description
 
     def get_template(self, obj):
         """Retourne le template du challenge depuis Cloudinary"""
-        from contests.models import Contest
-        from rest_framework.exceptions import PermissionDenied
-        
-        # Vérifier si le challenge est dans un contest À VENIR
-        in_upcoming_contest = Contest.objects.filter(
-            challenges=obj,
-            statut='upcoming'
-        ).exists()
-        
-        if in_upcoming_contest:
-            raise PermissionDenied(
-                "Ce challenge fait partie d'un contest à venir. "
-                "Le template sera accessible une fois le contest commencé."
-            )
-        
-        # Utiliser la méthode get_template() du modèle (qui utilise requests)
-        return obj.get_template()
-    
-    def get_test_cases(self, obj):
-        """Retourne les test cases du challenge"""
-        from contests.models import Contest
-        
-        # Vérifier si le challenge est dans un contest À VENIR
-        in_upcoming_contest = Contest.objects.filter(
-            challenges=obj,
-            statut='upcoming'
-        ).exists()
-        
-        if in_upcoming_contest:
-            return []  # Retourner une liste vide
-        
-        return obj.test_cases.all()
+        self._check_not_upcoming(obj, "Le template sera accessible")
+        # Lecture Cloudinary (via le cache local), une seule fois par requête
+        return self._detail(obj).template
 
     def get_join(self, obj):
-        request = self.context.get('request')
-        if not request or not request.user.is_authenticated:
-            return False
-        from api.models import UserChallengeAttempt
-        return UserChallengeAttempt.objects.filter(user=request.user, challenge=obj).exists()
+        return self._detail(obj).attempt is not None
 
     def get_saved_code(self, obj):
-        request = self.context.get('request')
-        if not request or not request.user.is_authenticated:
+        detail = self._detail(obj)
+        if detail.user is None:
             return None
-        from api.models import UserCodeSave
-        record = UserCodeSave.objects.filter(user=request.user, challenge=obj).first()
-        return record.code if record else obj.get_template()
+        # Sans code sauvegardé : le template (déjà lu pour le champ template)
+        return detail.saved_code.code if detail.saved_code else detail.template
 
     def get_last_saved_at(self, obj):
-        request = self.context.get('request')
-        if not request or not request.user.is_authenticated:
-            return None
-        from api.models import UserCodeSave
-        record = UserCodeSave.objects.filter(user=request.user, challenge=obj).first()
+        record = self._detail(obj).saved_code
         return record.saved_at if record else None
 
-    def _get_attempt(self, obj):
-        """Récupère la tentative de l'utilisateur pour éviter répéter le code"""
-        request = self.context.get('request')
-        if not request or not request.user.is_authenticated:
-            return None
-        from api.models import UserChallengeAttempt
-        return UserChallengeAttempt.objects.filter(user=request.user, challenge=obj).first()
-    
     def get_started_at(self, obj):
-        attempt = self._get_attempt(obj)
+        attempt = self._detail(obj).attempt
         return attempt.started_at if attempt else None
     
     def get_completed_at(self, obj):
-        attempt = self._get_attempt(obj)
+        attempt = self._detail(obj).attempt
         return attempt.completed_at if attempt else None
     
     def get_completion_time(self, obj):
-        attempt = self._get_attempt(obj)
+        attempt = self._detail(obj).attempt
         return attempt.completion_time if attempt else None
 
 class ChallengeCreateSerializer(serializers.ModelSerializer):
@@ -340,6 +362,23 @@ class ChallengeSubmissionSerializer(serializers.Serializer):
             raise serializers.ValidationError("Challenge introuvable")
         return value
     
+class SubmissionJobSerializer(serializers.ModelSerializer):
+    """Serializer pour le suivi d'une soumission mise en file"""
+    queue_position = serializers.SerializerMethodField()
+
+    class Meta:
+        model = SubmissionJob
+        fields = [
+            'id', 'challenge', 'team', 'language', 'status', 'queue_position',
+            'progress', 'result', 'http_status', 'error',
+            'created_at', 'started_at', 'finished_at'
+        ]
+        read_only_fields = fields
+
+    def get_queue_position(self, obj):
+        return obj.queue_position()
+
+
 class UserChallengeAttemptSerializer(serializers.ModelSerializer):
     """Serializer pour les tentatives de challenge"""
     challenge_title = serializers.CharField(source='challenge.title', read_only=True)
@@ -370,28 +409,31 @@ class ChallengeStatsSerializer(serializers.ModelSerializer):
         ]
     
     def get_participants_count(self, obj):
-        return obj.get_participants_count()
+        return obj.participants_count
     
     def get_completion_rate(self, obj):
         return obj.get_completion_rate()
     
     def get_user_attempt(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            try:
-                attempt = UserChallengeAttempt.objects.get(
-                    user=request.user,
-                    challenge=obj
-                )
-                return {
-                    'status': attempt.status,
-                    'started_at': attempt.started_at,
-                    'completed_at': attempt.completed_at,
-                    'xp_earned': attempt.xp_earned
-                }
-            except UserChallengeAttempt.DoesNotExist:
+        attempts = self.context.get('user_attempts')
+        if attempts is not None:
+            attempt = attempts.get(obj.id)
+        else:
+            request = self.context.get('request')
+            if not request or not request.user.is_authenticated:
                 return None
-        return None
+            attempt = UserChallengeAttempt.objects.filter(
+                user=request.user,
+                challenge=obj
+            ).first()
+        if attempt is None:
+            return None
+        return {
+            'status': attempt.status,
+            'started_at': attempt.started_at,
+            'completed_at': attempt.completed_at,
+            'xp_earned': attempt.xp_earned
+        }
 
 
 class ChallengeLeaderboardSerializer(serializers.Serializer):
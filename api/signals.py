@@ -0,0 +1,70 @@
+# api/signals.py
+
+"""
+Invalidation des régions du cache partagé (api/cache_regions.py) quand
+les données qu'elles contiennent changent sans changer de version, et
+copie du username dans les entrées du classement global.
+"""
+
+from django.contrib.auth import get_user_model
+from django.db import models
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import cache_regions
+from .models import Challenge, GlobalLeaderboardVersion, LeaderboardEntry
+
+# Champs d'un utilisateur affichés dans les classements
+DISPLAYED_USER_FIELDS = set(get_user_model().DISPLAY_FIELDS)
+
+
+def _display_changed(instance, created, update_fields):
+    """Vrai si la sauvegarde a pu changer ce que les classements affichent de l'utilisateur"""
+    if created:
+        return False
+    if update_fields is not None:
+        return bool(DISPLAYED_USER_FIELDS.intersection(update_fields))
+    previous = getattr(instance, '_display_state', None)
+    return previous is None or previous != instance._get_display_state()
+
+
+def _bump_attempted_challenges(user_id):
+    # Les ETags et les clés des pages de classement contiennent leaderboard_version
+    Challenge.objects.filter(user_attempts__user_id=user_id).update(
+        leaderboard_version=models.F('leaderboard_version') + 1
+    )
+
+
+@receiver([post_save, post_delete], sender=Challenge)
+def challenge_changed(sender, instance, **kwargs):
+    # Titre affiché dans les classements (les fichiers ont une clé par version)
+    cache_regions.invalidate('leaderboards')
+
+
+@receiver(post_save, sender=get_user_model())
+def user_changed(sender, instance, created=False, update_fields=None, **kwargs):
+    # Les sauvegardes partielles (last_login, statistiques) ne changent pas l'affichage
+    if not _display_changed(instance, created, update_fields):
+        return
+    instance._display_state = instance._get_display_state()
+    LeaderboardEntry.objects.filter(user_id=instance.pk).update(
+        username=instance.username, updated_at=timezone.now()
+    )
+    # Les ETags des classements contiennent leurs versions
+    GlobalLeaderboardVersion.bump()
+    _bump_attempted_challenges(instance.pk)
+    cache_regions.invalidate('leaderboards', 'contest_state')
+
+
+@receiver(pre_delete, sender=get_user_model())
+def user_deleting(sender, instance, **kwargs):
+    # Les tentatives supprimées en cascade ne passent pas par UserChallengeAttempt.delete()
+    _bump_attempted_challenges(instance.pk)
+
+
+@receiver(post_delete, sender=get_user_model())
+def user_deleted(sender, instance, **kwargs):
+    # Entrée du classement global supprimée en cascade
+    GlobalLeaderboardVersion.bump()
+    cache_regions.invalidate('leaderboards', 'contest_state')
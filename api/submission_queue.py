@@ -0,0 +1,76 @@
+# api/submission_queue.py
+
+"""
+File de soumissions adossée à la base de données (modèle SubmissionJob).
+
+Les vues de soumission mettent le job en file et répondent aussitôt (202)
+avec son identifiant ; les workers (manage.py run_submission_worker)
+réservent les jobs avec SELECT ... FOR UPDATE SKIP LOCKED et les corrigent.
+Le client suit la progression sur GET /api/submissions/<id>/.
+"""
+
+import logging
+
+from django.urls import reverse
+
+from .models import SubmissionJob
+from .test_bundle import get_bundle
+
+logger = logging.getLogger(__name__)
+
+
+def wants_async(request) -> bool:
+    """Option 'async' du body (ou de la query string) : soumission mise en file"""
+    value = request.data.get('async', request.query_params.get('async', False))
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    return bool(value)
+
+
+def enqueue(user, challenge, code, language, team=None) -> SubmissionJob:
+    job = SubmissionJob.objects.create(
+        user=user,
+        challenge=challenge,
+        team=team,
+        code=code,
+        language=language,
+    )
+    print(f"[SUBMISSION-QUEUE] Job {job.id} en file (challenge {challenge.id}, user {user.id})")
+    return job
+
+
+def accepted_payload(job: SubmissionJob) -> dict:
+    """Corps de la réponse 202 renvoyée à la mise en file"""
+    return {
+        'job_id': str(job.id),
+        'status': job.status,
+        'queue_position': job.queue_position(),
+        'status_url': reverse('api:submission-status', args=[job.id]),
+    }
+
+
+def process(job: SubmissionJob):
+    """Corrige un job réservé par un worker et enregistre son résultat"""
+    try:
+        job.start_progress(len(get_bundle(job.challenge)))
+
+        if job.team_id:
+            from contests.grading import grade_contest_submission
+            payload, http_status = grade_contest_submission(
+                job.user, job.team, job.challenge, job.code, job.language,
+                submitted_at=job.created_at,
+                on_result=job.record_test_result,
+            )
+        else:
+            from .grading import grade_challenge_submission
+            payload, http_status = grade_challenge_submission(
+                job.user, job.challenge, job.code, job.language,
+                submitted_at=job.created_at,
+                on_result=job.record_test_result,
+            )
+
+        job.finish(payload, http_status)
+        print(f"[SUBMISSION-QUEUE] Job {job.id} terminé ({http_status})")
+    except Exception as e:
+        logger.error(f"Erreur lors de la correction du job {job.id} : {str(e)}")
+        job.fail(f"Erreur serveur : {str(e)}")
@@ -0,0 +1,167 @@
+# api/test_bundle.py
+
+"""
+"Bundle" de tests d'un challenge : la liste immuable des test cases prête
+à être exécutée (inputs, sorties attendues déjà normalisées, XP par test,
+flag sample).
+
+Un bundle correspond à une version des tests du challenge
+(Challenge.tests_version, incrémentée à chaque modification d'un TestCase).
+Il est construit une seule fois puis gardé en mémoire dans chaque worker et
+partagé par tous les endpoints de test et de soumission. Les bundles de
+taille raisonnable (CACHE_MAX_BUNDLE_BYTES) sont aussi copiés dans la
+région "test_bundles" du cache partagé, pour les autres workers.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+
+from . import cache_regions, file_cache, result_cache
+from .challenge_validator import normalize_lines
+from .lru import LRUCache
+
+
+@dataclass(frozen=True)
+class BundleCase:
+    """Un test case prêt à être exécuté"""
+    id: int
+    order: int
+    input_content: str
+    expected_output: str
+    expected_lines: Tuple[str, ...]
+    xp_reward: int
+    is_sample: bool
+
+    def as_test_data(self) -> Dict[str, Any]:
+        """Format attendu par ChallengeValidator.validate_submission"""
+        return {
+            'input_content': self.input_content,
+            'expected_output': self.expected_output,
+            'expected_lines': self.expected_lines,
+            'order': self.order,
+            'xp_reward': self.xp_reward,
+        }
+
+
+@dataclass(frozen=True)
+class TestBundle:
+    challenge_id: int
+    version: int
+    cases: Tuple[BundleCase, ...]
+    size: int
+    # False si un fichier n'a pas pu être lu : ni le bundle ni ses résultats
+    # ne sont mis en cache
+    complete: bool = True
+
+    def __len__(self) -> int:
+        return len(self.cases)
+
+    @property
+    def xp_total(self) -> int:
+        return sum(case.xp_reward for case in self.cases)
+
+    def test_data(self) -> List[Dict[str, Any]]:
+        return [case.as_test_data() for case in self.cases]
+
+    def get_case(self, test_case_id: int) -> Optional[BundleCase]:
+        for case in self.cases:
+            if case.id == test_case_id:
+                return case
+        return None
+
+    def xp_for(self, results: Iterable[Dict[str, Any]]) -> int:
+        """XP obtenue : somme des XP des test cases réussis"""
+        xp = 0
+        for result in results:
+            if result.get('passed'):
+                index = result.get('test_number', 1) - 1
+                if 0 <= index < len(self.cases):
+                    xp += self.cases[index].xp_reward
+        return xp
+
+
+_bundles = LRUCache(
+    max_bytes=settings.TEST_BUNDLE_CACHE_MEMORY_BYTES,
+    sizeof=lambda bundle: bundle.size,
+)
+
+
+def _read_side(test_case, side: str) -> Tuple[str, bool]:
+    """
+    Contenu d'un côté ('input' ou 'output') d'un test case.
+    Le booléen est False si le fichier n'a pas pu être lu.
+    """
+    if test_case.has_stored_contents(side):
+        return getattr(test_case, f'get_{side}')(), True
+    file_field = getattr(test_case, f'{side}_file')
+    if not file_field:
+        return "", True
+    try:
+        return file_cache.fetch_text(file_field), True
+    except Exception as e:
+        print(f"[TEST-BUNDLE] Lecture impossible ({side}, test case {test_case.pk}) : {e}")
+        return "", False
+
+
+def build_bundle(challenge) -> TestBundle:
+    """Construit le bundle d'un challenge à partir de la base"""
+    version = challenge.tests_version
+    cases = []
+    complete = True
+    size = 0
+
+    for tc in challenge.test_cases.order_by('order', 'id'):
+        input_content, input_ok = _read_side(tc, 'input')
+        expected_output, output_ok = _read_side(tc, 'output')
+        complete = complete and input_ok and output_ok
+        size += len(input_content) + len(expected_output)
+        cases.append(BundleCase(
+            id=tc.pk,
+            order=tc.order,
+            input_content=input_content,
+            expected_output=expected_output,
+            expected_lines=tuple(normalize_lines(expected_output)),
+            xp_reward=tc.xp_reward,
+            is_sample=tc.is_sample,
+        ))
+
+    bundle = TestBundle(
+        challenge_id=challenge.pk,
+        version=version,
+        cases=tuple(cases),
+        size=size,
+        complete=complete,
+    )
+    return bundle
+
+
+def get_bundle(challenge) -> TestBundle:
+    """
+    Bundle de tests d'un challenge, depuis le cache du worker si la version
+    en mémoire correspond à Challenge.tests_version
+    """
+    bundle = _bundles.get(challenge.pk)
+    if bundle is not None and bundle.version == challenge.tests_version:
+        return bundle
+
+    shared_key = ('bundle', challenge.pk, challenge.tests_version)
+    bundle = cache_regions.region('test_bundles').get(shared_key)
+    if bundle is not None:
+        _bundles.set(challenge.pk, bundle)
+        return bundle
+
+    bundle = build_bundle(challenge)
+    if bundle.complete:
+        _bundles.set(challenge.pk, bundle)
+        if bundle.size <= settings.CACHE_MAX_BUNDLE_BYTES:
+            cache_regions.region('test_bundles').set(shared_key, bundle)
+        # Les résultats mémorisés pour les versions précédentes ne servent plus
+        result_cache.discard_challenge(challenge.pk, keep_version=bundle.version)
+    print(f"[TEST-BUNDLE] Challenge {challenge.pk} v{bundle.version} : {len(bundle)} test(s) chargé(s)")
+    return bundle
+
+
+def get_stats() -> dict:
+    return _bundles.stats()
@@ -1,3 +1,381 @@
-from django.test import TestCase
+# api/tests.py
 
-# Create your tests here.
+import datetime
+import os
+import socket
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import executor, file_cache, leaderboard, result_cache
+from .challenge_validator import ChallengeValidator
+from .management.commands.run_stub_executor import make_handler
+from .models import Challenge, LeaderboardEntry, SubmissionJob, UserChallengeAttempt
+
+User = get_user_model()
+
+SUM_CODE = "a = int(input())\nb = int(input())\nprint(a + b)\n"
+
+TEST_CASES = [
+    {'input_content': '1\n2', 'expected_output': '3', 'order': 1},
+    {'input_content': '10\n-4', 'expected_output': '6', 'order': 2},
+    {'input_content': '0\n0', 'expected_output': '1', 'order': 3},
+]
+
+
+def make_user(username, **fields):
+    return User.objects.create(
+        username=username,
+        email=f'{username}@example.com',
+        numero_inscription=f'N-{username}',
+        **fields
+    )
+
+
+def make_challenge(slug):
+    return Challenge.objects.create(
+        title=slug.upper(), slug=slug, description_file='raw/upload/v1/description.txt'
+    )
+
+
+def ranked_rows():
+    # Lignes affichées par le classement global (les lignes sans XP n'y figurent pas)
+    return leaderboard.ranked_entries().values_list(
+        'user_id', 'username', 'total_xp', 'challenges_completed', 'total_completion_time'
+    )
+
+
+@override_settings(EXECUTOR_BATCH_MODE='auto')
+class StubExecutorValidationTests(TestCase):
+    """validate_submission contre le stub local (run_stub_executor)"""
+
+    def start_stub(self, batch_enabled):
+        calls = []
+        server = ThreadingHTTPServer(
+            ('127.0.0.1', 0), make_handler(timeout=5, batch_enabled=batch_enabled, log=calls.append)
+        )
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = f'http://127.0.0.1:{server.server_port}/'
+        patcher = mock.patch.object(executor, 'EXECUTOR_API_URL', url)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return calls
+
+    def setUp(self):
+        executor._batch_support.update(supported=None, checked_at=0.0)
+        self.addCleanup(executor._batch_support.update, supported=None, checked_at=0.0)
+
+    def assert_sum_results(self, summary):
+        self.assertEqual(summary['total_tests'], 3)
+        self.assertEqual(summary['passed_tests'], 2)
+        self.assertFalse(summary['success'])
+        self.assertEqual([r['test_number'] for r in summary['results']], [1, 2, 3])
+        self.assertEqual([r['passed'] for r in summary['results']], [True, True, False])
+        self.assertEqual(summary['results'][2]['expected_output'], '1')
+
+    def test_batch_mode_runs_all_inputs_in_one_call(self):
+        calls = self.start_stub(batch_enabled=True)
+
+        summary = ChallengeValidator(timeout=5).validate_submission(SUM_CODE, TEST_CASES, 'python')
+
+        self.assert_sum_results(summary)
+        self.assertEqual(calls, ["[STUB] batch python : 3 entrée(s)"])
+        self.assertIs(executor._batch_support['supported'], True)
+
+    def test_no_batch_falls_back_to_one_call_per_test(self):
+        calls = self.start_stub(batch_enabled=False)
+
+        summary = ChallengeValidator(timeout=5).validate_submission(SUM_CODE, TEST_CASES, 'python')
+
+        self.assert_sum_results(summary)
+        # Un appel batch ignoré ({"output"} au lieu de {"results"}), puis un appel par test
+        self.assertEqual(len(calls), 4)
+        self.assertIs(executor._batch_support['supported'], False)
+        self.assertFalse(executor.batch_mode_available())
+
+        calls.clear()
+        ChallengeValidator(timeout=5).validate_submission(SUM_CODE, TEST_CASES, 'python')
+        self.assertEqual(calls, ["[STUB] exécution python"] * 3)
+
+    def test_results_are_memoized(self):
+        calls = self.start_stub(batch_enabled=True)
+        key = ('stub-test', 'memoized', SUM_CODE)
+
+        first = ChallengeValidator(timeout=5).validate_submission(SUM_CODE, TEST_CASES, 'python', cache_key=key)
+        second = ChallengeValidator(timeout=5).validate_submission(SUM_CODE, TEST_CASES, 'python', cache_key=key)
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(calls), 1)
+
+    def test_infra_failures_are_not_memoized(self):
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        key = ('stub-test', 'unreachable', SUM_CODE)
+
+        with mock.patch.object(executor, 'EXECUTOR_API_URL', f'http://127.0.0.1:{port}/'):
+            summary = ChallengeValidator(timeout=5).validate_submission(
+                SUM_CODE, TEST_CASES, 'python', cache_key=key
+            )
+
+        self.assertEqual(summary['passed_tests'], 0)
+        self.assertTrue(all(r['error'] for r in summary['results']))
+        self.assertIsNone(result_cache.lookup(key))
+
+    def test_waits_are_measured(self):
+        slots = executor.MeasuredSemaphore(1)
+
+        def acquire():
+            with slots:
+                pass
+
+        with slots:
+            waiter = threading.Thread(target=acquire)
+            waiter.start()
+            waiter.join(0.2)
+        waiter.join()
+
+        stats = slots.stats()
+        self.assertEqual((stats['acquisitions'], stats['waits'], stats['size']), (2, 1, 1))
+        self.assertGreater(stats['wait_seconds'], 0.1)
+
+    def test_only_connection_errors_are_retried(self):
+        retries = executor.get_session().get_adapter('http://executor.test/').max_retries
+
+        self.assertEqual(retries.connect, executor.settings.EXECUTOR_CONNECT_RETRIES)
+        self.assertEqual(retries.read, 0)
+        self.assertEqual(retries.status, 0)
+        self.assertEqual(retries.other, 0)
+
+
+class StatsDeltaTests(TestCase):
+    """Les compteurs tenus par variations égalent un recalcul complet"""
+
+    def setUp(self):
+        self.alice = make_user('alice')
+        self.bob = make_user('bob')
+        self.challenges = [make_challenge(f'c{i}') for i in range(3)]
+
+    def assert_consistent(self):
+        users = {
+            user.pk: (user.total_xp, user.challenges_joined)
+            for user in User.objects.all()
+        }
+        entries = set(ranked_rows())
+
+        self.assertEqual(User.reconcile_stats(), 0)
+        self.assertEqual(
+            {user.pk: (user.total_xp, user.challenges_joined) for user in User.objects.all()},
+            users
+        )
+        LeaderboardEntry.rebuild()
+        self.assertEqual(set(ranked_rows()), entries)
+
+    def test_attempt_save_update_delete(self):
+        first = UserChallengeAttempt.objects.create(user=self.alice, challenge=self.challenges[0])
+        second = UserChallengeAttempt.objects.create(user=self.alice, challenge=self.challenges[1])
+        UserChallengeAttempt.objects.create(user=self.bob, challenge=self.challenges[0])
+        self.assert_consistent()
+
+        first.xp_earned = 30
+        first.save()
+        self.assert_consistent()
+
+        first.mark_as_completed(xp_earned=50)
+        second.mark_as_completed(xp_earned=20)
+        self.assert_consistent()
+        self.assertEqual(LeaderboardEntry.objects.get(user=self.alice).challenges_completed, 2)
+
+        reloaded = UserChallengeAttempt.objects.get(pk=second.pk)
+        reloaded.status = 'in_progress'
+        reloaded.completion_time = None
+        reloaded.save()
+        self.assert_consistent()
+
+        UserChallengeAttempt.objects.get(pk=first.pk).delete()
+        self.assert_consistent()
+        self.assertIsNone(LeaderboardEntry.objects.get(user=self.alice).total_completion_time)
+
+    def test_stale_instances_do_not_count_twice(self):
+        attempt = UserChallengeAttempt.objects.create(user=self.alice, challenge=self.challenges[0])
+        first = UserChallengeAttempt.objects.get(pk=attempt.pk)
+        second = UserChallengeAttempt.objects.get(pk=attempt.pk)
+
+        first.xp_earned = 30
+        first.save()
+        second.xp_earned = 50
+        second.save()
+
+        self.assertEqual(User.objects.get(pk=self.alice.pk).total_xp, 50)
+        self.assertEqual(LeaderboardEntry.objects.get(user=self.alice).total_xp, 50)
+        self.assert_consistent()
+
+        first.delete()
+        second.delete()
+
+        self.assertEqual(User.objects.get(pk=self.alice.pk).challenges_joined, 0)
+        self.assert_consistent()
+
+    def test_sync_team_result(self):
+        UserChallengeAttempt.objects.create(user=self.alice, challenge=self.challenges[2], xp_earned=40)
+        submitted_at = timezone.now()
+
+        UserChallengeAttempt.sync_team_result(self.challenges[2], [self.alice.pk, self.bob.pk], 25, False, submitted_at)
+        self.assert_consistent()
+
+        UserChallengeAttempt.sync_team_result(self.challenges[2], [self.alice.pk, self.bob.pk], 60, True, submitted_at)
+        self.assert_consistent()
+        self.assertEqual(
+            sorted(UserChallengeAttempt.objects.values_list('xp_earned', 'status')),
+            [(60, 'completed'), (60, 'completed')]
+        )
+
+    def test_add_deltas_creates_missing_entries(self):
+        UserChallengeAttempt.objects.create(user=self.bob, challenge=self.challenges[0], xp_earned=15)
+        LeaderboardEntry.objects.all().delete()
+
+        LeaderboardEntry.add_deltas({self.bob.pk: (5, 0, 0)})
+
+        # Ligne recréée depuis les tentatives (la variation y est déjà comprise)
+        self.assertEqual(LeaderboardEntry.objects.get(user=self.bob).total_xp, 15)
+
+    def test_rename_updates_leaderboard_entry(self):
+        UserChallengeAttempt.objects.create(user=self.alice, challenge=self.challenges[0], xp_earned=10)
+
+        self.alice.username = 'alicia'
+        self.alice.save(update_fields=['username'])
+        self.assertEqual(LeaderboardEntry.objects.get(user=self.alice).username, 'alicia')
+
+        self.alice.username = 'ali'
+        self.alice.save()
+        self.assertEqual(LeaderboardEntry.objects.get(user=self.alice).username, 'ali')
+
+
+class SubmissionJobQueueTests(TestCase):
+
+    def setUp(self):
+        self.user = make_user('carol')
+        self.challenge = make_challenge('queue')
+
+    def make_job(self, **fields):
+        return SubmissionJob.objects.create(
+            user=self.user, challenge=self.challenge, code='print(1)', language='python', **fields
+        )
+
+    def test_claim_next_takes_oldest_queued_job(self):
+        older = self.make_job()
+        self.make_job()
+        SubmissionJob.objects.filter(pk=older.pk).update(created_at=timezone.now() - datetime.timedelta(minutes=1))
+
+        job = SubmissionJob.claim_next('worker-1')
+
+        self.assertEqual(job.pk, older.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.worker, job.tries), ('running', 'worker-1', 1))
+        self.assertIsNotNone(job.started_at)
+
+        SubmissionJob.claim_next('worker-1')
+        self.assertIsNone(SubmissionJob.claim_next('worker-1'))
+
+    def test_requeue_stale(self):
+        long_ago = timezone.now() - datetime.timedelta(hours=1)
+        retry = self.make_job(status='running', tries=1, started_at=long_ago)
+        exhausted = self.make_job(status='running', tries=3, started_at=long_ago)
+        recent = self.make_job(status='running', tries=1, started_at=timezone.now())
+
+        self.assertEqual(SubmissionJob.requeue_stale(max_running_seconds=60, max_tries=3), (1, 1))
+
+        statuses = dict(SubmissionJob.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses[retry.pk], 'queued')
+        self.assertEqual(statuses[exhausted.pk], 'failed')
+        self.assertEqual(statuses[recent.pk], 'running')
+
+
+class ConditionalLeaderboardTests(TestCase):
+
+    def setUp(self):
+        self.user = make_user('dave', nom='Martin', prenom='Paul')
+        self.challenge = make_challenge('etag')
+        UserChallengeAttempt.objects.create(user=self.user, challenge=self.challenge, xp_earned=10)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.urls = [
+            f'/api/challenges/{self.challenge.pk}/leaderboard/',
+            '/api/leaderboard/global/',
+        ]
+
+    def test_not_modified_until_leaderboard_changes(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                etag = response['ETag']
+
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], etag)
+
+        attempt = UserChallengeAttempt.objects.get(user=self.user)
+        attempt.xp_earned = 40
+        attempt.save()
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_profile_edit_changes_etags(self):
+        etags = {url: self.client.get(url)['ETag'] for url in self.urls}
+
+        user = User.objects.get(pk=self.user.pk)
+        user.nom = 'Durand'
+        user.save()
+
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('Durand', response.content.decode())
+
+    def test_global_etag_is_a_stored_version(self):
+        url = '/api/leaderboard/global/'
+        etag = self.client.get(url)['ETag']
+        # 304 : une seule lecture (la version), sans agrégat sur le classement
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # Inscription sans XP : challenges_joined affiché change
+        UserChallengeAttempt.objects.create(user=self.user, challenge=make_challenge('joined'))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['leaderboard'][0]['challenges_joined'], 2)
+
+        etag = response['ETag']
+        LeaderboardEntry.rebuild()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class FileCacheDiskBudgetTests(TestCase):
+
+    def test_prune_removes_least_recently_used_files(self):
+        with tempfile.TemporaryDirectory() as cache_dir, override_settings(CLOUDINARY_CACHE_DIR=cache_dir):
+            keys = [f'{i:02d}' + 'a' * 62 for i in range(10)]
+            for i, key in enumerate(keys):
+                os.makedirs(os.path.dirname(file_cache._disk_path(key)), exist_ok=True)
+                with open(file_cache._disk_path(key), 'w') as f:
+                    f.write('x' * 100)
+                os.utime(file_cache._disk_path(key), (i, i))
+            # Lecture : le plus ancien fichier redevient le plus récent
+            self.assertEqual(file_cache._read_disk(keys[0]), 'x' * 100)
+
+            self.assertEqual(file_cache.prune_disk(max_bytes=500), 6)
+
+            kept = [key for key in keys if os.path.exists(file_cache._disk_path(key))]
+            self.assertEqual(kept, [keys[0]] + keys[7:])
@@ -8,6 +8,8 @@ from .views import (
     HealthCheckView,
     SupportedLanguagesView,
     SecurityInfoView,
+    ExecutorStatsView,
+    CacheStatsView,
     
     # Challenges
     ChallengeViewSet,
@@ -16,9 +18,13 @@ from .views import (
     submit_challenge_solution,
     my_challenges,
     test_challenge_solution,
+    test_challenge_solution_stream,
     test_specific_test_case,
     save_code,
 
+    # Soumissions en file
+    submission_status,
+
     # Leaderboards
     challenge_leaderboard,
     global_leaderboard,
@@ -40,15 +46,21 @@ urlpatterns = [
     path('health/', HealthCheckView.as_view(), name='health'),
     path('languages/', SupportedLanguagesView.as_view(), name='languages'),
     path('security-info/', SecurityInfoView.as_view(), name='security-info'),
+    path('executor/stats/', ExecutorStatsView.as_view(), name='executor-stats'),
+    path('cache/stats/', CacheStatsView.as_view(), name='cache-stats'),
     
     # Actions sur les challenges
     path('challenges/<int:challenge_id>/join/', join_challenge, name='join-challenge'),
     path('challenges/<int:challenge_id>/test/', test_challenge_solution, name='test-challenge'),
+    path('challenges/<int:challenge_id>/test/stream/', test_challenge_solution_stream, name='test-challenge-stream'),
     path('challenges/<int:challenge_id>/test-case/<int:test_case_id>/',test_specific_test_case,name='test-specific-testcase'),
     path('challenges/<int:challenge_id>/submit/', submit_challenge_solution, name='submit-challenge'),
     path('challenges/my-challenges/', my_challenges, name='my-challenges'),
     path('challenges/<int:challenge_id>/save-code/', save_code, name='save-code'),
 
+    # Suivi des soumissions mises en file
+    path('submissions/<uuid:job_id>/', submission_status, name='submission-status'),
+
     # Leaderboards
     path('challenges/<int:challenge_id>/leaderboard/', challenge_leaderboard, name='challenge-leaderboard'),
     path('leaderboard/global/', global_leaderboard, name='global-leaderboard'),
@@ -1,6 +1,12 @@
 from rest_framework.response import Response
 from rest_framework import status
-from api.models import Challenge, TestCase
+from api.models import Challenge
+from api.test_bundle import get_bundle
+from api import conditional
+from api import result_cache
+from api.grading import grade_challenge_submission
+from api import submission_queue
+from api.submission_queue import wants_async
 from api.serializers import (
     UserChallengeAttemptSerializer
 )
@@ -10,11 +16,13 @@ from django.contrib.auth import get_user_model
 from api.models import UserChallengeAttempt, UserCodeSave
 
 from django.shortcuts import get_object_or_404
-from django.db.models import F
+from django.db.models import Count, Max, Sum
+from django.http import StreamingHttpResponse
 
 
 User = get_user_model()
 
+import json
 import logging
 
 logger = logging.getLogger(__name__)
@@ -63,27 +71,23 @@ def get_language(request):
         raise ValueError(f"Langage '{language}' non supporté. Langages acceptés : {', '.join(SUPPORTED_LANGUAGES)}.")
     return language
 
+def get_stop_on_failure(request):
+    """Option 'stop_on_failure' du body : arrêter l'exécution au premier test échoué"""
+    value = request.data.get('stop_on_failure', False)
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    return bool(value)
 
-def get_test_cases(challenge):
-    test_cases = challenge.test_cases.all()
-    if not test_cases.exists():
+
+def get_test_bundle(challenge):
+    """Bundle de tests du challenge (construit une fois par version, voir api/test_bundle.py)"""
+    bundle = get_bundle(challenge)
+    if not bundle.cases:
         return Response(
             {'error': 'Ce challenge ne contient pas encore de tests.'},
             status=status.HTTP_400_BAD_REQUEST
         )
-    return test_cases
-
-
-def build_test_data(test_cases):
-    return [
-        {
-            'input_content': tc.get_input(),
-            'expected_output': tc.get_output(),
-            'order': tc.order,
-            'xp_reward': tc.xp_reward
-        }
-        for tc in test_cases
-    ]
+    return bundle
 
 
 def validate_code_security(code):
@@ -118,45 +122,31 @@ def join_challenge(request, challenge_id):
         return challenge
     
     # Vérifier si l'utilisateur a déjà rejoint ce challenge
-    attempt, created = UserChallengeAttempt.objects.get_or_create(
-        user=request.user,
-        challenge=challenge
-    )
-    
-    if created:
-        print(f"[join_challenge] L'utilisateur {request.user.email} a rejoint le challenge {challenge_id}")
-        new_participants = 1
-        
-        # Mettre à jour les stats du créateur
-        if hasattr(request.user, 'update_stats'):
-            request.user.update_stats()
-            
+    if UserChallengeAttempt.objects.filter(user=request.user, challenge=challenge).exists():
+        created = False
+    else:
+        user_ids = [request.user.id]
+
         # Si le challenge appartient à au moins un contest, 
         # on inscrit aussi les membres de ses équipes
         if challenge.contests.exists():
             # Trouver tous les membres de toutes les équipes de l'utilisateur
             # pour les inscrire également
-            team_members = User.objects.filter(
+            user_ids += list(User.objects.filter(
                 team_memberships__in=Team.objects.filter(membres=request.user)
-            ).distinct().exclude(id=request.user.id)
-            
-            for member in team_members:
-                _, m_created = UserChallengeAttempt.objects.get_or_create(
-                    user=member,
-                    challenge=challenge
-                )
-                if m_created:
-                    print(f"[join_challenge] Co-membre {member.email} rejoint automatiquement (Challenge de Contest)")
-                    new_participants += 1
-                    if hasattr(member, 'update_stats'):
-                        member.update_stats()
+            ).distinct().exclude(id=request.user.id).values_list('id', flat=True))
         else:
             print(f"[join_challenge] Challenge {challenge_id} n'appartient à aucun contest, pas d'auto-join d'équipe.")
-        
-        # Mettre à jour le compteur global de participants
-        Challenge.objects.filter(id=challenge.id).update(
-            participants_count=F('participants_count') + new_participants
-        )
+
+        # Une insertion groupée + mise à jour des compteurs, dans une transaction
+        joined_ids = UserChallengeAttempt.bulk_join(challenge, user_ids)
+        created = request.user.id in joined_ids
+        new_participants = len(joined_ids)
+
+    if created:
+        print(f"[join_challenge] L'utilisateur {request.user.email} a rejoint le challenge {challenge_id}")
+        if new_participants > 1:
+            print(f"[join_challenge] {new_participants - 1} co-membre(s) rejoint(s) automatiquement (Challenge de Contest)")
         
         return Response({
             'message': True,
@@ -179,7 +169,9 @@ def test_challenge_solution(request, challenge_id):
     
     POST /api/challenges/{id}/test/
     Body: {
-        "code": "..."
+        "code": "...",
+        "language": "python",
+        "stop_on_failure": false   (optionnel : s'arrêter au premier échec)
     }
     """
 
@@ -197,6 +189,7 @@ def test_challenge_solution(request, challenge_id):
     try:
         code = get_code(request)
         language = get_language(request)
+        stop_on_failure = get_stop_on_failure(request)
         print(f"\n--- [test_challenge_solution] ---\nChallenge ID: {challenge_id}\nUser: {request.user.email}\nLanguage: {language}\nCode length: {len(code)}\n---")
     except ValueError as e:
         print(f"!!! [test_challenge_solution] ValueError: {str(e)}")
@@ -207,20 +200,24 @@ def test_challenge_solution(request, challenge_id):
     # if resp_security is not True:
     #     return resp_security
 
-    # Récupérer les test cases associés au challenge
-    test_cases = get_test_cases(challenge)
-    if isinstance(test_cases, Response):
-        return test_cases
-
-    # Convertir les test cases en données que le validateur peut exécuter
-    test_data = build_test_data(test_cases)
+    # Récupérer les test cases du challenge, prêts à être exécutés
+    bundle = get_test_bundle(challenge)
+    if isinstance(bundle, Response):
+        return bundle
+    test_data = bundle.test_data()
 
     # Exécuter les tests du challenge avec le code soumis
     try:
         from api.challenge_validator import ChallengeValidator
         validator = ChallengeValidator(timeout=10)
 
-        result = validator.validate_submission(code, test_data, language)
+        result = validator.validate_submission(
+            code, test_data, language,
+            stop_on_failure=stop_on_failure,
+            cache_key=result_cache.make_key(
+                bundle, code, language, validator.timeout, stop_on_failure
+            )
+        )
 
         # Ajout d'un message explicite pour le frontend selon le succès ou l'échec
         if result['success']:
@@ -246,6 +243,96 @@ def test_challenge_solution(request, challenge_id):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def test_challenge_solution_stream(request, challenge_id):
+    """
+    Variante de test_challenge_solution qui envoie chaque résultat dès que
+    le test case est terminé (NDJSON : un objet JSON par ligne).
+
+    POST /api/challenges/{id}/test/stream/
+    Body: identique à /test/
+
+    Lignes envoyées :
+        {"type": "start", "total_tests": 5}
+        {"type": "result", "test_number": 2, "passed": true, ...}   (ordre de fin)
+        {"type": "summary", "success": false, "passed_tests": 4, ...}
+    Fermer la connexion arrête l'exécution des tests restants.
+    """
+
+    attempt = verify_userjoin_challenge(request, challenge_id)
+    if isinstance(attempt, Response):
+        return attempt
+
+    challenge = get_challenge_active(challenge_id)
+    if isinstance(challenge, Response):
+        return challenge
+
+    try:
+        code = get_code(request)
+        language = get_language(request)
+        stop_on_failure = get_stop_on_failure(request)
+        print(f"\n--- [test_challenge_solution_stream] ---\nChallenge ID: {challenge_id}\nUser: {request.user.email}\nLanguage: {language}\nCode length: {len(code)}\n---")
+    except ValueError as e:
+        print(f"!!! [test_challenge_solution_stream] ValueError: {str(e)}")
+        return Response({'error': str(e)}, status=400)
+
+    bundle = get_test_bundle(challenge)
+    if isinstance(bundle, Response):
+        return bundle
+
+    from api.challenge_validator import ChallengeValidator
+    validator = ChallengeValidator(timeout=10)
+
+    def stream():
+        total_tests = len(bundle)
+        passed_tests = 0
+        skipped_tests = 0
+        yield _ndjson({'type': 'start', 'total_tests': total_tests})
+        try:
+            for result in validator.iter_results(
+                code, bundle.test_data(), language,
+                stop_on_failure=stop_on_failure
+            ):
+                if result['passed']:
+                    passed_tests += 1
+                if result.get('skipped'):
+                    skipped_tests += 1
+                yield _ndjson({'type': 'result', **result})
+        except Exception as e:
+            logger.error(f"Erreur lors du test (stream) de la solution : {str(e)}")
+            yield _ndjson({'type': 'error', 'error': f"Erreur serveur : {str(e)}"})
+            return
+
+        success = passed_tests == total_tests
+        if success:
+            message = "✅ Tous les tests ont réussi ! Vous pouvez soumettre votre solution."
+        else:
+            message = (
+                f"❌ {passed_tests}/{total_tests} tests réussis. "
+                "Corrigez votre code avant de soumettre."
+            )
+        print(f"--- [test_challenge_solution_stream] Response ---\nSuccess: {success}\nPassed: {passed_tests}/{total_tests}\n---")
+        yield _ndjson({
+            'type': 'summary',
+            'success': success,
+            'passed_tests': passed_tests,
+            'total_tests': total_tests,
+            'skipped_tests': skipped_tests,
+            'message': message,
+        })
+
+    response = StreamingHttpResponse(stream(), content_type='application/x-ndjson')
+    response['Cache-Control'] = 'no-cache'
+    # Désactiver le buffering de nginx pour que chaque ligne parte aussitôt
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _ndjson(data):
+    return json.dumps(data, ensure_ascii=False) + "\n"
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def submit_challenge_solution(request, challenge_id):
@@ -253,9 +340,11 @@ def submit_challenge_solution(request, challenge_id):
     Soumission officielle d'une solution avec système d'XP progressif.
     Si tous les tests sont réussis et l'XP nécessaire est atteinte,
     la solution est validée et sauvegardée.
+
+    Avec "async": true dans le body, la soumission est mise en file et la
+    réponse (202) contient l'identifiant du job à suivre sur
+    GET /api/submissions/{job_id}/
     """
-    from django.utils import timezone
-    from api.challenge_validator import ChallengeValidator
 
     # Récupérer le challenge actif
     challenge = get_challenge_active(challenge_id)
@@ -284,89 +373,20 @@ def submit_challenge_solution(request, challenge_id):
     # if resp_security is not True:
     #     return resp_security
 
-    # Récupérer les test cases du challenge
-    test_cases = get_test_cases(challenge)
-    if isinstance(test_cases, Response):
-        return test_cases
-
-    # Convertir les test cases dans un format exécutable par le validateur
-    test_data = build_test_data(test_cases)
+    # Vérifier que le challenge contient des tests
+    bundle = get_test_bundle(challenge)
+    if isinstance(bundle, Response):
+        return bundle
 
-    # Incrémenter le nombre de tentatives pour l'utilisateur
-    attempt.attempts_count += 1
-    attempt.save()
+    # Mode asynchrone : mise en file, la correction est faite par un worker
+    if wants_async(request):
+        job = submission_queue.enqueue(request.user, challenge, code, language)
+        return Response(submission_queue.accepted_payload(job), status=status.HTTP_202_ACCEPTED)
 
     # Exécuter les tests sur le code soumis
     try:
-        validator = ChallengeValidator(timeout=10)
-        result = validator.validate_submission(code, test_data, language)
-
-        passed_tests = result.get('passed_tests', 0)
-        total_tests = result.get('total_tests', len(test_data))
-
-        # Calcul de l'XP obtenue basé sur chaque test case réussi
-        xp_current_submit = 0
-        for test_result in result.get('results', []):
-            if test_result.get('passed'):
-                test_num = test_result.get('test_number', 1) - 1
-                if 0 <= test_num < len(test_data):
-                    xp_current_submit += test_data[test_num].get('xp_reward', 0)
-
-        # Si le minimum d'XP requis pour valider n'est pas atteint
-        if xp_current_submit < challenge.xp_required:
-            return Response({
-                'success': False,
-                'message': (
-                    f"Il faut au moins {challenge.xp_required} XP pour valider la soumission. "
-                    f"Actuellement obtenu : {xp_current_submit} XP."
-                ),
-                'passed': passed_tests,
-                'failed': total_tests - passed_tests
-            }, status=status.HTTP_200_OK)
-
-        # Mise à jour de l'XP : on ne diminue jamais l'XP
-        if xp_current_submit > attempt.xp_earned:
-            attempt.xp_earned = xp_current_submit
-
-        # Mise à jour du temps de complétion à la première réussite
-        if attempt.completed_at is None:
-            attempt.completed_at = timezone.now()
-            time_diff = attempt.completed_at - attempt.started_at
-            attempt.completion_time = int(time_diff.total_seconds())
-
-        # Statut → terminé si tous les tests sont passés
-        if passed_tests == total_tests:
-            attempt.status = "completed"
-
-        attempt.save()
-
-        # Si XP minimum requis est atteint → on sauvegarde le code utilisateur
-        if attempt.xp_earned >= challenge.xp_required:
-            UserCodeSave.objects.update_or_create(
-                user=request.user,
-                challenge=challenge,
-                defaults={'code': code}
-            )
-
-        # Mise à jour des statistiques générales de l'utilisateur
-        if hasattr(request.user, 'update_stats'):
-            request.user.update_stats()
-
-        # Calculer le XP total possible pour ce challenge
-        xp_total_possible = sum(tc.get('xp_reward', 0) for tc in test_data)
-
-        # Réponse finale envoyée au frontend
-        print(f"=== [submit_challenge_solution] Response ===\nSuccess: True\nPassed: {passed_tests}\nFailed: {total_tests - passed_tests}\nXP Earned: {attempt.xp_earned}/{xp_total_possible}\nStatus: {attempt.status}\n===")
-        return Response({
-            'success': True,
-            'passed': passed_tests,
-            'failed': total_tests - passed_tests,
-            'xp_earned': attempt.xp_earned,
-            'xp_total': xp_total_possible,
-            'completion_time': attempt.completion_time,
-            'status': attempt.status,
-            'message': f"Soumission enregistrée. XP total : {attempt.xp_earned}/{xp_total_possible}"
-        }, status=status.HTTP_200_OK)
+        payload, http_status = grade_challenge_submission(request.user, challenge, code, language)
+        return Response(payload, status=http_status)
 
     except Exception as e:
         # En cas d'erreur interne pendant l'exécution
@@ -398,9 +418,9 @@ def test_specific_test_case(request, challenge_id, test_case_id):
         return challenge
 
     # Vérifier que le test case appartient bien à ce challenge
-    try:
-        test_case = challenge.test_cases.get(id=test_case_id)
-    except TestCase.DoesNotExist:
+    bundle = get_bundle(challenge)
+    test_case = bundle.get_case(test_case_id)
+    if test_case is None:
         return Response(
             {'error': "Test case introuvable pour ce challenge"},
             status=status.HTTP_404_NOT_FOUND
@@ -426,11 +446,12 @@ def test_specific_test_case(request, challenge_id, test_case_id):
     from api.challenge_validator import ChallengeValidator
     validator = ChallengeValidator(timeout=10)
     try:
-        result = validator.validate_submission(code, [{
-            'input_content': test_case.get_input(),
-            'expected_output': test_case.get_output(),
-            'order': test_case.order
-        }], language)
+        result = validator.validate_submission(
+            code, [test_case.as_test_data()], language,
+            cache_key=result_cache.make_key(
+                bundle, code, language, validator.timeout, test_case_id=test_case.id
+            )
+        )
 
         # print("----------------\n Result : \n", result)
 
@@ -460,12 +481,24 @@ def my_challenges(request):
     GET /api/challenges/my-challenges/
     """
     
-    attempts = UserChallengeAttempt.objects.filter(
-        user=request.user
-    ).select_related('challenge').order_by('-started_at')
+    attempts = UserChallengeAttempt.objects.filter(user=request.user)
+    
+    # 304 si ni les tentatives ni leurs challenges n'ont changé (une requête d'agrégat)
+    version = attempts.aggregate(
+        count=Count('id'),
+        updated=Max('updated_at'),
+        challenges_updated=Max('challenge__updated_at'),
+        tests=Sum('challenge__tests_version'),
+    )
+    validators = conditional.Validators(request, *sorted(version.items()))
+    not_modified = validators.not_modified(request)
+    if not_modified is not None:
+        return not_modified
+    
+    attempts = attempts.select_related('challenge').order_by('-started_at')
     
     serializer = UserChallengeAttemptSerializer(attempts, many=True)
-    return Response(serializer.data)
+    return validators.apply(Response(serializer.data))
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -3,16 +3,18 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework import status, viewsets
 from rest_framework.parsers import MultiPartParser, FormParser
+from django.db.models import Count, Max, Sum, prefetch_related_objects
 from django.shortcuts import get_object_or_404
-from api.models import Challenge, TestCase
+from api import conditional
+from api.models import Challenge, TestCase, UserChallengeAttempt
 from api.serializers import (
     ChallengeListSerializer,
     ChallengeDetailSerializer,
+    ChallengeDetailContext,
     ChallengeCreateSerializer,
     TestCaseCreateSerializer,
     ChallengeStatsSerializer
 )
-from django.db.models import Q
 
 class ChallengeViewSet(viewsets.ModelViewSet):
     """ViewSet pour gérer les challenges"""
@@ -24,23 +26,23 @@ class ChallengeViewSet(viewsets.ModelViewSet):
         Retourne les challenges actifs en excluant ceux qui appartiennent
         à des contests en cours ou à venir
         """
-        from contests.models import Contest
+        from contests import visibility
         
-        # Récupérer les IDs des challenges appartenant à des contests non terminés
-        ongoing_or_upcoming_contests = Contest.objects.filter(
-            Q(statut='ongoing') | Q(statut='upcoming')
-        )
-        
-        excluded_challenge_ids = ongoing_or_upcoming_contests.values_list(
-            'challenges__id', flat=True
-        )
+        # IDs des challenges appartenant à des contests non terminés
+        # (gardés en mémoire, sans jointure sur les contests)
+        excluded_challenge_ids = visibility.hidden_challenge_ids()
         
         # Retourner tous les challenges actifs sauf ceux dans les contests non terminés
-        return Challenge.objects.filter(
+        challenges = Challenge.objects.filter(
             is_active=True
-        ).exclude(
-            id__in=excluded_challenge_ids
         )
+        if excluded_challenge_ids:
+            challenges = challenges.exclude(id__in=excluded_challenge_ids)
+
+        # Liste : statistiques annotées (XP, nombre de tests, terminés) en une requête
+        if self.action == 'list':
+            challenges = Challenge.with_stats(challenges)
+        return challenges
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -53,13 +55,49 @@ class ChallengeViewSet(viewsets.ModelViewSet):
         """Ajoute le request au contexte"""
         context = super().get_serializer_context()
         context['request'] = self.request
+        if self.action == 'list':
+            # Tentatives de l'utilisateur chargées une fois pour toute la liste
+            context['user_attempts'] = ChallengeListSerializer.user_attempts_map(self.request)
         return context
     
+    def list_version(self, request):
+        """
+        Version de la liste (ETag) : challenges (nombre, dernière
+        modification, versions des tests et des classements), tentatives de
+        l'utilisateur et challenges masqués par les contests
+        """
+        from contests import visibility
+
+        challenges = Challenge.objects.aggregate(
+            count=Count('id'),
+            updated=Max('updated_at'),
+            tests=Sum('tests_version'),
+            leaderboards=Sum('leaderboard_version'),
+        )
+        attempts = None
+        if request.user.is_authenticated:
+            attempts = UserChallengeAttempt.objects.filter(user=request.user).aggregate(
+                count=Count('id'), updated=Max('updated_at')
+            )
+        return (
+            tuple(sorted(challenges.items())),
+            tuple(sorted(attempts.items())) if attempts else None,
+            tuple(sorted(visibility.hidden_challenge_ids())),
+        )
+
     def list(self, request):
         """Liste tous les challenges (excluant ceux des contests non terminés)"""
+        # 304 si la liste n'a pas changé depuis la version du client
+        validators = conditional.Validators(request, *self.list_version(request))
+        not_modified = validators.not_modified(request)
+        if not_modified is not None:
+            return not_modified
+
+        # Statistiques annotées + tentatives de l'utilisateur chargées une fois :
+        # nombre de requêtes constant quel que soit le nombre de challenges
         challenges = self.get_queryset()
-        serializer = ChallengeListSerializer(challenges, many=True, context={'request': request})
-        return Response(serializer.data)
+        serializer = ChallengeListSerializer(challenges, many=True, context=self.get_serializer_context())
+        return validators.apply(Response(serializer.data))
     
     def retrieve(self, request, pk=None):
         """
@@ -68,18 +106,23 @@ class ChallengeViewSet(viewsets.ModelViewSet):
         CONTRAINTE ACTIVABLE : Décommentez le bloc ci-dessous pour bloquer
         complètement l'accès aux challenges dans des contests À VENIR
         """
-        from contests.models import Contest
-        
-        # Vérifier si le challenge est dans un contest À VENIR
         challenge = get_object_or_404(Challenge, pk=pk, is_active=True)
+
+        # Contests, tentative, code sauvegardé, description et template :
+        # lus une seule fois pour toute la requête
+        detail = ChallengeDetailContext(challenge, request.user)
         
-        # Seulement bloquer si le contest est À VENIR (pas "ongoing" ou "finished")
-        in_upcoming_contest = Contest.objects.filter(
-            challenges=challenge,
-            statut='upcoming' 
-        ).exists()
+        # 304 si le détail n'a pas changé depuis la version du client
+        validators = conditional.Validators(request, *detail.version)
+        not_modified = validators.not_modified(request)
+        if not_modified is not None:
+            return not_modified
+        
+        # Test cases préchargés : servent au champ test_cases et à xp_reward
+        prefetch_related_objects([challenge], 'test_cases')
         
-        if in_upcoming_contest:
+        # Seulement bloquer si le contest est À VENIR (pas "ongoing" ou "finished")
+        if detail.in_upcoming_contest:
             return Response({
                 'error': 'Ce challenge fait partie d\'un contest à venir',
                 'in_contest': True,
@@ -87,9 +130,8 @@ class ChallengeViewSet(viewsets.ModelViewSet):
                 'message': 'Les détails de ce challenge seront accessibles une fois le contest commencé'
             }, status=status.HTTP_403_FORBIDDEN)
         
-        challenge = get_object_or_404(Challenge, pk=pk, is_active=True)
-        serializer = ChallengeDetailSerializer(challenge, context={'request': request})
-        return Response(serializer.data)
+        serializer = ChallengeDetailSerializer(challenge, context={'request': request, 'detail': detail})
+        return validators.apply(Response(serializer.data))
     
     def create(self, request):
         """Crée un nouveau challenge"""
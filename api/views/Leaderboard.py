@@ -7,10 +7,8 @@ from api.serializers import (
 )
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import api_view, permission_classes
-from django.db.models import F, Q, Count, Case, When, IntegerField, Sum
-from django.contrib.auth import get_user_model
-from api.models import UserChallengeAttempt
-User = get_user_model()
+from django.conf import settings
+from api import conditional, leaderboard
 
 import logging
 
@@ -23,8 +21,9 @@ def challenge_leaderboard(request, challenge_id):
     """
     Retourne le leaderboard d'un challenge spécifique
     Inclut tous les participants (même ceux qui n'ont pas complété)
-    
-    GET /api/challenges/{id}/leaderboard/
+    Page par page, mise en cache jusqu'au prochain changement du classement
+
+    GET /api/challenges/{id}/leaderboard/?offset=0&limit=50
     """
     
     try:
@@ -34,60 +33,47 @@ def challenge_leaderboard(request, challenge_id):
             {'error': 'Challenge introuvable'},
             status=status.HTTP_404_NOT_FOUND
         )
-    
-    # Récupérer toutes les tentatives pour ce challenge
-    attempts = UserChallengeAttempt.objects.filter(
-        challenge=challenge
-    ).select_related('user').order_by(
-        # Tri : completed d'abord, puis XP desc, puis temps asc
-        Case(
-            When(status='completed', then=0),
-            default=1,
-            output_field=IntegerField()
-        ),
-        '-xp_earned',
-        'completion_time',
-        'started_at'
+
+    try:
+        limit = _int_param(
+            request, 'limit', settings.LEADERBOARD_PAGE_SIZE,
+            minimum=1, maximum=settings.LEADERBOARD_MAX_PAGE_SIZE
+        )
+        offset = _int_param(request, 'offset', 0)
+    except ValueError:
+        return Response(
+            {'error': "Paramètres 'offset' et 'limit' invalides"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    # 304 si le classement et les tests n'ont pas changé (versions lues avec le challenge)
+    validators = conditional.Validators(
+        request, challenge.pk, challenge.title, challenge.leaderboard_version, challenge.tests_version
     )
-    
-    # Construire les données du leaderboard
-    leaderboard_data = []
-    rank = 0
-    prev_xp = None
-    prev_time = None
-    
-    for idx, attempt in enumerate(attempts, 1):
-        # Calculer le rang
-        if attempt.status == 'completed':
-            if attempt.xp_earned != prev_xp or attempt.completion_time != prev_time:
-                rank = idx
-                prev_xp = attempt.xp_earned
-                prev_time = attempt.completion_time
-        else:
-            rank = None  # Pas de rang si pas complété
-        
-        leaderboard_data.append({
-            'rank': rank,
-            'user_id': attempt.user.id,
-            'username': attempt.user.username,
-            'nom': attempt.user.nom,
-            'prenom': attempt.user.prenom,
-            'xp_earned': attempt.xp_earned,
-            'completion_time': attempt.completion_time,
-            'completed_at': attempt.completed_at,
-            'status': attempt.status
-        })
-    
-    serializer = ChallengeLeaderboardSerializer(leaderboard_data, many=True)
-    
-    return Response({
-        'challenge': {
-            'id': challenge.id,
-            'title': challenge.title,
-            'xp_reward': challenge.xp_reward
-        },
+    not_modified = validators.not_modified(request)
+    if not_modified is not None:
+        return not_modified
+
+    page = leaderboard.get_challenge_page(challenge, offset, limit)
+    serializer = ChallengeLeaderboardSerializer(page['rows'], many=True)
+    
+    return validators.apply(Response({
+        'challenge': page['challenge'],
+        'total_participants': page['total_participants'],
+        'offset': offset,
+        'limit': limit,
         'leaderboard': serializer.data
-    })
+    }))
+
+
+def _int_param(request, name, default, minimum=0, maximum=None):
+    value = request.query_params.get(name)
+    if value in (None, ''):
+        return default
+    value = int(value)
+    if value < minimum:
+        raise ValueError(name)
+    return min(value, maximum) if maximum is not None else value
 
 
 @api_view(['GET'])
@@ -96,99 +82,70 @@ def global_leaderboard(request):
     """
     Retourne le leaderboard global de tous les utilisateurs
     Tri par XP total, puis par temps de complétion total (plus rapide = meilleur rang)
-    
-    GET /api/leaderboard/global/
+    Lu depuis la table LeaderboardEntry, page par page
+
+    GET /api/leaderboard/global/?offset=0&limit=50
+    GET /api/leaderboard/global/?around=me&limit=11   (lignes autour d'un utilisateur)
     """
-    
-    # Récupérer tous les utilisateurs avec leurs stats
-    users = User.objects.annotate(
-        challenges_completed=Count(
-            'challenge_attempts',
-            filter=Q(challenge_attempts__status='completed')
-        ),
-        total_completion_time=Sum(
-            'challenge_attempts__completion_time',
-            filter=Q(challenge_attempts__status='completed')
+
+    try:
+        limit = _int_param(
+            request, 'limit', settings.LEADERBOARD_PAGE_SIZE,
+            minimum=1, maximum=settings.LEADERBOARD_MAX_PAGE_SIZE
         )
-    ).filter(
-        total_xp__gt=0
-    ).order_by(
-        '-total_xp',           
-        'total_completion_time', 
-        'username'             
-    )
-    
-    # Construire les données du leaderboard
-    leaderboard_data = []
-    rank = 0
-    prev_xp = None
-    prev_time = None
-    
-    for idx, user in enumerate(users, 1):
-        # Le rang change si XP différent OU temps différent
-        if user.total_xp != prev_xp or user.total_completion_time != prev_time:
-            rank = idx
-            prev_xp = user.total_xp
-            prev_time = user.total_completion_time
-        
-        leaderboard_data.append({
-            'rank': rank,
-            'user_id': user.id,
-            'username': user.username,
-            'nom': user.nom,
-            'prenom': user.prenom,
-            'total_xp': user.total_xp,
-            'challenges_joined': user.challenges_joined,
-            'challenges_completed': user.challenges_completed,
-            'total_completion_time': user.total_completion_time
-        })
-    
+        offset = _int_param(request, 'offset', 0)
+    except ValueError:
+        return Response(
+            {'error': "Paramètres 'offset' et 'limit' invalides"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    # 304 si aucune ligne du classement ni aucune inscription n'a changé (version stockée)
+    validators = conditional.Validators(request, leaderboard.global_version())
+    not_modified = validators.not_modified(request)
+    if not_modified is not None:
+        return not_modified
+
+    around = request.query_params.get('around')
+    if around:
+        target_id = request.user.id if around == 'me' else around
+        if not str(target_id).isdigit():
+            return Response(
+                {'error': "Paramètre 'around' invalide (me ou id utilisateur)"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        entry = leaderboard.get_entry(int(target_id))
+        if entry is None:
+            return Response(
+                {'error': "Utilisateur absent du classement"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        # Centrer la page sur l'utilisateur
+        offset = max(0, leaderboard.position_of(entry) - (limit - 1) // 2)
+
+    leaderboard_data = leaderboard.get_page(offset, limit)
     serializer = GlobalLeaderboardSerializer(leaderboard_data, many=True)
-    
-    return Response({
-        'total_users': len(leaderboard_data),
+
+    return validators.apply(Response({
+        'total_users': leaderboard.ranked_entries().count(),
+        'offset': offset,
+        'limit': limit,
         'leaderboard': serializer.data
-    })
+    }))
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def my_stats(request):
     user = request.user
-    
-    attempts = UserChallengeAttempt.objects.filter(user=user)
-    completed = attempts.filter(status='completed')
-    
-    total_completion_time = completed.aggregate(
-        total=Sum('completion_time')
-    )['total'] or 0
-
-    users_ranked = User.objects.annotate(
-        total_completion_time=Sum(
-            'challenge_attempts__completion_time',
-            filter=Q(challenge_attempts__status='completed')
-        )
-    ).filter(
-        total_xp__gt=0
-    ).order_by(
-        '-total_xp',
-        'total_completion_time',
-        'username'
-    )
 
-    global_rank = 1
-    rank = 1
-    prev_xp = None
-    prev_time = None
+    # Compteurs stockés (tenus à jour à chaque tentative)
+    entry = leaderboard.get_stats_entry(user.id)
+    joined = user.challenges_joined
+    completed = entry.challenges_completed
+    total_completion_time = entry.total_completion_time or 0
 
-    for idx, u in enumerate(users_ranked, 1):
-        if u.total_xp != prev_xp or u.total_completion_time != prev_time:
-            rank = idx
-            prev_xp = u.total_xp
-            prev_time = u.total_completion_time
-        if u.id == user.id:
-            global_rank = rank
-            break
+    global_rank = leaderboard.rank_for_entry(entry)
 
     stats = {
         'user': {
@@ -201,22 +158,22 @@ def my_stats(request):
             'photo': user.photo.url if user.photo else None
         },
         'challenges': {
-            'joined': attempts.count(),
-            'completed': completed.count(),
-            'in_progress': attempts.filter(status='in_progress').count(),
+            'joined': joined,
+            'completed': completed,
+            'in_progress': joined - completed,
             'completion_rate': round(
-                (completed.count() / attempts.count() * 100) if attempts.count() > 0 else 0,
+                (completed / joined * 100) if joined > 0 else 0,
                 2
             )
         },
         'ranking': {
             'global_rank': global_rank,
-            'total_users': User.objects.filter(total_xp__gt=0).count()
+            'total_users': leaderboard.ranked_entries().count()
         },
         'performance': {
             'total_completion_time': total_completion_time,
             'average_completion_time': round(
-                total_completion_time / completed.count() if completed.count() > 0 else 0,
+                total_completion_time / completed if completed > 0 else 0,
                 2
             )
         }
@@ -5,8 +5,9 @@ from rest_framework.response import Response
 from rest_framework import status
 from api.serializers import CodeExecutionSerializer
 from api.security import SecurityChecker
-from api.executor import CodeExecutor
+from api.executor import CodeExecutor, get_pool_stats
 from rest_framework import status
+from rest_framework.permissions import IsAdminUser
 from django.contrib.auth import get_user_model
 
 
@@ -157,3 +158,40 @@ class SecurityInfoView(APIView):
             status=status.HTTP_200_OK
         )
 
+
+class CacheStatsView(APIView):
+    """
+    Vue pour surveiller les caches : régions du cache partagé et caches
+    mémoire du processus courant
+    """
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request):
+        from django.conf import settings
+        from api import cache_regions, leaderboard, result_cache, test_bundle
+        from contests import standings
+        
+        return Response({
+            'backend': settings.CACHE_BACKEND,
+            'regions': cache_regions.get_stats(),
+            'memory': {
+                'test_bundles': test_bundle.get_stats(),
+                'test_results': result_cache.get_stats(),
+                'challenge_leaderboards': leaderboard.get_stats(),
+                'contest_standings': standings.get_stats(),
+            },
+        }, status=status.HTTP_200_OK)
+
+
+class ExecutorStatsView(APIView):
+    """
+    Vue pour surveiller le pool de connexions vers l'API d'exécution
+    """
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request):
+        """
+        Retourne les statistiques du pool du processus courant
+        (réutilisation des connexions, attentes, requêtes en cours)
+        """
+        return Response(get_pool_stats(), status=status.HTTP_200_OK)
@@ -0,0 +1,28 @@
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.decorators import api_view, permission_classes
+from api.models import SubmissionJob
+from api.serializers import SubmissionJobSerializer
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def submission_status(request, job_id):
+    """
+    Suivi d'une soumission mise en file ("async": true à la soumission).
+
+    GET /api/submissions/{job_id}/
+    Tant que le job est 'queued' ou 'running', `progress` donne le résultat
+    de chaque test terminé ; une fois 'done', `result` contient la réponse
+    de la soumission et `http_status` son code.
+    """
+    try:
+        job = SubmissionJob.objects.get(pk=job_id)
+    except SubmissionJob.DoesNotExist:
+        return Response({'error': 'Soumission introuvable'}, status=status.HTTP_404_NOT_FOUND)
+
+    if job.user_id != request.user.id and not request.user.is_staff:
+        return Response({'error': 'Soumission introuvable'}, status=status.HTTP_404_NOT_FOUND)
+
+    return Response(SubmissionJobSerializer(job).data, status=status.HTTP_200_OK)
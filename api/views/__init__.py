@@ -1,4 +1,5 @@
 from .Challenges import ChallengeViewSet , TestCaseViewSet
-from .ChallengeAction import join_challenge, test_challenge_solution,test_specific_test_case, submit_challenge_solution, my_challenges, save_code
+from .ChallengeAction import join_challenge, test_challenge_solution, test_challenge_solution_stream, test_specific_test_case, submit_challenge_solution, my_challenges, save_code
 from .Leaderboard import challenge_leaderboard, global_leaderboard, my_stats
-from .Other import ExecuteCodeView, HealthCheckView, SupportedLanguagesView, SecurityInfoView
\ No newline at end of file
+from .Other import ExecuteCodeView, HealthCheckView, SupportedLanguagesView, SecurityInfoView, ExecutorStatsView, CacheStatsView
+from .SubmissionJobs import submission_status
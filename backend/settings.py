@@ -176,6 +176,26 @@ FRONTEND_URL = config("FRONTEND_URL")
 BACKEND_URL = config("BACKEND_URL")
 EXECUTOR_API_URL = config("EXECUTOR_API_URL")
 
+# Exécution parallèle des test cases :
+# - EXECUTOR_MAX_PARALLEL_TESTS : nombre de test cases lancés en même temps pour une soumission
+# - EXECUTOR_GLOBAL_CONCURRENCY : plafond d'appels simultanés vers l'API d'exécution (par processus)
+EXECUTOR_MAX_PARALLEL_TESTS = config("EXECUTOR_MAX_PARALLEL_TESTS", default=4, cast=int)
+EXECUTOR_GLOBAL_CONCURRENCY = config("EXECUTOR_GLOBAL_CONCURRENCY", default=8, cast=int)
+# Envoi de tous les inputs en un seul appel : "auto" (détection) ou "off"
+EXECUTOR_BATCH_MODE = config("EXECUTOR_BATCH_MODE", default="auto").strip().lower()
+# Pool de connexions HTTP vers l'API d'exécution (keep-alive)
+EXECUTOR_POOL_SIZE = config("EXECUTOR_POOL_SIZE", default=10, cast=int)
+EXECUTOR_CONNECT_TIMEOUT = config("EXECUTOR_CONNECT_TIMEOUT", default=3.05, cast=float)
+EXECUTOR_CONNECT_RETRIES = config("EXECUTOR_CONNECT_RETRIES", default=2, cast=int)
+EXECUTOR_RETRY_BACKOFF = config("EXECUTOR_RETRY_BACKOFF", default=0.3, cast=float)
+
+# File de soumissions (mode asynchrone, voir api/submission_queue.py)
+SUBMISSION_WORKER_THREADS = config("SUBMISSION_WORKER_THREADS", default=4, cast=int)
+SUBMISSION_POLL_INTERVAL = config("SUBMISSION_POLL_INTERVAL", default=0.5, cast=float)
+# Un job 'running' depuis plus longtemps est considéré comme abandonné
+SUBMISSION_JOB_TIMEOUT = config("SUBMISSION_JOB_TIMEOUT", default=300, cast=int)
+SUBMISSION_JOB_MAX_TRIES = config("SUBMISSION_JOB_MAX_TRIES", default=2, cast=int)
+
 
 AUTH_USER_MODEL = 'accounts.User'
 
@@ -201,6 +221,66 @@ cloudinary.config(
     api_secret=config('CLOUDINARY_API_SECRET'),
 )
 
+# Cache local des fichiers texte Cloudinary (test cases, descriptions, templates)
+CLOUDINARY_CACHE_DIR = config("CLOUDINARY_CACHE_DIR", default=str(BASE_DIR / ".cache" / "cloudinary"))
+CLOUDINARY_CACHE_MEMORY_BYTES = config("CLOUDINARY_CACHE_MEMORY_BYTES", default=32 * 1024 * 1024, cast=int)
+# Taille maximale du cache disque : au-delà, les fichiers les moins récemment utilisés sont supprimés (0 = sans limite)
+CLOUDINARY_CACHE_DISK_BYTES = config("CLOUDINARY_CACHE_DISK_BYTES", default=512 * 1024 * 1024, cast=int)
+# Contenu des test cases stocké en base : au-delà de cette taille, stockage compressé
+TESTCASE_INLINE_MAX_BYTES = config("TESTCASE_INLINE_MAX_BYTES", default=64 * 1024, cast=int)
+# Bundles de tests gardés en mémoire par worker (api/test_bundle.py)
+TEST_BUNDLE_CACHE_MEMORY_BYTES = config("TEST_BUNDLE_CACHE_MEMORY_BYTES", default=64 * 1024 * 1024, cast=int)
+# Résultats de validation mémorisés (api/result_cache.py) ; TTL à 0 pour désactiver
+TEST_RESULT_CACHE_TTL = config("TEST_RESULT_CACHE_TTL", default=600, cast=int)
+TEST_RESULT_CACHE_MEMORY_BYTES = config("TEST_RESULT_CACHE_MEMORY_BYTES", default=16 * 1024 * 1024, cast=int)
+# Leaderboard global : taille de page par défaut et maximale
+LEADERBOARD_PAGE_SIZE = config("LEADERBOARD_PAGE_SIZE", default=100, cast=int)
+LEADERBOARD_MAX_PAGE_SIZE = config("LEADERBOARD_MAX_PAGE_SIZE", default=500, cast=int)
+# Pages des leaderboards de challenge gardées en mémoire par worker (api/leaderboard.py)
+CHALLENGE_LEADERBOARD_CACHE_ENTRIES = config("CHALLENGE_LEADERBOARD_CACHE_ENTRIES", default=1000, cast=int)
+CHALLENGE_LEADERBOARD_CACHE_TTL = config("CHALLENGE_LEADERBOARD_CACHE_TTL", default=300, cast=int)
+# Challenges masqués par les contests en cours / à venir (contests/visibility.py) : durée max en mémoire
+CONTEST_VISIBILITY_CACHE_TTL = config("CONTEST_VISIBILITY_CACHE_TTL", default=300, cast=int)
+# Classement des contests (contests/standings.py) : instantanés par worker, reconstruits
+# au plus toutes les MIN_INTERVAL secondes après une soumission, et au plus tard après TTL secondes
+CONTEST_STANDINGS_CACHE_ENTRIES = config("CONTEST_STANDINGS_CACHE_ENTRIES", default=200, cast=int)
+CONTEST_STANDINGS_MIN_INTERVAL = config("CONTEST_STANDINGS_MIN_INTERVAL", default=5, cast=int)
+CONTEST_STANDINGS_TTL = config("CONTEST_STANDINGS_TTL", default=60, cast=int)
+
+# ============================================
+# CACHE PARTAGÉ ENTRE WORKERS (api/cache_regions.py)
+# ============================================
+# Backend : "db" (table django_cache, créée par createcachetable), "file",
+# "locmem" (propre à chaque processus) ou "redis" (CACHE_URL requis)
+CACHE_BACKEND = config("CACHE_BACKEND", default="db")
+CACHE_URL = config("CACHE_URL", default="")
+CACHE_FILE_DIR = config("CACHE_FILE_DIR", default=str(BASE_DIR / ".cache" / "django"))
+_CACHE_BACKENDS = {
+    'db': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'django_cache'},
+    'file': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': CACHE_FILE_DIR},
+    'locmem': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'dsa'},
+    'redis': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': CACHE_URL},
+}
+CACHES = {
+    'default': {
+        **_CACHE_BACKENDS[CACHE_BACKEND],
+        'KEY_PREFIX': 'dsa',
+        'TIMEOUT': 300,
+    }
+}
+if CACHE_BACKEND in ('db', 'file'):
+    # Nombre d'entrées avant purge (backends base et fichiers)
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': config("CACHE_MAX_ENTRIES", default=20000, cast=int)}
+# Durée de vie (secondes) des entrées de chaque région ; 0 pour désactiver une région
+CACHE_REGION_TTLS = {
+    'challenges': config("CACHE_TTL_CHALLENGES", default=3600, cast=int),
+    'test_bundles': config("CACHE_TTL_TEST_BUNDLES", default=3600, cast=int),
+    'leaderboards': config("CACHE_TTL_LEADERBOARDS", default=300, cast=int),
+    'contest_state': config("CACHE_TTL_CONTEST_STATE", default=300, cast=int),
+}
+# Taille maximale d'un bundle de tests copié dans le cache partagé
+CACHE_MAX_BUNDLE_BYTES = config("CACHE_MAX_BUNDLE_BYTES", default=1024 * 1024, cast=int)
+
 # ============================================
 # CONFIGURATION STATIC FILES
 # ============================================
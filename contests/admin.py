@@ -49,7 +49,7 @@ class ContestAdmin(admin.ModelAdmin):
             'fields': ('contest_img', 'contest_image_preview')
         }),
         ('Dates et statut', {
-            'fields': ('date_debut', 'date_fin', 'statut', 'status_info')
+            'fields': ('date_debut', 'date_fin', 'freeze_minutes', 'statut', 'status_info')
         }),
         ('Challenges', {
             'fields': ('challenges',)
@@ -224,34 +224,24 @@ class TeamAdmin(admin.ModelAdmin):
     
     def rank_badge(self, obj):
         """Badge du rang"""
-        contest = obj.contest
-        teams = list(contest.teams.all())
-        try:
-            rank = teams.index(obj) + 1
-            color = '#FFD700' if rank == 1 else '#C0C0C0' if rank == 2 else '#CD7F32' if rank == 3 else '#6C757D'
-            return format_html(
-                '<span style="background-color: {}; color: white; padding: 3px 10px; '
-                'border-radius: 50%; font-weight: bold;">{}</span>',
-                color,
-                rank
-            )
-        except ValueError:
-            return '-'
+        rank = obj.get_rank()
+        color = '#FFD700' if rank == 1 else '#C0C0C0' if rank == 2 else '#CD7F32' if rank == 3 else '#6C757D'
+        return format_html(
+            '<span style="background-color: {}; color: white; padding: 3px 10px; '
+            'border-radius: 50%; font-weight: bold;">{}</span>',
+            color,
+            rank
+        )
     rank_badge.short_description = 'Rang'
     
     def rank_info(self, obj):
         """Informations sur le rang"""
-        contest = obj.contest
-        teams = list(contest.teams.all())
-        try:
-            rank = teams.index(obj) + 1
-            total = len(teams)
-            return format_html(
-                '<strong>Rang {}/{}</strong>',
-                rank, total
-            )
-        except ValueError:
+        if not obj.pk:
             return '-'
+        return format_html(
+            '<strong>Rang {}/{}</strong>',
+            obj.get_rank(), obj.contest.teams.count()
+        )
     rank_info.short_description = 'Classement'
     
     def team_stats(self, obj):
@@ -5,3 +5,6 @@ class ContestsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'contests'
     verbose_name = 'Contests'
+
+    def ready(self):
+        from . import signals  # noqa: F401
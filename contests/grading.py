@@ -0,0 +1,120 @@
+# contests/grading.py
+
+"""
+Correction d'une soumission d'équipe pendant un contest.
+
+Utilisée par la vue de soumission (mode synchrone) et par le worker de la
+file de soumissions (run_submission_worker).
+"""
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+
+from api import result_cache
+from api.challenge_validator import ChallengeValidator
+from api.models import UserChallengeAttempt
+from api.test_bundle import get_bundle
+from contests.models import ContestSubmission, Team
+from contests.serializers import ContestSubmissionSerializer
+
+
+def grade_contest_submission(user, team, challenge, code, language, submitted_at=None, on_result=None):
+    """
+    Corrige la soumission, enregistre la soumission de l'équipe et
+    synchronise les tentatives de tous les membres.
+
+    Args:
+        submitted_at: Date de la soumission (mise en file) ; maintenant par défaut
+        on_result: Transmis au validateur (progression test par test)
+
+    Returns:
+        (payload, code HTTP) : le corps de la réponse de soumission
+    """
+    submitted_at = submitted_at or timezone.now()
+    contest = team.contest
+
+    # Un job mis en file pendant le contest reste valable s'il est corrigé après la fin
+    if not contest.is_ongoing(at=submitted_at):
+        return {'error': "Le contest n'est pas en cours"}, status.HTTP_403_FORBIDDEN
+
+    bundle = get_bundle(challenge)
+    if not bundle.cases:
+        return {'error': 'Ce challenge ne contient pas encore de tests'}, status.HTTP_400_BAD_REQUEST
+
+    try:
+        validator = ChallengeValidator(timeout=10)
+        result = validator.validate_submission(
+            code, bundle.test_data(), language,
+            on_result=on_result,
+            cache_key=result_cache.make_key(bundle, code, language, validator.timeout)
+        )
+
+        # Calcul de l'XP obtenue basé sur chaque test case réussi
+        xp_earned = bundle.xp_for(result.get('results', []))
+
+        passed_tests = result.get('passed_tests', 0)
+        total_tests = result.get('total_tests', len(bundle))
+        is_success = result.get('success', False)
+
+        # Le temps d'un challenge commence au premier join d'un membre de l'équipe
+        team_attempts = UserChallengeAttempt.objects.filter(
+            user__in=team.membres.all(),
+            challenge=challenge
+        ).order_by('started_at')
+
+        if team_attempts.exists():
+            start_time = team_attempts.first().started_at
+            print(f"[grade_contest_submission] Start time trouvé: {start_time}")
+        else:
+            # Si pas d'inscription trouvée (ne devrait pas arriver avec l'auto-join),
+            # on prend le début du contest comme fallback
+            start_time = contest.date_debut
+            print(f"[grade_contest_submission] Pas de start time, fallback sur début contest")
+
+        time_diff = submitted_at - start_time
+        temps_soumission = int(time_diff.total_seconds())
+
+        with transaction.atomic():
+            # Les soumissions concurrentes d'une même équipe sont enregistrées l'une après l'autre
+            list(Team.objects.select_for_update().filter(pk=team.pk).values_list('pk'))
+
+            # Créer ou mettre à jour la soumission de l'équipe
+            submission = ContestSubmission.objects.select_for_update().filter(
+                equipe=team, challenge=challenge
+            ).first() or ContestSubmission(equipe=team, challenge=challenge)
+            submission.submitted_by = user
+            submission.code_soumis = code
+            submission.xp_earned = xp_earned
+            submission.temps_soumission = temps_soumission
+            submission.tests_reussis = passed_tests
+            submission.tests_total = total_tests
+            # Période du contest vérifiée à la réception (et non à la correction)
+            submission.submitted_at = submitted_at
+            submission.save()
+
+            # Synchroniser l'état pour TOUS les membres de l'équipe dans leurs profils individuels
+            # (XP jamais diminuée, complétion si tout est réussi, stats et classement)
+            UserChallengeAttempt.sync_team_result(
+                challenge,
+                team.membres.values_list('id', flat=True),
+                xp_earned=xp_earned,
+                completed=(passed_tests == total_tests),
+                submitted_at=submitted_at,
+            )
+
+    except ValidationError as e:
+        return {'error': str(e)}, status.HTTP_400_BAD_REQUEST
+
+    print(f"=== [grade_contest_submission] Response ===\nSuccess: {is_success}\nPassed: {passed_tests}\nFailed: {total_tests - passed_tests}\nXP Earned: {xp_earned}\nTemps depuis start challenge: {temps_soumission}s\n===")
+    return {
+        'success': is_success,
+        'passed': passed_tests,
+        'failed': total_tests - passed_tests,
+        'xp_earned': xp_earned,
+        'xp_total': bundle.xp_total,
+        'temps_soumission': temps_soumission,
+        'message': f'Soumission enregistrée. XP : {xp_earned}/{bundle.xp_total}',
+        'submission': ContestSubmissionSerializer(submission).data
+    }, status.HTTP_200_OK
@@ -0,0 +1,24 @@
+# contests/management/commands/sync_contest_status.py
+
+"""
+Enregistre le statut des contests dont la date de début ou de fin vient
+d'être franchie. Les lectures déduisent déjà le statut des dates ; la
+colonne `statut` sert aux filtres de l'admin et aux requêtes directes.
+
+Lancé chaque minute par le worker des soumissions ; peut aussi être
+planifié (cron) :
+
+    python manage.py sync_contest_status
+"""
+
+from django.core.management.base import BaseCommand
+
+from contests.models import Contest
+
+
+class Command(BaseCommand):
+    help = "Met à jour le statut enregistré des contests (upcoming / ongoing / finished)"
+
+    def handle(self, *args, **options):
+        updated = Contest.sync_statuses()
+        self.stdout.write(self.style.SUCCESS(f"{updated} contest(s) mis à jour"))
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contests', '0005_alter_contest_contest_img'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='team',
+            index=models.Index(fields=['contest', '-xp_total', 'temps_total'], name='team_contest_rank_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contests', '0006_team_contest_rank_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contest',
+            name='final_standings',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='contest',
+            name='freeze_minutes',
+            field=models.PositiveIntegerField(default=0, help_text="Le classement public n'est plus mis à jour pendant les N dernières minutes (0 : pas de gel)", verbose_name='Gel du classement (minutes)'),
+        ),
+        migrations.AddField(
+            model_name='contest',
+            name='frozen_standings',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='contest',
+            name='standings_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:06
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contests', '0007_contest_standings'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='contestsubmission',
+            name='submitted_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -1,5 +1,6 @@
 # contests/models.py
 
+from datetime import timedelta
 from django.db import models
 from django.core.exceptions import ValidationError
 from django.utils import timezone
@@ -59,6 +60,17 @@ class Contest(models.Model):
         related_name='contests',
         verbose_name="Challenges"
     )
+    freeze_minutes = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Gel du classement (minutes)",
+        help_text="Le classement public n'est plus mis à jour pendant les N dernières minutes (0 : pas de gel)"
+    )
+    # Classement (contests/standings.py) : version incrémentée à chaque
+    # soumission, classement gelé enregistré une seule fois, classement
+    # final effacé par chaque soumission
+    standings_version = models.PositiveIntegerField(default=0, editable=False)
+    frozen_standings = models.JSONField(null=True, blank=True, editable=False)
+    final_standings = models.JSONField(null=True, blank=True, editable=False)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -70,6 +82,49 @@ class Contest(models.Model):
     
     def __str__(self):
         return f"{self.title} ({self.get_statut_display()})"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Statut déduit des dates à la lecture : la colonne `statut` n'est
+        # mise à jour que par save() et sync_statuses()
+        if instance.date_debut and instance.date_fin and 'statut' in instance.__dict__:
+            instance.update_status()
+        return instance
+
+    @staticmethod
+    def status_q(*statuts, now=None):
+        """
+        Filtre SQL des contests dans l'un des statuts donnés, calculé sur
+        les dates (mêmes bornes que update_status)
+        """
+        now = now or timezone.now()
+        conditions = {
+            'upcoming': models.Q(date_debut__gt=now),
+            'ongoing': models.Q(date_debut__lte=now, date_fin__gte=now),
+            'finished': models.Q(date_fin__lt=now),
+        }
+        q = models.Q(pk__in=[])
+        for statut in statuts:
+            q |= conditions[statut]
+        return q
+
+    @classmethod
+    def sync_statuses(cls, now=None):
+        """
+        Enregistre le statut des contests dont une date (début, fin) vient
+        d'être franchie. Seules les lignes qui changent sont écrites.
+
+        Returns:
+            Nombre de contests mis à jour
+        """
+        now = now or timezone.now()
+        updated = 0
+        for statut, _ in cls.STATUS_CHOICES:
+            updated += cls.objects.filter(cls.status_q(statut, now=now)).exclude(
+                statut=statut
+            ).update(statut=statut)
+        return updated
     
     def clean(self):
         """Validation des contraintes"""
@@ -87,18 +142,44 @@ class Contest(models.Model):
                         "Impossible de modifier les dates d'un contest déjà commencé"
                     )
     
+    STANDINGS_FIELDS = ('standings_version', 'frozen_standings', 'final_standings')
+
     def save(self, *args, **kwargs):
+        from . import visibility
+
         self.full_clean()
         self.update_status()
+        # Champs du classement écrits uniquement par des update (soumissions,
+        # contests/standings.py) : une instance chargée avant ne les écrase pas
+        if not self._state.adding and kwargs.get('update_fields') is None and not args:
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.STANDINGS_FIELDS
+                and field.attname not in deferred
+            ]
         super().save(*args, **kwargs)
+        visibility.invalidate()
+
+    @classmethod
+    def bump_standings_version(cls, contest_id):
+        """Classement modifié : nouvelle version, classement final à recalculer"""
+        cls.objects.filter(pk=contest_id).update(
+            standings_version=models.F('standings_version') + 1,
+            final_standings=None,
+        )
     
     def delete(self, *args, **kwargs):
         """Suppression impossible si des équipes existent"""
+        from . import visibility
+
         if self.teams.exists():
             raise ValidationError(
                 "Impossible de supprimer un contest avec des équipes inscrites"
             )
         super().delete(*args, **kwargs)
+        visibility.invalidate()
     
     def update_status(self):
         """Met à jour automatiquement le statut du contest"""
@@ -115,10 +196,11 @@ class Contest(models.Model):
             return False
         return timezone.now() >= self.date_debut
 
-    def is_ongoing(self):
+    def is_ongoing(self, at=None):
+        """Contest en cours (maintenant, ou à la date `at`)"""
         if not self.date_debut or not self.date_fin:
             return False
-        now = timezone.now()
+        now = at or timezone.now()
         return self.date_debut <= now <= self.date_fin
 
     def is_finished(self):
@@ -126,6 +208,20 @@ class Contest(models.Model):
             return False
         return timezone.now() > self.date_fin
     
+    def freeze_at(self):
+        """Début du gel du classement, ou None si pas de gel"""
+        if not self.freeze_minutes or not self.date_fin:
+            return None
+        return self.date_fin - timedelta(minutes=self.freeze_minutes)
+
+    def is_frozen(self, now=None):
+        """Classement public gelé (dernières minutes d'un contest en cours)"""
+        freeze_at = self.freeze_at()
+        if freeze_at is None:
+            return False
+        now = now or timezone.now()
+        return max(freeze_at, self.date_debut) <= now <= self.date_fin
+
     def can_add_challenges(self):
         """Vérifie si on peut ajouter des challenges"""
         return not self.has_started()
@@ -134,6 +230,7 @@ class Contest(models.Model):
         """Met à jour le nombre d'équipes"""
         self.nombre_team = self.teams.count()
         self.save(update_fields=['nombre_team'])
+        Contest.bump_standings_version(self.pk)
 
 
 class Team(models.Model):
@@ -171,6 +268,10 @@ class Team(models.Model):
         verbose_name = "Équipe"
         verbose_name_plural = "Équipes"
         unique_together = [['contest', 'nom']]
+        indexes = [
+            # Classement d'un contest lu dans l'ordre de l'index
+            models.Index(fields=['contest', '-xp_total', 'temps_total'], name='team_contest_rank_idx'),
+        ]
     
     def __str__(self):
         return f"{self.nom} - {self.contest.title}"
@@ -223,6 +324,36 @@ class Team(models.Model):
         # Mettre à jour le nombre d'équipes
         contest.update_team_count()
     
+    @classmethod
+    def ranks_for_contest(cls, contest_id):
+        """
+        Rang de chaque équipe d'un contest, calculé en une requête :
+        RANK() OVER (ORDER BY xp_total DESC, temps_total).
+        Les ex-aequo partagent le même rang (1, 1, 3...).
+        
+        Returns:
+            dict {team_id: rang}
+        """
+        from django.db.models import F, Window
+        from django.db.models.functions import Rank
+        
+        return dict(
+            cls.objects.filter(contest_id=contest_id).annotate(
+                rank=Window(
+                    expression=Rank(),
+                    order_by=[F('xp_total').desc(), F('temps_total').asc()]
+                )
+            ).values_list('id', 'rank')
+        )
+    
+    def get_rank(self):
+        """Rang de l'équipe seule (même règle que ranks_for_contest, une requête COUNT)"""
+        better = Team.objects.filter(contest_id=self.contest_id).filter(
+            models.Q(xp_total__gt=self.xp_total)
+            | models.Q(xp_total=self.xp_total, temps_total__lt=self.temps_total)
+        ).count()
+        return better + 1
+    
     def can_be_deleted(self):
         """Vérifie si l'équipe peut être supprimée"""
         if self.contest.has_started():
@@ -290,19 +421,36 @@ class Team(models.Model):
         self.membres.remove(user)
     
     def calculate_stats(self):
-        """Calcule les statistiques de l'équipe"""
-        submissions = self.submissions.filter(
-            challenge__in=self.contest.challenges.all()
+        """
+        Recalcule les statistiques de l'équipe en une requête d'agrégat :
+        somme des XP et temps maximal de ses soumissions sur les challenges
+        du contest
+        """
+        from django.db.models import Max, Sum
+        from django.db.models.functions import Coalesce
+
+        stats = self.submissions.filter(challenge__contests=self.contest_id).aggregate(
+            xp_total=Coalesce(Sum('xp_earned'), 0),
+            temps_total=Coalesce(Max('temps_soumission'), 0),
         )
-        
-        self.xp_total = sum(sub.xp_earned for sub in submissions)
-        if submissions:
-            self.temps_total = max(sub.temps_soumission for sub in submissions)
-        else:
-            self.temps_total = 0
-            
+        self.xp_total = stats['xp_total']
+        self.temps_total = stats['temps_total']
         self.save(update_fields=['xp_total', 'temps_total'])
 
+    @classmethod
+    def add_submission_delta(cls, team_id, xp=0, temps=0):
+        """
+        Applique la variation due à une soumission (UPDATE atomique) :
+        XP ajoutée, temps total porté au moins à `temps`
+        """
+        from django.db.models import F, Value
+        from django.db.models.functions import Greatest
+
+        cls.objects.filter(pk=team_id).update(
+            xp_total=F('xp_total') + xp,
+            temps_total=Greatest(F('temps_total'), Value(temps)),
+        )
+
 class TeamInvitation(models.Model):
     """
     Modèle pour les invitations d'équipe
@@ -440,7 +588,8 @@ class ContestSubmission(models.Model):
         verbose_name="Nombre total de tests"
     )
     
-    submitted_at = models.DateTimeField(auto_now_add=True)
+    # Date de réception (mise en file), et non de correction
+    submitted_at = models.DateTimeField(default=timezone.now)
     
     class Meta:
         ordering = ['-submitted_at']
@@ -455,8 +604,9 @@ class ContestSubmission(models.Model):
         """Validation des contraintes"""
         contest = self.equipe.contest
         
-        # Soumission uniquement pendant la période du contest
-        if not contest.is_ongoing():
+        # Soumission uniquement pendant la période du contest, vérifiée à sa
+        # réception (submitted_at) et non à sa correction
+        if not contest.is_ongoing(at=self.submitted_at):
             raise ValidationError(
                 "Les soumissions sont uniquement autorisées pendant la période du contest"
             )
@@ -483,8 +633,45 @@ class ContestSubmission(models.Model):
                     "Une soumission existe déjà pour ce challenge"
                 )
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Valeurs chargées, pour mettre à jour les stats de l'équipe par différence
+        instance._stats_state = (instance.__dict__.get('xp_earned'), instance.__dict__.get('temps_soumission'))
+        return instance
+
     def save(self, *args, **kwargs):
+        from django.db import transaction
+        from . import standings
+
         self.full_clean()
-        super().save(*args, **kwargs)
-        # Recalculer les stats de l'équipe
-        self.equipe.calculate_stats()
\ No newline at end of file
+        is_new = self._state.adding
+        previous = getattr(self, '_stats_state', (None, None))
+        with transaction.atomic():
+            contest = self.equipe.contest
+            # Première soumission pendant le gel : le classement public est
+            # enregistré tel qu'il était avant elle
+            if contest.is_frozen():
+                standings.freeze(contest)
+
+            super().save(*args, **kwargs)
+            Contest.bump_standings_version(contest.pk)
+
+            # Stats de l'équipe : variation de cette soumission ; le temps
+            # total étant un maximum, une baisse du temps impose un recalcul
+            if is_new:
+                Team.add_submission_delta(self.equipe_id, self.xp_earned, self.temps_soumission)
+            elif None not in previous and self.temps_soumission >= previous[1]:
+                Team.add_submission_delta(
+                    self.equipe_id, self.xp_earned - previous[0], self.temps_soumission
+                )
+            else:
+                self.equipe.calculate_stats()
+        self._stats_state = (self.xp_earned, self.temps_soumission)
+
+    def delete(self, *args, **kwargs):
+        equipe = self.equipe
+        result = super().delete(*args, **kwargs)
+        equipe.calculate_stats()
+        Contest.bump_standings_version(equipe.contest_id)
+        return result
\ No newline at end of file
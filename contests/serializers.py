@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from django.utils import timezone
+from . import standings
 from .models import Contest, Team, ContestSubmission, TeamInvitation
 from accounts.models import User
 from api.models import Challenge
@@ -47,7 +48,7 @@ class ContestDetailSerializer(serializers.ModelSerializer):
         model = Contest
         fields = [
             'id', 'title', 'description', 'contest_img',  # 🆕 Ajout des nouveaux champs
-            'date_debut', 'date_fin', 'statut',
+            'date_debut', 'date_fin', 'freeze_minutes', 'statut',
             'status_display', 'type', 'type_display', 'nombre_team',
             'is_ongoing', 'is_finished', 'has_started', 'challenges',
             'created_at', 'updated_at'
@@ -83,7 +84,24 @@ class TeamMemberSerializer(serializers.ModelSerializer):
         fields = ['id', 'username', 'nom', 'prenom', 'total_xp', 'photo']
 
 
-class TeamListSerializer(serializers.ModelSerializer):
+class FrozenTeamStatsMixin:
+    """
+    Pendant le gel du classement, xp_total / temps_total / rank sont ceux de
+    context['frozen_stats'] (standings.public_team_stats) et non les valeurs
+    courantes de l'équipe
+    """
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        frozen_stats = self.context.get('frozen_stats')
+        if frozen_stats is not None:
+            data.update(frozen_stats.get(
+                instance.id, dict.fromkeys(standings.FROZEN_TEAM_FIELDS)
+            ))
+        return data
+
+
+class TeamListSerializer(FrozenTeamStatsMixin, serializers.ModelSerializer):
     """Serializer pour la liste des équipes dans un contest"""
     capitaine = UserMinimalSerializer(read_only=True)
     membres_count = serializers.SerializerMethodField()
@@ -97,16 +115,22 @@ class TeamListSerializer(serializers.ModelSerializer):
         ]
     
     def get_membres_count(self, obj):
+        # Annoté par le classement du contest (contests/standings.py)
+        membres_total = getattr(obj, 'membres_total', None)
+        if membres_total is not None:
+            return membres_total
         return obj.membres.count()
     
     def get_rank(self, obj):
-        """Calcule le rang de l'équipe dans le contest"""
-        contest = obj.contest
-        teams = list(contest.teams.all())
-        try:
-            return teams.index(obj) + 1
-        except ValueError:
-            return None
+        """
+        Rang de l'équipe dans le contest : pris dans context['team_ranks']
+        (Team.ranks_for_contest, calculé une fois pour tout le contest)
+        ou calculé pour cette seule équipe
+        """
+        ranks = self.context.get('team_ranks')
+        if ranks is not None and obj.id in ranks:
+            return ranks[obj.id]
+        return obj.get_rank()
         
 
 class TeamInvitationSerializer(serializers.ModelSerializer):
@@ -137,7 +161,7 @@ class TeamInvitationSerializer(serializers.ModelSerializer):
         return f"{inviter} invites you to join the {team} team for the {contest} contest."
 
 
-class TeamDetailSerializer(serializers.ModelSerializer):
+class TeamDetailSerializer(FrozenTeamStatsMixin, serializers.ModelSerializer):
     """Serializer pour le détail d'une équipe"""
     capitaine = UserMinimalSerializer(read_only=True)
     membres = TeamMemberSerializer(many=True, read_only=True)
@@ -155,12 +179,15 @@ class TeamDetailSerializer(serializers.ModelSerializer):
         ]
     
     def get_rank(self, obj):
-        contest = obj.contest
-        teams = list(contest.teams.all())
-        try:
-            return teams.index(obj) + 1
-        except ValueError:
-            return None
+        """
+        Rang de l'équipe dans le contest : pris dans context['team_ranks']
+        (Team.ranks_for_contest, calculé une fois pour tout le contest)
+        ou calculé pour cette seule équipe
+        """
+        ranks = self.context.get('team_ranks')
+        if ranks is not None and obj.id in ranks:
+            return ranks[obj.id]
+        return obj.get_rank()
     
     def get_is_captain(self, obj):
         request = self.context.get('request')
@@ -0,0 +1,38 @@
+# contests/signals.py
+
+"""
+Invalidation du cache des challenges masqués par les contests
+(contests/visibility.py) quand les challenges d'un contest changent, et
+de la région "contest_state" du cache partagé quand un contest ou une
+équipe change.
+"""
+
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from api import cache_regions
+
+from . import visibility
+from .models import Contest, Team
+
+
+@receiver(m2m_changed, sender=Contest.challenges.through)
+def contest_challenges_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    # Toucher updated_at : les autres workers voient l'empreinte changer
+    if reverse:
+        contests = Contest.objects.filter(pk__in=pk_set) if pk_set else instance.contests.all()
+    else:
+        contests = Contest.objects.filter(pk=instance.pk)
+    contests.update(updated_at=timezone.now())
+
+    visibility.invalidate()
+
+
+@receiver([post_save, post_delete], sender=Contest)
+@receiver([post_save, post_delete], sender=Team)
+def contest_state_changed(sender, instance, **kwargs):
+    cache_regions.invalidate('contest_state')
@@ -0,0 +1,166 @@
+# contests/standings.py
+
+"""
+Classement des équipes d'un contest, servi depuis des instantanés.
+
+- Contest en cours : l'instantané est gardé en mémoire par worker. Il est
+  reconstruit quand une soumission arrive (Contest.standings_version), au
+  plus une fois toutes les CONTEST_STANDINGS_MIN_INTERVAL secondes, et au
+  plus tard après CONTEST_STANDINGS_TTL secondes (équipes renommées...).
+  Un instantané construit par un worker est partagé avec les autres par la
+  région "contest_state" du cache partagé.
+- Gel (Contest.freeze_minutes) : pendant les dernières minutes, le
+  classement public reste celui du début du gel. Il est enregistré en base
+  (frozen_standings) à la première lecture, ou juste avant la première
+  soumission du gel : tous les workers servent le même. Les autres vues
+  des équipes (score, rang) montrent aussi ces valeurs gelées
+  (public_team_stats).
+- Contest terminé : le classement final est calculé à la première lecture
+  après la fin et enregistré (final_standings). Une soumission corrigée
+  après la fin (file d'attente) l'efface : il est recalculé à la lecture
+  suivante.
+
+Chaque instantané porte un ETag (hash de son contenu).
+"""
+
+import hashlib
+import json
+import time
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count
+from django.utils import timezone
+
+from api import cache_regions
+from api.lru import LRUCache
+
+_live = LRUCache(max_entries=settings.CONTEST_STANDINGS_CACHE_ENTRIES)
+
+
+def build_snapshot(contest, frozen: bool = False, final: bool = False) -> Dict[str, Any]:
+    """Classement courant du contest (équipes avec leur rang)"""
+    from .models import Team
+    from .serializers import TeamListSerializer
+
+    teams = (
+        contest.teams.select_related('capitaine')
+        .annotate(membres_total=Count('membres'))
+        .order_by('-xp_total', 'temps_total', 'id')
+    )
+    leaderboard = TeamListSerializer(
+        teams, many=True,
+        context={'team_ranks': Team.ranks_for_contest(contest.id)}
+    ).data
+
+    snapshot = {
+        'contest_id': contest.id,
+        'contest_title': contest.title,
+        'contest_status': contest.statut,
+        'frozen': frozen,
+        'frozen_at': contest.freeze_at() if frozen else None,
+        'final': final,
+        'generated_at': timezone.now(),
+        'leaderboard': leaderboard,
+    }
+    # Forme JSON (dates en texte) : identique en mémoire et en base
+    snapshot = json.loads(json.dumps(snapshot, cls=DjangoJSONEncoder))
+    content = json.dumps(
+        {key: value for key, value in snapshot.items() if key != 'generated_at'},
+        sort_keys=True
+    )
+    snapshot['etag'] = hashlib.sha1(content.encode('utf-8')).hexdigest()
+    return snapshot
+
+
+def _stored(contest, field: str, build, versioned: bool = False) -> Dict[str, Any]:
+    """
+    Classement enregistré dans `field`, construit par le premier worker qui en a besoin.
+
+    Args:
+        versioned: N'enregistrer que si standings_version n'a pas bougé pendant
+            la construction (sinon l'instantané est servi sans être gardé)
+    """
+    from .models import Contest
+
+    value = getattr(contest, field)
+    if value is None:
+        rows = Contest.objects.filter(pk=contest.pk)
+        value, version = rows.values_list(field, 'standings_version').get()
+        if value is None:
+            built = build()
+            # Écriture conditionnelle : en cas de course, le premier enregistré est gardé
+            stored = rows.filter(**{f'{field}__isnull': True})
+            if versioned:
+                stored = stored.filter(standings_version=version)
+            stored.update(**{field: built})
+            value = rows.values_list(field, flat=True).get()
+            if value is None:
+                # Soumission enregistrée pendant la construction
+                return built
+        setattr(contest, field, value)
+    return value
+
+
+def freeze(contest) -> Dict[str, Any]:
+    """Enregistre (une seule fois) le classement public du gel"""
+    return _stored(contest, 'frozen_standings', lambda: build_snapshot(contest, frozen=True))
+
+
+# Champs d'une équipe figés pendant le gel
+FROZEN_TEAM_FIELDS = ('xp_total', 'temps_total', 'rank')
+
+
+def public_team_stats(contest, user) -> Optional[Dict[int, Dict[str, Any]]]:
+    """
+    Score et rang des équipes à montrer à `user` pendant le gel : ceux du
+    classement gelé, par id d'équipe (None hors gel ou pour un administrateur)
+    """
+    if user.is_staff or not contest.is_frozen():
+        return None
+    return {
+        team['id']: {field: team[field] for field in FROZEN_TEAM_FIELDS}
+        for team in freeze(contest)['leaderboard']
+    }
+
+
+def _live_snapshot(contest) -> Dict[str, Any]:
+    version = (contest.standings_version, contest.statut)
+    cached = _live.get(contest.pk)
+    if cached is not None:
+        cached_version, built_at, snapshot = cached
+        age = time.monotonic() - built_at
+        if age < settings.CONTEST_STANDINGS_TTL and (
+            cached_version == version or age < settings.CONTEST_STANDINGS_MIN_INTERVAL
+        ):
+            return snapshot
+
+    # Même version et même période de CONTEST_STANDINGS_TTL secondes : instantané partagé
+    period = int(time.time() // max(settings.CONTEST_STANDINGS_TTL, 1))
+    snapshot = cache_regions.region('contest_state').get_or_set(
+        ('standings', contest.pk) + version + (period,), lambda: build_snapshot(contest)
+    )
+    _live.set(contest.pk, (version, time.monotonic(), snapshot))
+    return snapshot
+
+
+def get_standings(contest, live: bool = False) -> Dict[str, Any]:
+    """
+    Classement à servir pour un contest.
+
+    Args:
+        live: Ignorer le gel (administrateurs)
+    """
+    now = timezone.now()
+    if contest.is_finished():
+        return _stored(
+            contest, 'final_standings', lambda: build_snapshot(contest, final=True), versioned=True
+        )
+    if not live and contest.is_frozen(now):
+        return freeze(contest)
+    return _live_snapshot(contest)
+
+
+def get_stats() -> dict:
+    return _live.stats()
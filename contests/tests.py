@@ -1,3 +1,137 @@
+# contests/tests.py
+
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.models import Challenge
+from . import standings
+from .models import Contest, ContestSubmission, Team
+
+User = get_user_model()
+
+
+class TeamStatsDeltaTests(TestCase):
+    """xp_total / temps_total tenus par variations égalent calculate_stats()"""
+
+    def setUp(self):
+        now = timezone.now()
+        self.captain = User.objects.create(
+            username='captain', email='captain@example.com', numero_inscription='N-captain'
+        )
+        self.challenges = [
+            Challenge.objects.create(
+                title=f'C{i}', slug=f'contest-c{i}', description_file='raw/upload/v1/description.txt'
+            )
+            for i in range(2)
+        ]
+        self.contest = Contest.objects.create(
+            title='Contest', date_debut=now + datetime.timedelta(minutes=1),
+            date_fin=now + datetime.timedelta(hours=2)
+        )
+        self.contest.challenges.add(*self.challenges)
+        self.team = Team.objects.create(nom='Team', contest=self.contest, capitaine=self.captain)
+        # Équipe formée avant le début, puis contest en cours
+        Contest.objects.filter(pk=self.contest.pk).update(date_debut=now - datetime.timedelta(hours=1))
+
+    def submit(self, challenge, xp, temps):
+        submission = ContestSubmission.objects.filter(equipe=self.team, challenge=challenge).first()
+        if submission is None:
+            submission = ContestSubmission(
+                equipe=Team.objects.get(pk=self.team.pk), challenge=challenge, submitted_by=self.captain
+            )
+        submission.code_soumis = 'print(1)'
+        submission.xp_earned = xp
+        submission.temps_soumission = temps
+        submission.save()
+        return submission
+
+    def assert_consistent(self):
+        team = Team.objects.get(pk=self.team.pk)
+        counters = (team.xp_total, team.temps_total)
+        team.calculate_stats()
+        self.assertEqual((team.xp_total, team.temps_total), counters)
+        return counters
+
+    def test_submission_save_update_delete(self):
+        self.submit(self.challenges[0], 30, 120)
+        self.assertEqual(self.assert_consistent(), (30, 120))
+
+        self.submit(self.challenges[1], 20, 300)
+        self.assertEqual(self.assert_consistent(), (50, 300))
+
+        # Meilleur score, temps plus long
+        self.submit(self.challenges[0], 45, 400)
+        self.assertEqual(self.assert_consistent(), (65, 400))
+
+        # Temps plus court : recalcul du maximum
+        self.submit(self.challenges[0], 45, 100)
+        self.assertEqual(self.assert_consistent(), (65, 300))
+
+        ContestSubmission.objects.get(equipe=self.team, challenge=self.challenges[1]).delete()
+        self.assertEqual(self.assert_consistent(), (45, 100))
+
+    def test_submission_bumps_standings_version(self):
+        version = Contest.objects.get(pk=self.contest.pk).standings_version
+
+        self.submit(self.challenges[0], 10, 60)
+
+        self.assertEqual(Contest.objects.get(pk=self.contest.pk).standings_version, version + 1)
+
+    def test_queued_submission_checked_at_reception(self):
+        received_at = timezone.now()
+        Contest.objects.filter(pk=self.contest.pk).update(date_fin=received_at - datetime.timedelta(seconds=1))
+
+        with self.assertRaises(ValidationError):
+            self.submit(self.challenges[0], 10, 60)
+
+        submission = ContestSubmission(
+            equipe=Team.objects.get(pk=self.team.pk), challenge=self.challenges[0],
+            submitted_by=self.captain, code_soumis='print(1)', xp_earned=10, temps_soumission=60
+        )
+        # Reçue pendant le contest, corrigée après la fin
+        submission.submitted_at = received_at - datetime.timedelta(minutes=5)
+        submission.save()
+        self.assertEqual(self.assert_consistent(), (10, 60))
+
+    def test_late_graded_submission_updates_final_standings(self):
+        self.submit(self.challenges[0], 10, 60)
+        ended_at = timezone.now()
+        Contest.objects.filter(pk=self.contest.pk).update(date_fin=ended_at - datetime.timedelta(seconds=1))
+
+        final = standings.get_standings(Contest.objects.get(pk=self.contest.pk))
+        self.assertTrue(final['final'])
+        self.assertEqual(final['leaderboard'][0]['xp_total'], 10)
+
+        # Mise en file pendant le contest, corrigée après la fin
+        submission = ContestSubmission(
+            equipe=Team.objects.get(pk=self.team.pk), challenge=self.challenges[1],
+            submitted_by=self.captain, code_soumis='print(1)', xp_earned=20, temps_soumission=90,
+            submitted_at=ended_at - datetime.timedelta(minutes=5)
+        )
+        submission.save()
+
+        final = standings.get_standings(Contest.objects.get(pk=self.contest.pk))
+        self.assertEqual(final['leaderboard'][0]['xp_total'], 30)
+        self.assertIsNotNone(Contest.objects.get(pk=self.contest.pk).final_standings)
+
+    def test_teams_during_freeze_show_frozen_stats(self):
+        self.submit(self.challenges[0], 10, 60)
+        Contest.objects.filter(pk=self.contest.pk).update(freeze_minutes=180)
+        # Soumission pendant le gel
+        self.submit(self.challenges[1], 20, 90)
 
-# Create your tests here.
+        staff = User.objects.create(
+            username='staff', email='staff@example.com', numero_inscription='N-staff', is_staff=True
+        )
+        client = APIClient()
+        url = f'/api/contests/{self.contest.pk}/teams/'
+        for user, xp_total in ((self.captain, 10), (staff, 30)):
+            with self.subTest(user=user.username):
+                client.force_authenticate(user)
+                team = client.get(url).json()['teams'][0]
+                self.assertEqual((team['xp_total'], team['rank']), (xp_total, 1))
@@ -2,19 +2,25 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from django.db.models import Count, Max, Q, Sum
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
-from django.core.exceptions import ValidationError
 import logging
-from contests.models import Contest, Team, ContestSubmission
+from contests import standings
+from contests.models import Contest, Team
 from contests.serializers import (
     ContestListSerializer,
     ContestDetailSerializer,
     TeamListSerializer,
-    ContestSubmissionSerializer
 )
+from api import conditional
 from api.models import Challenge
 from api.challenge_validator import ChallengeValidator
+from api.test_bundle import get_bundle
+from api import result_cache
+from api import submission_queue
+from api.submission_queue import wants_async
+from contests.grading import grade_contest_submission
 from api.security import SecurityChecker
 from rest_framework.parsers import MultiPartParser, FormParser
 
@@ -35,38 +41,61 @@ class ContestViewSet(viewsets.ReadOnlyModelViewSet):
     
     def list(self, request):
         """Liste tous les contests"""
-        contests = self.get_queryset()
+        # 304 si aucun contest n'a changé (dont le statut, déduit des dates)
+        now = timezone.now()
+        version = Contest.objects.aggregate(
+            count=Count('id'),
+            updated=Max('updated_at'),
+            teams=Sum('nombre_team'),
+            started=Count('id', filter=Q(date_debut__lte=now)),
+            finished=Count('id', filter=Q(date_fin__lt=now)),
+        )
+        validators = conditional.Validators(request, *sorted(version.items()))
+        not_modified = validators.not_modified(request)
+        if not_modified is not None:
+            return not_modified
         
-        # Mettre à jour le statut de tous les contests
-        for contest in contests:
-            contest.update_status()
-            contest.save(update_fields=['statut'])
+        # Statut déduit des dates au chargement (Contest.from_db) : aucune écriture
+        contests = self.get_queryset()
         
         serializer = ContestListSerializer(contests, many=True)
-        return Response(serializer.data)
+        return validators.apply(Response(serializer.data))
     
     def retrieve(self, request, pk=None):
         """Détail d'un contest"""
         contest = get_object_or_404(Contest, pk=pk)
         
-        # Mettre à jour le statut avant de retourner
-        contest.update_status()
-        contest.save(update_fields=['statut'])
+        # 304 si ni le contest ni ses challenges (affichés pendant le contest) n'ont changé
+        challenges = contest.challenges.aggregate(
+            updated=Max('updated_at'),
+            tests=Sum('tests_version'),
+            leaderboards=Sum('leaderboard_version'),
+        )
+        validators = conditional.Validators(
+            request, contest.pk, contest.updated_at, contest.nombre_team, contest.statut,
+            *sorted(challenges.items())
+        )
+        not_modified = validators.not_modified(request)
+        if not_modified is not None:
+            return not_modified
         
         serializer = ContestDetailSerializer(contest)
-        return Response(serializer.data)
+        return validators.apply(Response(serializer.data))
     
     @action(detail=True, methods=['get'])
     def teams(self, request, pk=None):
         """GET /api/contests/{id}/teams/"""
         contest = get_object_or_404(Contest, pk=pk)
         
-        # Mettre à jour le statut
-        contest.update_status()
-        contest.save(update_fields=['statut'])
-        
         teams = contest.teams.all()
-        serializer = TeamListSerializer(teams, many=True)
+        # Pendant le gel : score et rang du classement gelé (sauf administrateurs)
+        serializer = TeamListSerializer(
+            teams, many=True,
+            context={
+                'team_ranks': Team.ranks_for_contest(contest.id),
+                'frozen_stats': standings.public_team_stats(contest, request.user),
+            }
+        )
         return Response({
             'contest_id': contest.id,
             'contest_title': contest.title,
@@ -80,10 +109,6 @@ class ContestViewSet(viewsets.ReadOnlyModelViewSet):
         """GET /api/contests/{id}/challenges/"""
         contest = get_object_or_404(Contest, pk=pk)
         
-        # Mettre à jour le statut
-        contest.update_status()
-        contest.save(update_fields=['statut'])
-        
         if not contest.is_ongoing():
             return Response({
                 'error': 'Les challenges ne sont visibles que pendant le contest',
@@ -103,22 +128,24 @@ class ContestViewSet(viewsets.ReadOnlyModelViewSet):
     
     @action(detail=True, methods=['get'])
     def leaderboard(self, request, pk=None):
-        """GET /api/contests/{id}/leaderboard/"""
+        """
+        GET /api/contests/{id}/leaderboard/
+        Classement servi depuis un instantané (contests/standings.py), avec ETag.
+        ?live=1 (administrateurs) : classement réel pendant le gel.
+        """
         contest = get_object_or_404(Contest, pk=pk)
         
-        # Mettre à jour le statut
-        contest.update_status()
-        contest.save(update_fields=['statut'])
+        live = request.user.is_staff and request.query_params.get('live') in ('1', 'true')
+        snapshot = standings.get_standings(contest, live=live)
         
-        teams = contest.teams.all()
-        serializer = TeamListSerializer(teams, many=True)
+        validators = conditional.Validators(request, snapshot['etag'])
+        not_modified = validators.not_modified(request)
+        if not_modified is not None:
+            return not_modified
         
-        return Response({
-            'contest_id': contest.id,
-            'contest_title': contest.title,
-            'contest_status': contest.statut,
-            'leaderboard': serializer.data
-        })
+        return validators.apply(Response({
+            key: value for key, value in snapshot.items() if key != 'etag'
+        }))
 
 
 @api_view(['POST'])
@@ -195,27 +222,23 @@ def test_contest_challenge(request, contest_id, challenge_id):
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    # Récupérer les test cases
-    test_cases = challenge.test_cases.all()
-    if not test_cases.exists():
+    # Récupérer les test cases, prêts à être exécutés
+    bundle = get_bundle(challenge)
+    if not bundle.cases:
         return Response(
             {'error': 'Ce challenge ne contient pas encore de tests'},
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    test_data = [
-        {
-            'input_content': tc.get_input(),
-            'expected_output': tc.get_output(),
-            'order': tc.order
-        }
-        for tc in test_cases
-    ]
+    test_data = bundle.test_data()
     
     # Exécuter les tests
     try:
         validator = ChallengeValidator(timeout=10)
-        result = validator.validate_submission(code, test_data, language)
+        result = validator.validate_submission(
+            code, test_data, language,
+            cache_key=result_cache.make_key(bundle, code, language, validator.timeout)
+        )
         
         if result['success']:
             result['message'] = "✅ Tous les tests ont réussi ! Vous pouvez soumettre."
@@ -243,7 +266,8 @@ def submit_contest_challenge(request, contest_id, challenge_id):
     
     Body: {
         "code": "...",
-        "team_id": 1
+        "team_id": 1,
+        "async": false   (optionnel : mise en file, réponse 202 avec le job_id)
     }
     """
     contest = get_object_or_404(Contest, pk=contest_id)
@@ -313,117 +337,26 @@ def submit_contest_challenge(request, contest_id, challenge_id):
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    # Récupérer les test cases
-    test_cases = challenge.test_cases.all()
-    if not test_cases.exists():
+    # Récupérer les test cases, prêts à être exécutés
+    bundle = get_bundle(challenge)
+    if not bundle.cases:
         return Response(
             {'error': 'Ce challenge ne contient pas encore de tests'},
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    test_data = [
-        {
-            'input_content': tc.get_input(),
-            'expected_output': tc.get_output(),
-            'order': tc.order,
-            'xp_reward': tc.xp_reward
-        }
-        for tc in test_cases
-    ]
+    # Mode asynchrone : mise en file, la correction est faite par un worker
+    if wants_async(request):
+        job = submission_queue.enqueue(request.user, challenge, code, language, team=team)
+        return Response(submission_queue.accepted_payload(job), status=status.HTTP_202_ACCEPTED)
     
     # Exécuter les tests
     try:
-        validator = ChallengeValidator(timeout=10)
-        result = validator.validate_submission(code, test_data, language)
-        
-        # Calcul de l'XP obtenue basé sur chaque test case réussi
-        xp_earned = 0
-        for test_result in result.get('results', []):
-            if test_result.get('passed'):
-                test_num = test_result.get('test_number', 1) - 1
-                if 0 <= test_num < len(test_data):
-                    xp_earned += test_data[test_num].get('xp_reward', 0)
-
-        passed_tests = result.get('passed_tests', 0)
-        total_tests = result.get('total_tests', len(test_data))
-        is_success = result.get('success', False)
-        
-        # Le temps d'un challenge commence au premier join d'un membre de l'équipe
-        from api.models import UserChallengeAttempt
-        team_attempts = UserChallengeAttempt.objects.filter(
-            user__in=team.membres.all(),
-            challenge=challenge
-        ).order_by('started_at')
-        
-        if team_attempts.exists():
-            start_time = team_attempts.first().started_at
-            print(f"[submit_contest_challenge] Start time trouvé: {start_time}")
-        else:
-            # Si pas d'inscription trouvée (ne devrait pas arriver avec l'auto-join), 
-            # on prend le début du contest comme fallback
-            start_time = contest.date_debut
-            print(f"[submit_contest_challenge] Pas de start time, fallback sur début contest")
-
-        time_diff = timezone.now() - start_time
-        temps_soumission = int(time_diff.total_seconds())
-        
-        # Créer ou mettre à jour la soumission de l'équipe
-        submission, created = ContestSubmission.objects.update_or_create(
-            equipe=team,
-            challenge=challenge,
-            defaults={
-                'submitted_by': request.user,
-                'code_soumis': code,
-                'xp_earned': xp_earned,
-                'temps_soumission': temps_soumission,
-                'tests_reussis': passed_tests,
-                'tests_total': total_tests
-            }
+        payload, http_status = grade_contest_submission(
+            request.user, team, challenge, code, language
         )
+        return Response(payload, status=http_status)
         
-        # Synchroniser l'état pour TOUS les membres de l'équipe dans leurs profils individuels
-        for member in team.membres.all():
-            m_attempt, _ = UserChallengeAttempt.objects.get_or_create(
-                user=member,
-                challenge=challenge,
-                defaults={'started_at': start_time}
-            )
-            
-            # Mise à jour de l'XP individuelle : on ne diminue jamais l'XP
-            if xp_earned > m_attempt.xp_earned:
-                m_attempt.xp_earned = xp_earned
-            
-            # Si tout est réussi, marquer comme complété
-            if passed_tests == total_tests:
-                m_attempt.status = "completed"
-                if m_attempt.completed_at is None:
-                    m_attempt.completed_at = timezone.now()
-                    diff = m_attempt.completed_at - m_attempt.started_at
-                    m_attempt.completion_time = int(diff.total_seconds())
-            
-            m_attempt.save()
-            
-            # Mettre à jour les stats globales du membre
-            if hasattr(member, 'update_stats'):
-                member.update_stats()
-
-        print(f"=== [submit_contest_challenge] Response ===\nSuccess: {is_success}\nPassed: {passed_tests}\nFailed: {total_tests - passed_tests}\nXP Earned: {xp_earned}\nTemps depuis start challenge: {temps_soumission}s\n===")
-        return Response({
-            'success': is_success,
-            'passed': passed_tests,
-            'failed': total_tests - passed_tests,
-            'xp_earned': xp_earned,
-            'xp_total': challenge.xp_reward,
-            'temps_soumission': temps_soumission,
-            'message': f'Soumission enregistrée. XP : {xp_earned}/{challenge.xp_reward}',
-            'submission': ContestSubmissionSerializer(submission).data
-        })
-        
-    except ValidationError as e:
-        return Response(
-            {'error': str(e)},
-            status=status.HTTP_400_BAD_REQUEST
-        )
     except Exception as e:
         logger.error(f"Erreur lors de la soumission : {str(e)}")
         return Response(
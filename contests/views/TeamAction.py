@@ -6,6 +6,7 @@ from django.shortcuts import get_object_or_404
 from django.core.exceptions import ValidationError
 import logging
 from accounts.serializers import UserSerializer
+from contests import standings
 from contests.models import Team
 from contests.serializers import (
     TeamDetailSerializer,
@@ -373,7 +374,10 @@ def remove_member(request, team_id):
         return Response({
             'success': True,
             'message': f'{user.username} a été retiré de l\'équipe',
-            'team': TeamDetailSerializer(team, context={'request': request}).data
+            'team': TeamDetailSerializer(team, context={
+                'request': request,
+                'frozen_stats': standings.public_team_stats(team.contest, request.user),
+            }).data
         })
     except ValidationError as e:
         return Response(
@@ -423,6 +427,12 @@ def list_team_members(request, team_id):
     membres = team.membres.all()
     serializer = UserSerializer(membres, many=True)
 
+    # Pendant le gel : XP du classement gelé (sauf administrateurs)
+    xp_total = team.xp_total
+    frozen_stats = standings.public_team_stats(team.contest, request.user)
+    if frozen_stats is not None:
+        xp_total = frozen_stats.get(team.id, {}).get('xp_total')
+
     return Response({
         "team_id": team.id,
         "team_name": team.nom,
@@ -431,7 +441,7 @@ def list_team_members(request, team_id):
         "capitaine_id": team.capitaine.id,
         "capitaine_username": team.capitaine.username,
         "total_members": membres.count(),
-        "xp_total": team.xp_total,
+        "xp_total": xp_total,
         "members": serializer.data
     })
 
@@ -0,0 +1,104 @@
+# contests/visibility.py
+
+"""
+Challenges masqués par les contests en cours ou à venir, gardés en mémoire
+par worker.
+
+Le cache contient les contests non terminés (id, dates, challenges). Il est
+vidé :
+- dans le worker qui modifie un contest (Contest.save / delete) ou ses
+  challenges (signal m2m_changed, voir contests/signals.py) ;
+- dans les autres workers, dès que l'empreinte de la table Contest
+  (nombre de lignes, dernier updated_at) change : une requête sur une
+  petite table, sans jointure ;
+- à la fin du prochain contest (date_fin), et au plus tard après
+  CONTEST_VISIBILITY_CACHE_TTL secondes.
+
+Le statut (à venir / en cours) est déduit des dates à chaque lecture.
+"""
+
+import threading
+import time
+from typing import FrozenSet, List, Tuple
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils import timezone
+
+_lock = threading.Lock()
+# (empreinte, expiration monotonic, contests) ; contests : tuples
+# (id, date_debut, date_fin, frozenset des ids de challenges), triés par date_debut décroissante
+_state = None
+
+
+def _fingerprint():
+    from contests.models import Contest
+    stamp = Contest.objects.aggregate(count=Count('id'), last=Max('updated_at'))
+    return stamp['count'], stamp['last']
+
+
+def _load(now):
+    from contests.models import Contest
+
+    contests = {}
+    rows = (
+        Contest.objects.filter(Contest.status_q('ongoing', 'upcoming', now=now))
+        .order_by('-date_debut', 'id')
+        .values_list('id', 'date_debut', 'date_fin', 'challenges__id')
+    )
+    for contest_id, date_debut, date_fin, challenge_id in rows:
+        _, _, _, challenge_ids = contests.setdefault(contest_id, (contest_id, date_debut, date_fin, set()))
+        if challenge_id is not None:
+            challenge_ids.add(challenge_id)
+
+    return tuple(
+        (contest_id, date_debut, date_fin, frozenset(challenge_ids))
+        for contest_id, date_debut, date_fin, challenge_ids in contests.values()
+    )
+
+
+def _live_contests(now):
+    global _state
+
+    fingerprint = _fingerprint()
+    with _lock:
+        state = _state
+    if state is not None and state[0] == fingerprint and state[1] > time.monotonic():
+        return state[2]
+
+    contests = _load(now)
+    expires_in = settings.CONTEST_VISIBILITY_CACHE_TTL
+    if contests:
+        # Le prochain contest qui se termine libère ses challenges
+        next_end = min(date_fin for _, _, date_fin, _ in contests)
+        expires_in = min(expires_in, max(0.0, (next_end - now).total_seconds()))
+
+    with _lock:
+        _state = (fingerprint, time.monotonic() + expires_in, contests)
+    return contests
+
+
+def hidden_challenge_ids(now=None) -> FrozenSet[int]:
+    """Ids des challenges appartenant à un contest en cours ou à venir"""
+    now = now or timezone.now()
+    hidden = set()
+    for _, _, date_fin, challenge_ids in _live_contests(now):
+        if date_fin >= now:
+            hidden |= challenge_ids
+    return frozenset(hidden)
+
+
+def open_contests_for(challenge_id, now=None) -> List[Tuple[int, str]]:
+    """(id, statut) des contests en cours ou à venir contenant le challenge"""
+    now = now or timezone.now()
+    return [
+        (contest_id, 'upcoming' if now < date_debut else 'ongoing')
+        for contest_id, date_debut, date_fin, challenge_ids in _live_contests(now)
+        if challenge_id in challenge_ids and date_fin >= now
+    ]
+
+
+def invalidate():
+    global _state
+    with _lock:
+        _state = None
@@ -4,6 +4,7 @@ set -e
 echo "🚀 Running database migrations..."
 python manage.py makemigrations --noinput
 python manage.py migrate --noinput
+python manage.py createcachetable
 
 echo "👤 Creating superuser if not exists..."
 python manage.py shell < create_superuser.py